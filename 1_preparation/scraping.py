@@ -0,0 +1,149 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def make_session(pool_size=8, retries=3, backoff_factor=0.5):
+    """
+    Creates a requests session with a connection pool and retries.
+
+    Args:
+        pool_size (int): Number of connections kept open per host.
+        retries (int): How often a failed request is retried.
+        backoff_factor (float): Base of the exponential backoff between retries.
+
+    Returns:
+        requests.Session: Session to share between all requests of a scrape.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET',),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class HttpCache:
+    """
+    On-disk cache of downloaded pages and their validators (ETag and
+    Last-Modified), used to turn repeated downloads into conditional requests.
+    """
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str): Directory holding the cached pages; created if missing.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+    def get(self, url):
+        """
+        Returns:
+            tuple: ``(content, validators)`` of the cached page, or
+            ``(None, {})`` if the url has not been cached yet or its entry
+            can't be read.
+        """
+        path = self._path(url)
+        try:
+            with open(path + '.json', encoding='utf-8') as f:
+                validators = json.load(f)
+            with open(path, 'rb') as f:
+                return f.read(), validators
+        except (OSError, ValueError):
+            return None, {}
+
+    def put(self, url, content, validators):
+        path = self._path(url)
+        # The validators of an older copy are removed first and the new ones
+        # are written last, each file through a temporary file, so an entry
+        # interrupted while being written is never revalidated.
+        try:
+            os.remove(path + '.json')
+        except FileNotFoundError:
+            pass
+        with open(path + '.tmp', 'wb') as f:
+            f.write(content)
+        os.replace(path + '.tmp', path)
+        with open(path + '.json.tmp', 'w', encoding='utf-8') as f:
+            json.dump(validators, f)
+        os.replace(path + '.json.tmp', path + '.json')
+
+
+def fetch(session, url, cache=None, timeout=30):
+    """
+    Downloads a page, revalidating it against the cache if possible.
+
+    Args:
+        session (requests.Session): Session to send the request with.
+        url (str): Url of the page.
+        cache (HttpCache, optional): Cache of earlier downloads.
+        timeout (float): Timeout of the request in seconds.
+
+    Returns:
+        tuple: ``(content, changed)``, where ``changed`` is False if the
+        server confirmed that the cached copy is still current.
+    """
+    content, validators = cache.get(url) if cache is not None else (None, {})
+
+    headers = {}
+    if content is not None:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        if content is not None:
+            return content, False
+        # Nothing to revalidate: a 304 without a cached copy has no body to
+        # return, so the page is requested again unconditionally
+        response = session.get(url, timeout=timeout, headers={
+            'If-None-Match': None, 'If-Modified-Since': None, 'Cache-Control': 'no-cache'})
+        if response.status_code == 304:
+            raise requests.HTTPError(f'304 Not Modified for {url} without a cached copy', response=response)
+    response.raise_for_status()
+
+    if cache is not None:
+        cache.put(url, response.content, {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        })
+    return response.content, True
+
+
+def fetch_all(urls, cache=None, max_workers=8, session=None):
+    """
+    Downloads several pages concurrently over one pooled session.
+
+    Args:
+        urls (list): Urls of the pages.
+        cache (HttpCache, optional): Cache of earlier downloads.
+        max_workers (int): Maximum number of requests in flight.
+        session (requests.Session, optional): Session to use; a pooled one
+            is created if not given.
+
+    Returns:
+        dict: ``{url: (content, changed)}`` as returned by ``fetch``.
+    """
+    if session is None:
+        session = make_session(pool_size=max_workers)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda url: fetch(session, url, cache), urls)
+        return dict(zip(urls, results))
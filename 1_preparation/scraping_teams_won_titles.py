@@ -1,40 +1,35 @@
-from bs4 import BeautifulSoup
+import os
+import sys
 import requests
 import pandas as pd
 
-url = 'https://en.wikipedia.org/wiki/List_of_NBA_champions'
-req = requests.get(url)
-soup = BeautifulSoup(req.content, 'html.parser')
-
-table = soup.find_all("table", {"class": "wikitable"})[1]
-table = table.find_all("tbody")[0]
-rows = table.find_all("tr")[1:][1:]
+from table_extract import extract_columns
 
-year = []
-western_champ = []
-western_coach = []
-score = []
-eastern_champ = []
-eastern_coach = []
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_integration', 'ezzeddine'))
+from instrumentation import stage
 
-for row in rows:
-    cols = row.find_all('td')
-    if len(cols) > 1:
-        year.append(cols[0].text)
-        western_champ.append(cols[1].text)
-        western_coach.append(cols[2].text)
-        score.append(cols[3].text)
-        eastern_champ.append(cols[4].text)
-        eastern_coach.append(cols[5].text)
+url = 'https://en.wikipedia.org/wiki/List_of_NBA_champions'
+with stage('titles.fetch'):
+    req = requests.get(url)
 
-data = {
-    'year': year,
-    'western_champ': western_champ,
-    'western_coach': western_coach,
-    'score': score,
-    'eastern_champ': eastern_champ,
-    'eastern_coach': eastern_coach,
-}
+# Stream the second wikitable of the page, skipping its two header rows
+with stage('titles.extract') as s:
+    data = extract_columns(
+        req.content,
+        columns={
+            'year': 0,
+            'western_champ': 1,
+            'western_coach': 2,
+            'score': 3,
+            'eastern_champ': 4,
+            'eastern_coach': 5,
+        },
+        skip_rows=2,
+        table_index=1,
+        table_class='wikitable',
+        encoding='utf-8',
+    )
 
-final_df = pd.DataFrame(data)
-final_df.to_csv('../0_datasets/teams_won_titles.csv',index = False)
\ No newline at end of file
+    final_df = pd.DataFrame(data)
+    final_df.to_csv('../0_datasets/teams_won_titles.csv',index = False)
+    s.rows_out = len(final_df)
\ No newline at end of file
@@ -1,6 +1,13 @@
-from bs4 import BeautifulSoup
-import requests
+import os
+import sys
 import pandas as pd
+
+from scraping import HttpCache, fetch_all
+from table_extract import extract_columns
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_integration', 'ezzeddine'))
+from instrumentation import count, stage
+
 year_list = []
 
 for year in range(1990, 2022):
@@ -9,27 +16,34 @@ for year in range(1990, 2022):
 
 year_list.append('')
 
-base_url = 'https://hoopshype.com/salaries/players/'
+# The base url can be pointed at a local server that serves saved pages
+base_url = os.environ.get('HOOPSHYPE_BASE_URL', 'https://hoopshype.com/salaries/players/')
+
+os.makedirs('../0_datasets/salaries', exist_ok=True)
+
+# Download all seasons concurrently; unchanged seasons are only revalidated
+cache = HttpCache('../0_datasets/cache/http')
+with stage('salaries.fetch') as s:
+    pages = fetch_all([base_url + year for year in year_list], cache=cache)
+    s.rows_out = len(pages)
+    count('pages_changed', sum(changed for _, changed in pages.values()))
 
 for year in year_list:
-    players = []
-    salaries = []
-    url = base_url + year
-    req = requests.get(url)
-    soup = BeautifulSoup(req.content, 'html.parser')
-    table = soup.find('table')
-    rows = table.find_all('tr')[1:]
-    for row in rows:
-        cols = row.find_all('td')
-        players.append(' '.join(cols[1].text.split()))
-        salaries.append(' '.join(cols[2].text.split()))
-
-    data = {
-        'player': players,
-        'salary': salaries,
-    }
-    
-    final_df = pd.DataFrame(data)
-    if year == '':
-        year = '2022-2023'
-    final_df.to_csv('../0_datasets/salaries/players_slaries_' + year + '.csv',index = False)
\ No newline at end of file
+    content, changed = pages[base_url + year]
+    output = '../0_datasets/salaries/players_slaries_' + (year or '2022-2023') + '.csv'
+    if not changed and os.path.exists(output):
+        continue
+
+    # Stream the salary table row by row, normalizing the whitespace of each cell
+    with stage('salaries.extract', season=year or '2022-2023') as s:
+        data = extract_columns(
+            content,
+            columns={'player': 1, 'salary': 2},
+            skip_rows=1,
+            clean=lambda text: ' '.join(text.split()),
+            encoding='utf-8',
+        )
+
+        final_df = pd.DataFrame(data)
+        final_df.to_csv(output, index = False)
+        s.rows_out = len(final_df)
@@ -0,0 +1,100 @@
+import io
+import logging
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+
+def iter_table_rows(source, table_index=0, table_class=None, cell_tags=('td',), encoding=None):
+    """
+    Streams the rows of one HTML table without building a tree of the page.
+
+    Elements are discarded as soon as they have been parsed, so memory use is
+    bounded by a single row rather than the whole document. Parsing stops at
+    the end of the requested table.
+
+    Args:
+        source (bytes or file-like): HTML page.
+        table_index (int): Position of the table among the matching tables.
+        table_class (str, optional): Only count tables that have this class.
+        cell_tags (tuple): Tags of the cells to extract from each row.
+        encoding (str, optional): Encoding of the page; detected by lxml if
+            not given.
+
+    Yields:
+        tuple: Text of the cells of one row, in document order.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    matched = -1
+    table_depth = 0  # nesting depth inside the target table, 0 while outside
+    for event, elem in etree.iterparse(source, events=('start', 'end'), html=True,
+                                       encoding=encoding):
+        if event == 'start':
+            if elem.tag != 'table':
+                continue
+            if table_depth:
+                table_depth += 1
+            elif table_class is None or table_class in elem.get('class', '').split():
+                matched += 1
+                if matched == table_index:
+                    table_depth = 1
+            continue
+
+        if table_depth == 1 and elem.tag == 'tr':
+            yield tuple(''.join(cell.itertext()) for cell in elem if cell.tag in cell_tags)
+        elif elem.tag == 'table' and table_depth:
+            table_depth -= 1
+            if not table_depth:
+                return
+            # A nested table is part of the text of the enclosing cell
+            continue
+        elif table_depth:
+            # Cells and their content are still needed by the enclosing row
+            continue
+
+        # Drop what has been parsed so far; ancestors of the current position
+        # are kept, but lose every finished child.
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def extract_columns(source, columns, skip_rows=0, clean=None, **kwargs):
+    """
+    Extracts selected cells of an HTML table straight into column lists.
+
+    Rows that do not have all of the requested cells are skipped, with a
+    warning per row. If no row has them, the layout of the page has changed
+    and a ValueError is raised instead of returning empty columns.
+
+    Args:
+        source (bytes or file-like): HTML page.
+        columns (dict): Maps output column names to cell positions.
+        skip_rows (int): Number of leading rows to skip (e.g. headers).
+        clean (callable, optional): Applied to the text of every extracted cell.
+        **kwargs: Passed on to ``iter_table_rows``.
+
+    Returns:
+        dict: ``{column: list of cell texts}``.
+    """
+    data = {name: [] for name in columns}
+    width = max(columns.values()) + 1
+
+    skipped = 0
+    for number, row in enumerate(iter_table_rows(source, **kwargs)):
+        if number < skip_rows:
+            continue
+        if len(row) < width:
+            logger.warning('Skipped row %d with %d of %d cells: %r', number, len(row), width, row)
+            skipped += 1
+            continue
+        for name, position in columns.items():
+            data[name].append(clean(row[position]) if clean is not None else row[position])
+
+    if skipped and not any(data.values()):
+        raise ValueError(f'None of the {skipped} rows of the table has {width} cells; '
+                         'did the layout of the page change?')
+    return data
@@ -1,9 +1,19 @@
 import pandas as pd
-import uuid
 from itertools import zip_longest
 from collections import Counter
 import os
 
+from aliases import team_aliases
+from blocking import load_deletion_index
+from identifiers import entity_uuids, normalize_key
+from linking import link_names
+from match_cache import MatchCache
+from parallel import map_seasons
+from ingest import read_workbook
+from instrumentation import stage
+from paths import CACHE_DIR, DATASETS_DIR, PROCESSED_DIR
+from storage import INCREMENTAL, read_partitions, read_table, write_partitions, write_table
+
 def rename_columns(df, column_mapping):
     """
     Renames columns in a DataFrame based on the provided mapping.
@@ -41,84 +51,48 @@ def drop_duplicates(df, column):
     
     return cleaned_df
 
-def damerau_levenshtein_distance(s1, s2):
-    len1, len2 = len(s1), len(s2)
-    d = [[0] * (len2 + 1) for _ in range(len1 + 1)]
-    
-    for i in range(len1 + 1):
-        d[i][0] = i
-    
-    for j in range(len2 + 1):
-        d[0][j] = j
-    
-    for i in range(1, len1 + 1):
-        for j in range(1, len2 + 1):
-            cost = 0 if s1[i - 1] == s2[j - 1] else 1
-            d[i][j] = min(
-                d[i - 1][j] + 1,  # deletion
-                d[i][j - 1] + 1,  # insertion
-                d[i - 1][j - 1] + cost  # substitution
-            )
-            
-            if i > 1 and j > 1 and s1[i - 1] == s2[j - 2] and s1[i - 2] == s2[j - 1]:
-                d[i][j] = min(d[i][j], d[i - 2][j - 2] + cost)  # transposition
-    
-    return d[len1][len2]
-
-def add_player_uuid(df, uuid_df, threshold=0):
-    df.insert(0, "player_uuid", '')
-    for i, row in df.iterrows():
-        player_name = row['NAME']
-        min_distance = float('inf')
-        matching_uuid = None
-
-        for _, uuid_row in uuid_df.iterrows():
-            uuid_name = uuid_row['NAME']
-            distance = damerau_levenshtein_distance(player_name, uuid_name)
-
-            if distance < min_distance:
-                min_distance = distance
-                matching_uuid = uuid_row['uuid']
-
-            if min_distance == threshold:
-                break
-
-        if min_distance == threshold:
-            df.loc[i, 'player_uuid'] = matching_uuid
-
+def add_player_uuid(df, uuid_df, threshold=0, cache=None, index=None):
+    # Names are compared by the key their uuid is derived from, so spellings
+    # that only differ in Unicode composition or spacing link to the same player
+    with stage('stats.link_players') as s:
+        ref_names = uuid_df['NAME'].map(normalize_key, na_action='ignore')
+        player_uuids, _ = link_names(df['NAME'], ref_names, uuid_df['uuid'], threshold,
+                                     normalize=normalize_key, cache=cache, index=index)
+        s.rows_in, s.rows_out = len(df), int((player_uuids != '').sum())
+    df.insert(0, "player_uuid", player_uuids)
     df.drop('NAME', axis=1, inplace=True)
     return df
 
-def add_team_uuid(df, uuid_df, threshold=0):
-    df.insert(0, "team_uuid", '')  # Inserting the "team_uuid" column as the first column
-    for i, row in df.iterrows():
-        team_name = row['TEAM'].lower()
-        min_distance = float('inf')
-        matching_uuid = None
-        
-        for _, uuid_row in uuid_df.iterrows():
-            uuid_team = uuid_row['prefix_1']
-            distance = damerau_levenshtein_distance(team_name, uuid_team)
-            
-            if distance < min_distance:
-                min_distance = distance
-                matching_uuid = uuid_row['uuid']
-                
-            if min_distance == threshold:
-                break
-        
-        if min_distance == threshold:
-            df.loc[i, 'team_uuid'] = matching_uuid
-            
+def add_team_uuid(df, uuid_df, threshold=0, cache=None, aliases=None):
+    if aliases is None:
+        aliases = team_aliases(uuid_df)
+
+    # Every distinct team is looked up in the alias index once; only unknown
+    # spellings are matched in lower case against the "prefix_1" column
+    def fallback(names):
+        team_uuids, _ = link_names(names, uuid_df['prefix_1'], uuid_df['uuid'], threshold,
+                                   normalize=str.lower, cache=cache)
+        return team_uuids
+
+    with stage('stats.link_teams') as s:
+        team_uuids = aliases.resolve(df['TEAM'], fallback)
+        s.rows_in, s.rows_out = len(df), int((team_uuids != '').sum())
+    df.insert(0, "team_uuid", team_uuids)  # Inserting the "team_uuid" column as the first column
     df.drop('TEAM', axis=1, inplace=True)
     return df
 
-# Load Data
-stats_2019_2020 = pd.read_excel('../../0_datasets/stats/2019-2020 NBA Player Stats.xlsx', skiprows=1) 
-stats_2020_2021 = pd.read_excel('../../0_datasets/stats/2020-2021 NBA Stats  Player Box Score  Advanced Metrics.xlsx', skiprows=1)
-stats_2021_2022 = pd.read_excel('../../0_datasets/stats/NBA Stats 202122 All Player Statistics in one Page.xlsx', skiprows=1) 
-stats_2022_2023 = pd.read_csv('../../0_datasets/stats/NBA Stats 202223 All Stats  NBA Player Props Tool (1).csv')
-teams = pd.read_csv('../../0_datasets/processed/teams_with_uuid.csv')
+# Source files of the player stats per season
+stats_files = {
+    '2019_2020': 'stats/2019-2020 NBA Player Stats.xlsx',
+    '2020_2021': 'stats/2020-2021 NBA Stats  Player Box Score  Advanced Metrics.xlsx',
+    '2021_2022': 'stats/NBA Stats 202122 All Player Statistics in one Page.xlsx',
+    '2022_2023': 'stats/NBA Stats 202223 All Stats  NBA Player Props Tool (1).csv',
+}
+
+# Columns that are not in all seasons
+extra_columns = {
+    '2022_2023': ['P+R+A', 'P+R'],
+}
 
 column_mapping = {
     "RANK": "RANK",
@@ -153,58 +127,152 @@ column_mapping = {
 }
 
 
-# Rename columns in each DataFrame individually
-stats_2019_2020 = rename_columns(stats_2019_2020, column_mapping)
-stats_2020_2021 = rename_columns(stats_2020_2021, column_mapping)
-stats_2021_2022 = rename_columns(stats_2021_2022, column_mapping)
-
-# Drop columns that are not in all DataFrames
-stats_2022_2023 = stats_2022_2023.drop('P+R+A', axis=1)
-stats_2022_2023 = stats_2022_2023.drop('P+R', axis=1)
-
-# Drop duplicate rows
-stats_2019_2020 = drop_duplicates(stats_2019_2020, 'NAME')
-stats_2020_2021 = drop_duplicates(stats_2020_2021, 'NAME')
-stats_2021_2022 = drop_duplicates(stats_2021_2022, 'NAME')
-stats_2022_2023 = drop_duplicates(stats_2022_2023, 'NAME')
-
-# Create a new DataFrame with only the player name column & assign UUIDs
-df1_selected = stats_2019_2020[['NAME']]
-df2_selected = stats_2020_2021[['NAME']]
-df3_selected = stats_2021_2022[['NAME']]
-df4_selected = stats_2022_2023[['NAME']]
-
-# Concatenate selected columns from all four DataFrames
-merged_df = pd.concat([df1_selected, df2_selected, df3_selected, df4_selected])
-
-# Assign UUIDs to the players
-merged_df['uuid'] = [str(uuid.uuid4()) for _ in range(len(merged_df))]
-
-# Drop duplicate rows based on the player name column
-unique_players_df = merged_df.drop_duplicates(subset='NAME')
-unique_players_df.reset_index()
-directory = "../../0_datasets/processed"
-# Create the directory if it doesn't exist
-os.makedirs(directory, exist_ok=True)
-unique_players_df.to_csv('../../0_datasets/processed/unique_players.csv', index=False, columns=['uuid', 'NAME'])
-
-# Integrate players to stats
-stats_2019_2020 = add_player_uuid(stats_2019_2020, unique_players_df)
-stats_2020_2021 = add_player_uuid(stats_2020_2021, unique_players_df)
-stats_2021_2022 = add_player_uuid(stats_2021_2022, unique_players_df)
-stats_2022_2023 = add_player_uuid(stats_2022_2023, unique_players_df)
-
-
-# Integrate teams to stats
-stats_2019_2020 = add_team_uuid(stats_2019_2020, teams)
-stats_2020_2021 = add_team_uuid(stats_2020_2021, teams)
-stats_2021_2022 = add_team_uuid(stats_2021_2022, teams)
-stats_2022_2023 = add_team_uuid(stats_2022_2023, teams)
-
-directory = "../../0_datasets/processed/stats"
-# Create the directory if it doesn't exist
-os.makedirs(directory, exist_ok=True)
-stats_2019_2020.to_csv('../../0_datasets/processed/stats/stats_2019_2020.csv', index=False)
-stats_2020_2021.to_csv('../../0_datasets/processed/stats/stats_2020_2021.csv', index=False)
-stats_2021_2022.to_csv('../../0_datasets/processed/stats/stats_2021_2022.csv', index=False)
-stats_2022_2023.to_csv('../../0_datasets/processed/stats/stats_2022_2023.csv', index=False)
+def load_stats():
+    """
+    Loads the raw player stats of every season.
+
+    Returns:
+        dict: Maps each season (e.g. "2019_2020") to its stats DataFrame.
+    """
+    stats = {}
+    for season, path in stats_files.items():
+        path = os.path.join(DATASETS_DIR, path)
+        with stage('stats.load', season=season) as s:
+            if path.endswith('.xlsx'):
+                # Parsed once, then loaded from the cache with short column names
+                stats[season] = read_workbook(path, os.path.join(CACHE_DIR, 'stats'), column_mapping, skiprows=1)
+            else:
+                stats[season] = pd.read_csv(path)
+            s.rows_out = len(stats[season])
+    return stats
+
+def link_stats(df, unique_players_df, teams, cache_path=None, aliases=None, threshold=0, index=None):
+    """
+    Links the stats of one season to the player and team uuids.
+
+    Args:
+        df (pandas.DataFrame): Stats of the season.
+        unique_players_df (pandas.DataFrame): Players with their uuids.
+        teams (pandas.DataFrame): Teams with their uuids.
+        cache_path (str, optional): SQLite file of the match cache.
+        aliases (AliasIndex, optional): Spellings of the teams; built from
+            ``teams`` if not given.
+        threshold (int): Edit distance of the player matches.
+        index (DeletionIndex, optional): Index over the player names for a
+            positive threshold.
+
+    Returns:
+        pandas.DataFrame: The integrated stats.
+    """
+    if cache_path is None:
+        df = add_player_uuid(df, unique_players_df, threshold, index=index)
+        return add_team_uuid(df, teams, aliases=aliases)
+
+    with MatchCache(cache_path, 'players') as player_cache, \
+            MatchCache(cache_path, 'teams') as team_cache:
+        df = add_player_uuid(df, unique_players_df, threshold, cache=player_cache, index=index)
+        return add_team_uuid(df, teams, cache=team_cache, aliases=aliases)
+
+def load_titles():
+    """
+    Loads the raw champions, whose names are aliases of the teams.
+    """
+    return pd.read_csv(os.path.join(DATASETS_DIR, 'teams_won_titles.csv'))
+
+@stage('stats.integrate')
+def integrate_stats(stats, teams, cache_path=None, processes=None, titles=None, threshold=0, linked=None):
+    """
+    Assigns uuids to all players and links the stats of every season to the
+    player and team uuids.
+
+    Args:
+        stats (dict): Raw stats per season, as returned by ``load_stats``.
+        teams (pandas.DataFrame): Teams with their uuids.
+        cache_path (str, optional): SQLite file caching earlier matches.
+        processes (int, optional): Number of processes linking seasons in
+            parallel; one per core if None.
+        titles (pandas.DataFrame, optional): Raw champions, whose historical
+            team names are resolved as well.
+        threshold (int): Edit distance of the player matches; 0 links
+            exact names only.
+        linked (dict, optional): Stats of seasons integrated by an earlier
+            run, e.g. read with ``storage.read_partitions``. Their raw stats
+            still contribute players, but they are not linked again and are
+            returned as they are.
+
+    Returns:
+        tuple: ``(unique_players, stats)`` with the players and their uuids,
+        and the integrated stats per season.
+    """
+    stats = dict(stats)
+    for season, df in stats.items():
+        # Rename the long column names of the Excel workbooks
+        df = rename_columns(df, column_mapping)
+
+        # Drop columns that are not in all DataFrames
+        df = df.drop(extra_columns.get(season, []), axis=1)
+
+        # Drop duplicate rows
+        stats[season] = drop_duplicates(df, 'NAME')
+
+    # Concatenate the player name column of all seasons
+    merged_df = pd.concat([df[['NAME']] for df in stats.values()])
+
+    # Derive the UUIDs of the players from their names, so they stay the
+    # same when seasons are added
+    merged_df['uuid'] = entity_uuids('player', merged_df['NAME'])
+
+    # Drop duplicate players; new players of a later season come last
+    unique_players_df = merged_df.drop_duplicates(subset='uuid')[['uuid', 'NAME']].reset_index(drop=True)
+
+    # All spellings of the teams, shared by the seasons
+    aliases = team_aliases(teams, titles)
+
+    # Fuzzy matches look the player names up in a deletion index, built once
+    # for the names and reused by later runs
+    index = None
+    if threshold > 0:
+        index = load_deletion_index(unique_players_df['NAME'].map(normalize_key, na_action='ignore'),
+                                    threshold, os.path.join(CACHE_DIR, 'indexes'))
+
+    # Integrate players and teams to stats, one season per work item
+    linked = linked or {}
+    integrated = map_seasons(
+        link_stats, {season: df for season, df in stats.items() if season not in linked},
+        shared={'unique_players_df': unique_players_df, 'teams': teams, 'cache_path': cache_path,
+                'aliases': aliases, 'threshold': threshold, 'index': index},
+        processes=processes)
+
+    return unique_players_df, {season: linked[season] if season in linked else integrated[season]
+                               for season in stats}
+
+@stage('stats.save')
+def save_stats(unique_players_df, stats, format=None, incremental=False):
+    """
+    Writes the players and the integrated stats to 0_datasets/processed.
+
+    Args:
+        format (str, optional): Output format, see ``storage.FORMATS``.
+        incremental (bool): Only write the stats of seasons that have no file
+            yet; the files of the other seasons are left untouched.
+    """
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    write_table(unique_players_df[['uuid', 'NAME']], os.path.join(PROCESSED_DIR, 'unique_players'), format)
+    write_partitions(stats, os.path.join(PROCESSED_DIR, 'stats'), 'stats', format, incremental)
+
+
+if __name__ == '__main__':
+    teams = read_table(os.path.join(PROCESSED_DIR, 'teams_with_uuid'))
+
+    # Seasons written by an earlier incremental run are kept as they are
+    linked = read_partitions(os.path.join(PROCESSED_DIR, 'stats'), 'stats', stats_files) if INCREMENTAL else None
+
+    # Reuse the matches of earlier runs as long as the reference tables are
+    # unchanged; the standalone script links the seasons serially, see
+    # integration_pipeline.py for a parallel run
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    unique_players_df, stats = integrate_stats(
+        load_stats(), teams, cache_path=os.path.join(PROCESSED_DIR, 'match_cache.sqlite'), processes=1,
+        titles=load_titles(), linked=linked)
+
+    save_stats(unique_players_df, stats, incremental=INCREMENTAL)
@@ -1,93 +1,138 @@
 import os
 import pandas as pd
-import uuid
 
-salaries_2019_2020 = pd.read_csv('../../0_datasets/salaries/players_slaries_2019-2020.csv') 
-salaries_2020_2021 = pd.read_csv('../../0_datasets/salaries/players_slaries_2020-2021.csv')
-salaries_2021_2022 = pd.read_csv('../../0_datasets/salaries/players_slaries_2021-2022.csv') 
-salaries_2022_2023 = pd.read_csv('../../0_datasets/salaries/players_slaries_2022-2023.csv')
-players = pd.read_csv('../../0_datasets/processed/unique_players.csv')
+from blocking import load_deletion_index
+from identifiers import entity_uuids, normalize_key, occurrences
+from instrumentation import stage
+from linking import link_names
+from match_cache import MatchCache
+from parallel import map_seasons
+from paths import CACHE_DIR, DATASETS_DIR, PROCESSED_DIR
+from storage import INCREMENTAL, has_partition, read_table, write_partitions
 
+# Seasons with scraped salaries
+salary_seasons = ['2019_2020', '2020_2021', '2021_2022', '2022_2023']
 
-def process_dataframe(df):
+
+def process_dataframe(df, season):
     # Rename "salary" column to "salary_in_usd"
     df.rename(columns={'salary': 'salary_in_usd'}, inplace=True)
 
     # Convert values in "salary_in_usd" column from string to float
     df['salary_in_usd'] = df['salary_in_usd'].str.replace(',', '').str.replace('$', '').astype(float)
 
-    # Add "uuid" column as the first column with UUID values
-    df.insert(0, 'uuid', [str(uuid.uuid4()) for _ in range(len(df))])
+    # Add "uuid" column as the first column, derived from the season, the
+    # player and how many rows of the player came before
+    df.insert(0, 'uuid', entity_uuids('salary', [season] * len(df), df['player'], occurrences(df['player'])))
 
     return df
 
-def damerau_levenshtein_distance(s1, s2):
-    len1, len2 = len(s1), len(s2)
-    d = [[0] * (len2 + 1) for _ in range(len1 + 1)]
-    
-    for i in range(len1 + 1):
-        d[i][0] = i
-    
-    for j in range(len2 + 1):
-        d[0][j] = j
-    
-    for i in range(1, len1 + 1):
-        for j in range(1, len2 + 1):
-            cost = 0 if s1[i - 1] == s2[j - 1] else 1
-            d[i][j] = min(
-                d[i - 1][j] + 1,  # deletion
-                d[i][j - 1] + 1,  # insertion
-                d[i - 1][j - 1] + cost  # substitution
-            )
-            
-            if i > 1 and j > 1 and s1[i - 1] == s2[j - 2] and s1[i - 2] == s2[j - 1]:
-                d[i][j] = min(d[i][j], d[i - 2][j - 2] + cost)  # transposition
-    
-    return d[len1][len2]
-
-def integrate_players_salaries(salary_df, uuid_df, threshold = 0):
-    salary_df.insert(1, "player_uuid", '')
-    for i, row in salary_df.iterrows():
-        player_name = row['player']
-        min_distance = float('inf')
-        matching_uuid = None
-
-        for _, uuid_row in uuid_df.iterrows():
-            uuid_name = uuid_row['NAME']
-            distance = damerau_levenshtein_distance(player_name, uuid_name)
-
-            if distance < min_distance:
-                min_distance = distance
-                matching_uuid = uuid_row['uuid']
-
-            if min_distance == threshold:
-                break
-
-        if min_distance == threshold:
-            salary_df.loc[i, 'player_uuid'] = matching_uuid
-
+def integrate_players_salaries(salary_df, uuid_df, threshold = 0, cache=None, index=None):
+    # Matched on the normalized names, as the stats in add_player_uuid
+    with stage('salaries.link_players') as s:
+        ref_names = uuid_df['NAME'].map(normalize_key, na_action='ignore')
+        player_uuids, _ = link_names(salary_df['player'], ref_names, uuid_df['uuid'],
+                                     threshold, normalize=normalize_key, cache=cache, index=index)
+        s.rows_in, s.rows_out = len(salary_df), int((player_uuids != '').sum())
+    salary_df.insert(1, "player_uuid", player_uuids)
     salary_df.drop('player', axis=1, inplace=True)
     return salary_df
 
-# Generate unique UUID for each salary and convert salary to float
-salaries_2019_2020 = process_dataframe(salaries_2019_2020)
-salaries_2020_2021 = process_dataframe(salaries_2020_2021)
-salaries_2021_2022 = process_dataframe(salaries_2021_2022)
-salaries_2022_2023 = process_dataframe(salaries_2022_2023)
-
-# Integrate players and salaries
-salaries_2019_2020 = integrate_players_salaries(salaries_2019_2020, players)
-salaries_2020_2021 = integrate_players_salaries(salaries_2020_2021, players)
-salaries_2021_2022 = integrate_players_salaries(salaries_2021_2022, players)
-salaries_2022_2023 = integrate_players_salaries(salaries_2022_2023, players)
-
-#Create directory if it doesn't exist
-if not os.path.exists('../../0_datasets/processed/salaries'):
-    os.makedirs('../../0_datasets/processed/salaries')
-
-
-# Save integrated salaries
-salaries_2019_2020.to_csv('../../0_datasets/processed/salaries/salaries_2019_2020.csv', index=False)
-salaries_2020_2021.to_csv('../../0_datasets/processed/salaries/salaries_2020_2021.csv', index=False)
-salaries_2021_2022.to_csv('../../0_datasets/processed/salaries/salaries_2021_2022.csv', index=False)
-salaries_2022_2023.to_csv('../../0_datasets/processed/salaries/salaries_2022_2023.csv', index=False)
\ No newline at end of file
+def load_salaries():
+    """
+    Loads the scraped salaries of every season.
+
+    Returns:
+        dict: Maps each season (e.g. "2019_2020") to its salaries DataFrame.
+    """
+    salaries = {}
+    for season in salary_seasons:
+        with stage('salaries.load', season=season) as s:
+            salaries[season] = pd.read_csv(os.path.join(
+                DATASETS_DIR, 'salaries', f"players_slaries_{season.replace('_', '-')}.csv"))
+            s.rows_out = len(salaries[season])
+    return salaries
+
+def link_salaries(salary_df, players, cache_path=None, threshold=0, index=None):
+    """
+    Links the salaries of one season to the player uuids.
+
+    Args:
+        salary_df (pandas.DataFrame): Processed salaries of the season.
+        players (pandas.DataFrame): Players with their uuids.
+        cache_path (str, optional): SQLite file of the match cache.
+        threshold (int): Edit distance of the player matches.
+        index (DeletionIndex, optional): Index over the player names for a
+            positive threshold.
+
+    Returns:
+        pandas.DataFrame: The integrated salaries.
+    """
+    if cache_path is None:
+        return integrate_players_salaries(salary_df, players, threshold, index=index)
+
+    with MatchCache(cache_path, 'players') as player_cache:
+        return integrate_players_salaries(salary_df, players, threshold, cache=player_cache, index=index)
+
+@stage('salaries.integrate')
+def integrate_salaries(salaries, players, cache_path=None, processes=None, threshold=0):
+    """
+    Converts the salaries of every season and links them to the player uuids.
+
+    Args:
+        salaries (dict): Raw salaries per season, as returned by ``load_salaries``.
+        players (pandas.DataFrame): Players with their uuids.
+        cache_path (str, optional): SQLite file caching earlier matches.
+        processes (int, optional): Number of processes linking seasons in
+            parallel; one per core if None.
+        threshold (int): Edit distance of the player matches; 0 links
+            exact names only.
+
+    Returns:
+        dict: Integrated salaries per season.
+    """
+    # Generate unique UUID for each salary and convert salary to float
+    salaries = {season: process_dataframe(df.copy(), season) for season, df in salaries.items()}
+
+    # Fuzzy matches look the player names up in a deletion index, built once
+    # for the names and reused by later runs
+    index = None
+    if threshold > 0:
+        index = load_deletion_index(players['NAME'].map(normalize_key, na_action='ignore'), threshold, os.path.join(CACHE_DIR, 'indexes'))
+
+    # Integrate players and salaries, one season per work item
+    return map_seasons(
+        link_salaries, salaries,
+        shared={'players': players, 'cache_path': cache_path, 'threshold': threshold, 'index': index},
+        processes=processes)
+
+@stage('salaries.save')
+def save_salaries(salaries, format=None, incremental=False):
+    """
+    Writes the integrated salaries to 0_datasets/processed/salaries.
+
+    Args:
+        format (str, optional): Output format, see ``storage.FORMATS``.
+        incremental (bool): Only write the salaries of seasons that have no
+            file yet; the files of the other seasons are left untouched.
+    """
+    # Save integrated salaries, one file per season
+    write_partitions(salaries, os.path.join(PROCESSED_DIR, 'salaries'), 'salaries', format, incremental)
+
+
+if __name__ == '__main__':
+    players = read_table(os.path.join(PROCESSED_DIR, 'unique_players'))
+
+    # Seasons written by an earlier incremental run are not linked again
+    salaries = load_salaries()
+    if INCREMENTAL:
+        salaries = {season: df for season, df in salaries.items()
+                    if not has_partition(os.path.join(PROCESSED_DIR, 'salaries'), 'salaries', season)}
+
+    # Reuse the matches of earlier runs as long as unique_players.csv is
+    # unchanged; the seasons are linked serially, as in script 1
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    salaries = integrate_salaries(
+        salaries, players, cache_path=os.path.join(PROCESSED_DIR, 'match_cache.sqlite'), processes=1)
+
+    save_salaries(salaries, incremental=INCREMENTAL)
@@ -0,0 +1,109 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from similarity import encode_names, levenshtein_distances
+
+# Number of titles appended to the champions on Wikipedia, e.g. "Boston Celtics (17)"
+TITLE_COUNT = re.compile(r'\s*\(\d+\)\s*$')
+
+
+def normalize_alias(value):
+    """
+    Normalizes a team name or abbreviation for lookup: lower case, single
+    spaces and without a trailing title count.
+    """
+    return ' '.join(TITLE_COUNT.sub('', value).lower().split())
+
+
+class AliasIndex:
+    """
+    Hash index from every known spelling of an entity to its uuid.
+
+    Values are resolved once per distinct value and broadcast back to the
+    column, so a stats file with thousands of rows but only thirty teams
+    costs thirty dictionary lookups.
+    """
+
+    def __init__(self):
+        self.aliases = {}
+
+    def add(self, aliases, uuids):
+        """
+        Registers aliases. An alias that is already known keeps its uuid, so
+        earlier sources take precedence over later ones. An alias shared by
+        several entities of the same source, such as "Los" for both Los
+        Angeles teams, is ambiguous and resolves to nothing.
+
+        Args:
+            aliases (iterable): Spellings to register.
+            uuids (iterable): Uuid of each spelling.
+        """
+        added = {}
+        for alias, alias_uuid in zip(aliases, uuids):
+            if not isinstance(alias, str) or not normalize_alias(alias):
+                continue
+            alias = normalize_alias(alias)
+            if alias in added and added[alias] != alias_uuid:
+                added[alias] = ''
+            else:
+                added.setdefault(alias, alias_uuid)
+
+        for alias, alias_uuid in added.items():
+            self.aliases.setdefault(alias, alias_uuid)
+
+    def resolve(self, values, fallback=None):
+        """
+        Resolves a column of values to uuids.
+
+        Args:
+            values (array-like): Values to resolve.
+            fallback (callable, optional): Called with the list of distinct
+                values without a known alias; returns their uuids, '' for
+                the ones it can't resolve either.
+
+        Returns:
+            numpy.ndarray: Uuid of every value, '' where it is unresolved.
+        """
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        resolved = np.array([self.aliases.get(normalize_alias(value), '') for value in uniques]
+                            + [''], dtype=object)
+
+        unseen = [i for i, value in enumerate(uniques) if resolved[i] == '' and isinstance(value, str)]
+        if fallback is not None and unseen:
+            resolved[unseen] = fallback([uniques[i] for i in unseen])
+
+        # Missing values have code -1 and pick the trailing ''
+        return resolved[codes]
+
+
+def team_aliases(teams, titles=None):
+    """
+    Builds the alias index of the teams.
+
+    The lower-case abbreviation in "prefix_1" comes first, then the second
+    abbreviation in "prefix_2", the full name and, if ``titles`` is given, the
+    historical names under which the teams won their conference. Like the
+    champions in 0_integrate_teams_champs.py, a historical name belongs to
+    the team with the closest name.
+
+    Args:
+        teams (pandas.DataFrame): Teams with their uuids.
+        titles (pandas.DataFrame, optional): Raw champions per season.
+
+    Returns:
+        AliasIndex: Index of all spellings of the teams.
+    """
+    index = AliasIndex()
+    uuids = teams['uuid'].tolist()
+    for column in ['prefix_1', 'prefix_2', 'name']:
+        if column in teams.columns:
+            index.add(teams[column], uuids)
+
+    if titles is not None and len(teams):
+        team_names = encode_names(teams['name'])
+        champions = pd.concat([titles['western_champ'], titles['eastern_champ']]).dropna().unique()
+        index.add(champions, [uuids[levenshtein_distances(TITLE_COUNT.sub('', champion), team_names).argmin()]
+                              for champion in champions])
+    return index
@@ -0,0 +1,244 @@
+import hashlib
+import os
+import pickle
+from collections import Counter, defaultdict
+
+from similarity import damerau_levenshtein_distances
+
+# Padding characters used to mark the start and end of a name. Neither can
+# occur in a scraped name, so padded q-grams never collide with real ones.
+START_PAD = '\x00'
+END_PAD = '\x01'
+
+
+def qgrams(name, q=2):
+    """
+    Splits a name into its padded q-grams.
+
+    Args:
+        name (str): Name to split.
+        q (int): Length of each gram.
+
+    Returns:
+        collections.Counter: Multiset of the padded q-grams of the name.
+    """
+    padded = START_PAD * (q - 1) + name + END_PAD * (q - 1)
+    return Counter(padded[i:i + q] for i in range(len(padded) - q + 1))
+
+
+class NameIndex:
+    """
+    Blocking index over a column of reference names.
+
+    Exact matches are answered from a hash index. Everything else goes through
+    a q-gram index combined with a length filter, so that only reference names
+    that can possibly lie within the requested edit distance are returned as
+    candidates. The filters are lossless: every reference name within
+    ``max_distance`` (Damerau-Levenshtein, adjacent transpositions included)
+    of the query is part of the candidate list.
+    """
+
+    def __init__(self, names, q=2):
+        """
+        Args:
+            names (iterable): Reference names, in reference-table order.
+            q (int): Length of the grams used for candidate retrieval.
+        """
+        self.q = q
+        self.exact = {}
+        self.by_length = defaultdict(list)
+        self.postings = defaultdict(list)
+
+        for position, name in enumerate(names):
+            if not isinstance(name, str):
+                continue
+            self.exact.setdefault(name, position)
+            self.by_length[len(name)].append(position)
+            for gram, count in qgrams(name, q).items():
+                self.postings[gram].append((position, count))
+
+        self.lengths = {position: length
+                        for length, positions in self.by_length.items()
+                        for position in positions}
+
+    def candidates(self, name, max_distance=0):
+        """
+        Returns the positions of all reference names that may lie within
+        ``max_distance`` of ``name``.
+
+        Args:
+            name (str): Query name.
+            max_distance (int): Largest edit distance of interest.
+
+        Returns:
+            list: Candidate positions in ascending (reference-table) order.
+        """
+        if max_distance == 0:
+            position = self.exact.get(name)
+            return [] if position is None else [position]
+
+        length = len(name)
+        grams = qgrams(name, self.q)
+
+        # Every edit operation destroys at most q + 1 padded q-grams (q for an
+        # insertion, deletion or substitution, q + 1 for a transposition), so
+        # a name within max_distance must share at least this many of them.
+        def min_shared(other_length):
+            return max(length, other_length) + self.q - 1 - max_distance * (self.q + 1)
+
+        if min_shared(length) <= 0:
+            # The q-gram filter cannot prune anything for names this short.
+            lengths = range(max(length - max_distance, 0), length + max_distance + 1)
+            return sorted(position for other_length in lengths
+                          for position in self.by_length.get(other_length, ()))
+
+        shared = defaultdict(int)
+        for gram, count in grams.items():
+            for position, other_count in self.postings.get(gram, ()):
+                shared[position] += min(count, other_count)
+
+        return sorted(position for position, common in shared.items()
+                      if abs(self.lengths[position] - length) <= max_distance
+                      and common >= min_shared(self.lengths[position]))
+
+
+def deletions(name, max_distance):
+    """
+    Returns every string obtained by deleting up to ``max_distance``
+    characters from a name, the name itself included.
+    """
+    found = frontier = {name}
+    for _ in range(max_distance):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        found = found | frontier
+    return found
+
+
+def names_fingerprint(names):
+    """
+    Hashes reference names in order, to tell whether a saved index is for them.
+    """
+    digest = hashlib.sha256()
+    for name in names:
+        digest.update(f'{name!r}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class DeletionIndex:
+    """
+    Radius index over a column of reference names (a SymSpell deletion
+    dictionary).
+
+    Every reference name is stored under all strings reached by deleting up
+    to ``max_distance`` of its characters. Two names within an optimal
+    string alignment distance of k share such a string after at most k
+    deletions on each side (a substitution or a transposition is one
+    deletion on both sides, an insertion one on a single side), so looking up
+    the deletions of a query finds every reference name within k. The
+    candidates are then verified with the exact distance. A lookup costs a
+    number of dictionary probes that depends on the length of the query, not
+    on the number of reference names.
+    """
+
+    def __init__(self, names, max_distance=1):
+        """
+        Args:
+            names (iterable): Reference names, in reference-table order.
+            max_distance (int): Largest radius the index answers queries for.
+        """
+        self.names = list(names)
+        self.max_distance = max_distance
+        self.deletes = defaultdict(list)
+        for position, name in enumerate(self.names):
+            if not isinstance(name, str):
+                continue
+            for variant in deletions(name, max_distance):
+                self.deletes[variant].append(position)
+        self.deletes = dict(self.deletes)
+
+    def candidates(self, name, max_distance=None):
+        """
+        Returns the positions of all reference names that may lie within
+        ``max_distance`` of ``name``.
+
+        Returns:
+            list: Candidate positions in ascending (reference-table) order.
+        """
+        max_distance = self.max_distance if max_distance is None else max_distance
+        if max_distance > self.max_distance:
+            raise ValueError(f'Index answers distances up to {self.max_distance}, not {max_distance}')
+
+        found = set()
+        for variant in deletions(name, max_distance):
+            found.update(self.deletes.get(variant, ()))
+        return sorted(position for position in found
+                      if abs(len(self.names[position]) - len(name)) <= max_distance)
+
+    def within(self, name, max_distance=None):
+        """
+        Finds all reference names within ``max_distance`` of ``name``.
+
+        Returns:
+            list: ``(position, distance)`` pairs, closest first and in
+            reference-table order among equally close names.
+        """
+        max_distance = self.max_distance if max_distance is None else max_distance
+        positions = self.candidates(name, max_distance)
+        distances = damerau_levenshtein_distances(
+            name, [self.names[position] for position in positions], max_distance=max_distance)
+        return sorted(((position, int(distance)) for position, distance in zip(positions, distances)
+                       if distance <= max_distance), key=lambda match: (match[1], match[0]))
+
+    def nearest(self, name, max_distance=None):
+        """
+        Finds the closest reference name within ``max_distance``; among equally
+        close names the first in reference-table order.
+
+        Returns:
+            tuple: ``(position, distance)``, or None if no name is close enough.
+        """
+        matches = self.within(name, max_distance)
+        return matches[0] if matches else None
+
+    def save(self, path):
+        """
+        Writes the index to a file; it is written to a temporary file first,
+        so a concurrent reader never sees half of it.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def load(path):
+        """
+        Reads an index written by ``save``.
+
+        Returns:
+            DeletionIndex: The index.
+        """
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def load_deletion_index(names, max_distance, directory):
+    """
+    Loads the deletion index of some reference names from a directory, or
+    builds and saves it there if the names changed since it was last built.
+
+    Args:
+        names (iterable): Reference names, in reference-table order.
+        max_distance (int): Largest radius of the queries.
+        directory (str): Directory of the saved indexes.
+
+    Returns:
+        DeletionIndex: Index over ``names``.
+    """
+    names = list(names)
+    path = os.path.join(directory, f'deletions-{names_fingerprint(names)[:16]}-k{max_distance}.pickle')
+    if os.path.exists(path):
+        return DeletionIndex.load(path)
+    index = DeletionIndex(names, max_distance)
+    index.save(path)
+    return index
@@ -0,0 +1,250 @@
+import argparse
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from paths import PROCESSED_DIR
+from storage import STAT_COLUMNS, apply_schema, list_tables, read_table, table_name, table_schema, write_table
+
+try:
+    import pyarrow as pa
+except ImportError:  # uuids then stay strings
+    pa = None
+
+# Compact in-memory types of the processed tables, keyed like storage.SCHEMAS:
+#   "player", "team": uuid keys, dictionary-encoded against the uuids of the
+#       players or teams, so every table shares the same categories and joins
+#       compare integer codes;
+#   "uuid": row ids, stored as 128-bit binary values;
+#   "category": dictionary-encoded strings;
+#   "downcast": numbers in the narrowest type that holds them exactly.
+COMPACT_SCHEMAS = {
+    'teams_with_uuid': {'uuid': 'team', 'name': 'category', 'prefix_1': 'category',
+                        'prefix_2': 'category'},
+    'champions_with_team_ids': {'uuid': 'uuid', 'year': 'downcast', 'region': 'category',
+                                'champion_uuid': 'team'},
+    'unique_players': {'uuid': 'player'},
+    'stats': dict({'player_uuid': 'player', 'team_uuid': 'team', 'POS': 'category',
+                   'season': 'category'},
+                  **{column: 'downcast' for column in STAT_COLUMNS}),
+    'salaries': {'uuid': 'uuid', 'player_uuid': 'player', 'salary_in_usd': 'downcast',
+                 'season': 'category'},
+}
+
+# Tables whose uuids define the categories of each key domain
+DOMAINS = {
+    'player': 'unique_players',
+    'team': 'teams_with_uuid',
+}
+
+UUID_BINARY = pa.binary(16) if pa is not None else None
+
+
+def downcast(series):
+    """
+    Stores a numeric column in the narrowest type that keeps its values.
+
+    Whole numbers without missing values become the smallest integer type.
+    Other columns become float32 only if every value survives the round trip
+    through float32 unchanged, e.g. whole numbers with missing values below
+    2 ** 24; decimals such as 31.9 have no exact float32 value and keep
+    float64.
+    """
+    values = series.dropna()
+    if len(values) == 0:
+        return series.astype('float32')
+    if len(values) == len(series) and (values == np.round(values)).all():
+        return pd.to_numeric(series, downcast='integer')
+    values = values.to_numpy(dtype='float64')
+    if (values.astype(np.float32).astype(np.float64) == values).all():
+        return series.astype('float32')
+    return series
+
+def encode_uuids(series):
+    """
+    Converts uuid strings to 128-bit binary values; '' and missing values stay
+    missing.
+    """
+    if pa is None:
+        return series.astype('string')
+    values = [uuid.UUID(str(value)).bytes if isinstance(value, (str, uuid.UUID)) and str(value) else None
+              for value in series]
+    return pd.Series(pd.array(values, dtype=pd.ArrowDtype(UUID_BINARY)), index=series.index,
+                     name=series.name)
+
+def decode_uuids(series):
+    """
+    Converts 128-bit binary uuids back to strings.
+    """
+    return series.map(lambda value: str(uuid.UUID(bytes=value)) if isinstance(value, bytes) else '')
+
+def expand_frame(df):
+    """
+    Converts a compact DataFrame back to the plain types the tables are
+    written with: uuid strings, '' for unlinked keys, plain strings and
+    float64 numbers.
+    """
+    df = df.copy()
+    for column in df.columns:
+        dtype = df[column].dtype
+        if isinstance(dtype, pd.ArrowDtype) and dtype.pyarrow_dtype == UUID_BINARY:
+            df[column] = decode_uuids(df[column])
+        elif dtype == np.float32:
+            # downcast only keeps float32 values that convert back exactly
+            df[column] = df[column].astype('float64')
+        elif isinstance(dtype, pd.CategoricalDtype):
+            values = df[column].astype(object)
+            df[column] = values.where(values.notna(), '') if column.endswith('uuid') else values
+    return df
+
+
+class CompactLoader:
+    """
+    Loads processed tables in their compact in-memory types.
+
+    The uuid keys of players and teams are encoded against the uuids of the
+    dimension tables, loaded once per loader.
+    """
+
+    def __init__(self, directory=PROCESSED_DIR):
+        """
+        Args:
+            directory (str): Directory of the processed tables.
+        """
+        self.directory = directory
+        self.categories = {}
+
+    def domain(self, name):
+        """
+        Returns the categories of a key domain, e.g. the uuids of all players.
+        """
+        if name not in self.categories:
+            keys = read_table(os.path.join(self.directory, DOMAINS[name]), columns=['uuid'])['uuid']
+            self.categories[name] = pd.Index(keys.dropna().astype(str).unique())
+        return self.categories[name]
+
+    def compact(self, df, schema):
+        """
+        Converts the columns of a DataFrame to their compact types.
+
+        Keys that are not part of their domain, including the '' of unlinked
+        rows, are set to missing values before they are encoded, so they are
+        not categories of their own; ``expand_frame`` writes them back as ''.
+
+        Args:
+            df (pandas.DataFrame): Table in plain types.
+            schema (dict): Compact type of each column, see ``COMPACT_SCHEMAS``.
+
+        Returns:
+            pandas.DataFrame: The compact table.
+        """
+        df = df.copy()
+        for column, kind in schema.items():
+            if column not in df.columns:
+                continue
+            if kind in DOMAINS:
+                categories = self.domain(kind)
+                values = df[column].astype(object)
+                df[column] = pd.Categorical(values.where(values.isin(categories)), categories=categories)
+            elif kind == 'uuid':
+                df[column] = encode_uuids(df[column])
+            elif kind == 'category':
+                df[column] = df[column].astype('category')
+            elif kind == 'downcast':
+                df[column] = downcast(df[column])
+        return df
+
+    def read(self, path, columns=None):
+        """
+        Reads a processed table in its compact types.
+
+        Args:
+            path (str): Path of the table without file extension.
+            columns (list, optional): Columns to load; all if not given.
+
+        Returns:
+            pandas.DataFrame: The compact table.
+        """
+        return self.compact(read_table(path, columns=columns), compact_schema(path))
+
+    def write(self, df, path, format=None):
+        """
+        Writes a compact table in the plain types of ``storage.write_table``.
+        """
+        write_table(apply_schema(expand_frame(df), table_schema(path)), path, format)
+
+
+def compact_schema(path):
+    """
+    Returns the compact schema of a processed table.
+    """
+    return COMPACT_SCHEMAS.get(table_name(path), {})
+
+def memory_usage(df, shared=()):
+    """
+    Returns the memory a DataFrame takes, including its Python objects, in bytes.
+
+    Args:
+        df (pandas.DataFrame): Table to measure.
+        shared (iterable): Category indexes shared with other tables, such as
+            the domains of a ``CompactLoader``. Columns using them only count
+            their codes.
+    """
+    shared = [id(categories) for categories in shared]
+    total = 0
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype) and id(values.cat.categories) in shared:
+            total += values.cat.codes.nbytes
+        else:
+            total += values.memory_usage(deep=True, index=False)
+    return int(total)
+
+def memory_report(directory=PROCESSED_DIR):
+    """
+    Compares the memory of every processed table in plain and compact types.
+
+    Args:
+        directory (str): Directory of the processed tables.
+
+    Returns:
+        pandas.DataFrame: Rows, plain and compact size in MiB and the ratio
+        of the two, per table. The key domains shared by all compact tables
+        are reported as tables of their own.
+    """
+    loader = CompactLoader(directory)
+    records = []
+    paths = list_tables(directory)
+    for subdirectory in ['stats', 'salaries']:
+        paths += list_tables(os.path.join(directory, subdirectory))
+
+    for path in paths:
+        plain = read_table(path)
+        compact = loader.compact(plain, compact_schema(path))
+        records.append({
+            'table': os.path.relpath(path, directory),
+            'rows': len(plain),
+            'plain_mib': memory_usage(plain) / 2 ** 20,
+            'compact_mib': memory_usage(compact, loader.categories.values()) / 2 ** 20,
+        })
+    for name, categories in loader.categories.items():
+        records.append({
+            'table': f'domain:{name}',
+            'rows': len(categories),
+            'plain_mib': 0.0,
+            'compact_mib': categories.memory_usage(deep=True) / 2 ** 20,
+        })
+
+    report = pd.DataFrame(records)
+    report['ratio'] = (report['plain_mib'] / report['compact_mib']).where(report['plain_mib'] > 0)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reports the memory of the processed tables.')
+    parser.add_argument('--directory', default=PROCESSED_DIR, help='directory of the processed tables')
+    args = parser.parse_args()
+
+    print(memory_report(args.directory).to_string(index=False, float_format='{:.3f}'.format))
@@ -0,0 +1,240 @@
+import argparse
+import os
+import sqlite3
+
+import pandas as pd
+
+from paths import PROCESSED_DIR
+from star_schema import read_seasons
+from storage import SCHEMAS, read_table
+
+DATABASE_PATH = os.path.join(PROCESSED_DIR, 'integrated.sqlite')
+
+# Processed table each database table is loaded from; the stats and salaries
+# directories hold one table per season
+SOURCES = {
+    'teams': 'teams_with_uuid',
+    'champions': 'champions_with_team_ids',
+    'players': 'unique_players',
+    'stats': 'stats',
+    'salaries': 'salaries',
+}
+
+# SQLite column types of the pandas types in storage.SCHEMAS
+SQL_TYPES = {
+    'string': 'TEXT',
+    'int64': 'INTEGER',
+    'float64': 'REAL',
+}
+
+INDEXES = {
+    'teams': [['uuid']],
+    'champions': [['champion_uuid', 'year']],
+    'players': [['uuid']],
+    'stats': [['player_uuid', 'season'], ['team_uuid', 'season'], ['season']],
+    'salaries': [['player_uuid', 'season'], ['season']],
+}
+
+# Views of the common joins. player_seasons is the fact table of
+# star_schema.build_fact_table: the first stats and salary row of every linked
+# player and season, with the names of the player and team and whether the
+# team won its conference that season.
+VIEWS = {
+    'player_seasons': '''
+        SELECT sa.salary_in_usd, st.*, p.NAME, t.name AS team,
+               EXISTS (SELECT 1 FROM champions c
+                       WHERE c.champion_uuid = st.team_uuid
+                         AND c.year = CAST(substr(st.season, 1, 4) AS INTEGER)) AS won_conference
+        FROM stats st
+        JOIN salaries sa ON sa.player_uuid = st.player_uuid AND sa.season = st.season
+        LEFT JOIN players p ON p.uuid = st.player_uuid
+        LEFT JOIN teams t ON t.uuid = st.team_uuid
+        WHERE st.player_uuid != ''
+          AND st.rowid IN (SELECT min(rowid) FROM stats GROUP BY player_uuid, season)
+          AND sa.rowid IN (SELECT min(rowid) FROM salaries GROUP BY player_uuid, season)
+    ''',
+    'team_titles': '''
+        SELECT c.year, c.region, c.champion_uuid AS team_uuid, t.name AS team
+        FROM champions c
+        JOIN teams t ON t.uuid = c.champion_uuid
+    ''',
+}
+
+# Rows per batch of INSERT statements
+BATCH_SIZE = 10000
+
+
+def quote(identifier):
+    """
+    Quotes a column or table name, e.g. ``"USG%"``.
+    """
+    return '"' + identifier.replace('"', '""') + '"'
+
+def read_source(directory, table):
+    """
+    Reads the processed table a database table is loaded from; season
+    tables are read together and get a "season" column (e.g. "2019-2020").
+    """
+    source = SOURCES[table]
+    if os.path.isdir(os.path.join(directory, source)):
+        return read_seasons(os.path.join(directory, source))
+    return read_table(os.path.join(directory, source))
+
+def create_table(connection, table, df):
+    """
+    Creates a table for the columns of a DataFrame, typed by ``storage.SCHEMAS``.
+    """
+    schema = SCHEMAS.get(SOURCES[table], {})
+    columns = []
+    for column in df.columns:
+        if column in schema:
+            sql_type = SQL_TYPES[schema[column]]
+        elif pd.api.types.is_integer_dtype(df[column]):
+            sql_type = 'INTEGER'
+        elif pd.api.types.is_float_dtype(df[column]):
+            sql_type = 'REAL'
+        else:
+            sql_type = 'TEXT'
+        columns.append(f'{quote(column)} {sql_type}')
+    connection.execute(f'DROP TABLE IF EXISTS {quote(table)}')
+    connection.execute(f'CREATE TABLE {quote(table)} ({", ".join(columns)})')
+
+def insert_rows(connection, table, df, batch_size=BATCH_SIZE):
+    """
+    Inserts the rows of a DataFrame in batches; missing values become NULL.
+    """
+    statement = (f'INSERT INTO {quote(table)} ({", ".join(quote(column) for column in df.columns)}) '
+                 f'VALUES ({", ".join("?" * len(df.columns))})')
+    values = df.astype(object).where(df.notna(), None)
+    for start in range(0, len(values), batch_size):
+        connection.executemany(statement, values.iloc[start:start + batch_size].itertuples(index=False, name=None))
+
+def load_database(directory=PROCESSED_DIR, path=DATABASE_PATH):
+    """
+    Loads the processed tables into a SQLite database, replacing its content.
+
+    All tables are loaded in one transaction, so readers see either the old
+    or the new data. Indexes are built after the rows are inserted.
+
+    Args:
+        directory (str): Directory of the processed tables.
+        path (str): SQLite file of the database; created if missing.
+
+    Returns:
+        dict: Number of rows loaded per table.
+    """
+    tables = {table: read_source(directory, table) for table in SOURCES}
+
+    connection = sqlite3.connect(path)
+    try:
+        with connection:
+            for view in VIEWS:
+                connection.execute(f'DROP VIEW IF EXISTS {quote(view)}')
+            for table, df in tables.items():
+                create_table(connection, table, df)
+                insert_rows(connection, table, df)
+                for columns in INDEXES[table]:
+                    connection.execute(
+                        f'CREATE INDEX {quote("_".join([table] + columns))} '
+                        f'ON {quote(table)} ({", ".join(quote(column) for column in columns)})')
+            for view, select in VIEWS.items():
+                connection.execute(f'CREATE VIEW {quote(view)} AS {select}')
+        connection.execute('ANALYZE')
+    finally:
+        connection.close()
+    return {table: len(df) for table, df in tables.items()}
+
+
+class IntegratedStore:
+    """
+    Read access to the database built by ``load_database``.
+
+    Lookups by player, team or season use the indexes of the database
+    instead of scanning the processed files.
+    """
+
+    def __init__(self, path=DATABASE_PATH):
+        """
+        Args:
+            path (str): SQLite file of the database.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'No database at {path}; build it with database.py first')
+        self.connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+
+    def query(self, sql, params=()):
+        """
+        Runs a SELECT statement.
+
+        Returns:
+            pandas.DataFrame: The rows of the result.
+        """
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def columns(self, table):
+        """
+        Returns the columns of a table or view.
+        """
+        return [row[1] for row in self.connection.execute(f'PRAGMA table_info({quote(table)})')]
+
+    def table(self, table, columns=None, **filters):
+        """
+        Selects rows of a table or view.
+
+        Args:
+            table (str): Name of the table or view, e.g. "stats" or "player_seasons".
+            columns (list, optional): Columns to return; all if not given.
+            **filters: Column values the rows must have, e.g. ``season='2019-2020'``.
+                A list or tuple matches any of its values.
+
+        Returns:
+            pandas.DataFrame: The matching rows.
+        """
+        known = self.columns(table)
+        if not known:
+            raise KeyError(f'Unknown table {table!r}')
+        unknown = [column for column in list(columns or []) + list(filters) if column not in known]
+        if unknown:
+            raise KeyError(f'Unknown columns of {table!r}: {unknown}')
+
+        conditions, params = [], []
+        for column, value in filters.items():
+            if isinstance(value, (list, tuple)):
+                conditions.append(f'{quote(column)} IN ({", ".join("?" * len(value))})')
+                params.extend(value)
+            else:
+                conditions.append(f'{quote(column)} = ?')
+                params.append(value)
+        select = ', '.join(quote(column) for column in columns) if columns else '*'
+        sql = f'SELECT {select} FROM {quote(table)}'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        return self.query(sql, params)
+
+    def player_seasons(self, columns=None, **filters):
+        """
+        Selects rows of the fact table of players and seasons, see ``table``.
+        """
+        df = self.table('player_seasons', columns, **filters)
+        if 'won_conference' in df.columns:
+            df['won_conference'] = df['won_conference'].astype(bool)
+        return df
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Loads the processed tables into a SQLite database.')
+    parser.add_argument('--directory', default=PROCESSED_DIR, help='directory of the processed tables')
+    parser.add_argument('--output', default=DATABASE_PATH, help='SQLite file of the database')
+    args = parser.parse_args()
+
+    counts = load_database(args.directory, args.output)
+    print(f'Loaded {args.output}: ' + ', '.join(f'{table} ({rows} rows)' for table, rows in counts.items()))
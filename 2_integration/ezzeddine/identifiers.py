@@ -0,0 +1,52 @@
+import unicodedata
+import uuid
+
+# Namespace of the uuids of the integrated entities. Changing it changes
+# every key in the processed tables.
+NAMESPACE = uuid.UUID('5b0c3f4e-7f1a-4d2b-9a86-3c1e0d9b2f17')
+
+
+def normalize_key(value):
+    """
+    Normalizes one part of a natural key: Unicode composition and runs of
+    whitespace do not change the key, e.g. "LeBron  James " is "LeBron James".
+    """
+    return ' '.join(unicodedata.normalize('NFC', str(value)).split())
+
+def entity_uuid(entity, *key):
+    """
+    Derives the uuid of an entity from its natural key.
+
+    The uuid is a uuid5 of the entity type and the normalized key, so the
+    same team, player or row gets the same uuid in every run.
+
+    Args:
+        entity (str): Type of the entity, e.g. "team" or "player".
+        *key: Parts of the natural key, e.g. the season and the player name.
+
+    Returns:
+        str: The uuid.
+    """
+    # The unit separator can't be part of a name, so the parts stay apart
+    return str(uuid.uuid5(NAMESPACE, '\x1f'.join([entity] + [normalize_key(part) for part in key])))
+
+def entity_uuids(entity, *columns):
+    """
+    Derives the uuids of the rows of a table, see ``entity_uuid``.
+
+    Args:
+        entity (str): Type of the entities.
+        *columns (array-like): Columns of the natural key, aligned.
+
+    Returns:
+        list: The uuid of every row.
+    """
+    return [entity_uuid(entity, *key) for key in zip(*columns)]
+
+def occurrences(values):
+    """
+    Numbers the repeated values of a column, so rows with the same natural key
+    still get distinct uuids: 0 for the first row of a value, 1 for the
+    second, and so on.
+    """
+    return values.groupby(values.fillna('').astype(str), sort=False).cumcount()
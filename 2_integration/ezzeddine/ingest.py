@@ -0,0 +1,77 @@
+import glob
+import hashlib
+import os
+
+import pandas as pd
+
+from pipeline import file_hash
+from storage import STAT_COLUMNS
+
+# Text columns of the stat workbooks
+TEXT_COLUMNS = {'FULL NAME': str, 'NAME': str, 'TEAM': str, 'POS': str}
+
+# Statistics that are whole numbers in every season. They are read as
+# nullable integers, so they are written as integers like in the CSV season.
+INTEGER_COLUMNS = ['RANK', 'AGE', 'GP']
+
+# Numeric columns of the stat workbooks, by their short names; they are read
+# with these types in every workbook instead of the type inferred from its cells
+NUMERIC_COLUMNS = {column: 'Int64' if column in INTEGER_COLUMNS else 'float64' for column in STAT_COLUMNS}
+
+
+def workbook_dtypes(column_mapping):
+    """
+    Returns the types of the columns of a workbook, keyed by the names in the
+    workbook as well as by the short names they are renamed to.
+    """
+    dtypes = dict(TEXT_COLUMNS, **NUMERIC_COLUMNS)
+    for column, short in column_mapping.items():
+        if short in dtypes:
+            dtypes[column] = dtypes[short]
+    return dtypes
+
+
+def read_workbook(path, cache_dir, column_mapping=None, skiprows=0):
+    """
+    Reads an Excel workbook through a columnar cache.
+
+    The first read parses the workbook with openpyxl, renames its columns and
+    stores the result as Parquet. Later reads load the Parquet file as long as
+    the workbook's content and the reading options are unchanged.
+
+    Args:
+        path (str): Path of the workbook.
+        cache_dir (str): Directory holding the cached conversions.
+        column_mapping (dict, optional): Maps workbook column names to short
+            names. Columns mapped to a name containing "*" are never loaded.
+        skiprows (int): Rows to skip above the header.
+
+    Returns:
+        pandas.DataFrame: The first sheet of the workbook.
+    """
+    column_mapping = column_mapping or {}
+    dtypes = workbook_dtypes(column_mapping)
+    options = repr((sorted(column_mapping.items()), skiprows,
+                    sorted((column, str(dtype)) for column, dtype in dtypes.items())))
+    key = hashlib.sha256((file_hash(path) + options).encode('utf-8')).hexdigest()[:16]
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cached = os.path.join(cache_dir, f'{stem}-{key}.parquet')
+    if os.path.exists(cached):
+        df = pd.read_parquet(cached)
+        return df.astype({column: dtypes[column] for column in df.columns if column in dtypes})
+
+    df = pd.read_excel(
+        path,
+        skiprows=skiprows,
+        usecols=lambda column: '*' not in column_mapping.get(column, column),
+        dtype=dtypes,
+    )
+    df = df.rename(columns=column_mapping)
+
+    # Replace conversions of earlier versions of the workbook
+    os.makedirs(cache_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(glob.escape(cache_dir), glob.escape(stem) + '-*.parquet')):
+        os.remove(stale)
+    df.to_parquet(cached, index=False)
+    return df
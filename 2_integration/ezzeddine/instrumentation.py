@@ -0,0 +1,189 @@
+import contextlib
+import copy
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Instrumentation is off unless a log or profile destination is configured,
+# either with the INTEGRATION_LOG ("-" for stderr) and INTEGRATION_PROFILE_DIR
+# environment variables or with ``configure``. Disabled stages only check this
+# flag, so they cost next to nothing.
+ENABLED = False
+
+# Counters incremented by the instrumented code, e.g. the number of
+# edit-distance evaluations. Stages report how much they grew while running.
+counters = Counter()
+
+_log_path = None
+_profile_dir = None
+_profiler = 'cprofile'
+_profiling = False
+_profile_numbers = itertools.count()
+
+
+def configure(log=None, profile_dir=None, profiler=None):
+    """
+    Enables or disables the instrumentation.
+
+    Args:
+        log (str, optional): File the JSON records are appended to, one per
+            line, or "-" for stderr.
+        profile_dir (str, optional): Directory to dump a profile of every
+            top-level stage to. Instrumentation is disabled if neither this
+            nor ``log`` is given.
+        profiler (str, optional): "cprofile" (default) or "pyinstrument".
+    """
+    global ENABLED, _log_path, _profile_dir, _profiler, _profiling
+    _log_path = log or None
+    _profile_dir = profile_dir or None
+    _profiler = profiler or 'cprofile'
+    ENABLED = _log_path is not None or _profile_dir is not None
+    _profiling = False
+    counters.clear()
+
+def settings():
+    """
+    Returns the arguments of ``configure`` currently in effect, to configure
+    worker processes the same way.
+    """
+    return {'log': _log_path, 'profile_dir': _profile_dir, 'profiler': _profiler}
+
+def count(name, n=1):
+    """
+    Increments a counter; does nothing while the instrumentation is disabled.
+    """
+    if ENABLED:
+        counters[name] += n
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of this process and its finished child
+    processes in MiB, or None where it is not available.
+    """
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+def emit(record):
+    """
+    Writes one structured record to the log.
+    """
+    if _log_path is None:
+        return
+    line = json.dumps(record, default=str)
+    if _log_path == '-':
+        print(line, file=sys.stderr, flush=True)
+    else:
+        # Workers of the process pools append to the same file; single short
+        # appends don't interleave.
+        with open(_log_path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+class stage(contextlib.ContextDecorator):
+    """
+    Times a stage of the pipeline, as a context manager or a decorator.
+
+    On exit, one JSON record is logged with the wall time, the rows going in
+    and out, the peak RSS and the counters incremented during the stage::
+
+        with stage('stats.load', season=season) as s:
+            df = pd.read_csv(path)
+            s.rows_out = len(df)
+    """
+
+    def __init__(self, name, **fields):
+        """
+        Args:
+            name (str): Name of the stage, e.g. "stats.link".
+            **fields: Extra values to log with the record, e.g. the season.
+        """
+        self.name = name
+        self.fields = fields
+        self.rows_in = None
+        self.rows_out = None
+
+    def _recreate_cm(self):
+        # A fresh copy per call, so decorated functions can nest and recurse
+        return copy.copy(self)
+
+    def __enter__(self):
+        if not ENABLED:
+            return self
+        self._counters = counters.copy()
+        self._profile = self._start_profile()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if not ENABLED or not hasattr(self, '_start'):
+            return False
+        seconds = time.perf_counter() - self._start
+        self._stop_profile()
+
+        record = {
+            'event': 'stage',
+            'stage': self.name,
+            'seconds': round(seconds, 6),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'peak_rss_mb': peak_rss_mb(),
+            'counters': dict(counters - self._counters),
+            'pid': os.getpid(),
+            'ok': exc_type is None,
+        }
+        if self.rows_out and seconds > 0:
+            record['rows_per_second'] = round(self.rows_out / seconds, 1)
+        record.update(self.fields)
+        emit(record)
+        return False
+
+    def _start_profile(self):
+        global _profiling
+        # Only one profiler can be active, so nested stages are covered by
+        # the profile of the outermost one.
+        if _profile_dir is None or _profiling:
+            return None
+        if _profiler == 'pyinstrument':
+            import pyinstrument
+            profile = pyinstrument.Profiler()
+            profile.start()
+        else:
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
+        _profiling = True
+        return profile
+
+    def _stop_profile(self):
+        global _profiling
+        if self._profile is None:
+            return
+        os.makedirs(_profile_dir, exist_ok=True)
+        # Workers run the same stage for several seasons, so every dump is numbered
+        label = '-'.join([self.name] + [str(value) for value in self.fields.values()]
+                         + [str(os.getpid()), str(next(_profile_numbers))])
+        path = os.path.join(_profile_dir, label)
+        if _profiler == 'pyinstrument':
+            self._profile.stop()
+            with open(path + '.html', 'w', encoding='utf-8') as f:
+                f.write(self._profile.output_html())
+        else:
+            self._profile.disable()
+            self._profile.dump_stats(path + '.prof')
+        _profiling = False
+
+
+configure(os.environ.get('INTEGRATION_LOG'), os.environ.get('INTEGRATION_PROFILE_DIR'),
+          os.environ.get('INTEGRATION_PROFILER'))
@@ -0,0 +1,179 @@
+import argparse
+import functools
+import importlib
+import os
+import sys
+
+import instrumentation
+from database import DATABASE_PATH, load_database
+from paths import CLEANED_DIR, DATASETS_DIR, PROCESSED_DIR
+from pipeline import Pipeline, Stage
+from storage import FORMATS, INCREMENTAL, has_table, read_partitions, read_table
+
+# The integration scripts start with digits and can't be imported by name
+teams_champs = importlib.import_module('0_integrate_teams_champs')
+players_stats = importlib.import_module('1_integrate_teams_and_players_stats')
+players_salaries = importlib.import_module('2_integrate_players_and_salaries')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '3_cleaning'))
+import clean
+
+match_cache_path = os.path.join(PROCESSED_DIR, 'match_cache.sqlite')
+
+# Tables written by each stage, relative to the output directory
+TEAMS_CHAMPS_TABLES = ['teams_with_uuid', 'champions_with_team_ids']
+STATS_TABLES = ['unique_players'] + [os.path.join('stats', f'stats_{season}')
+                                     for season in players_stats.stats_files]
+SALARIES_TABLES = [os.path.join('salaries', f'salaries_{season}')
+                   for season in players_salaries.salary_seasons]
+
+
+def tables_exist(directory, tables):
+    return all(has_table(os.path.join(directory, table)) for table in tables)
+
+def cleaned_exist():
+    return (tables_exist(CLEANED_DIR, TEAMS_CHAMPS_TABLES + STATS_TABLES + SALARIES_TABLES)
+            and os.path.exists(os.path.join(CLEANED_DIR, 'validation_report.csv')))
+
+def run_teams_champs():
+    teams, champions = teams_champs.integrate_teams_champs(*teams_champs.load_teams_champs())
+    return {'teams': teams, 'champions': champions}
+
+def read_teams_champs():
+    return {
+        'teams': read_table(os.path.join(PROCESSED_DIR, 'teams_with_uuid')),
+        'champions': read_table(os.path.join(PROCESSED_DIR, 'champions_with_team_ids')),
+    }
+
+def run_stats(teams, processes=None, incremental=False):
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    linked = None
+    if incremental:
+        linked = read_partitions(os.path.join(PROCESSED_DIR, 'stats'), 'stats', players_stats.stats_files)
+    unique_players, stats = players_stats.integrate_stats(
+        players_stats.load_stats(), teams, cache_path=match_cache_path, processes=processes,
+        titles=players_stats.load_titles(), linked=linked)
+    return {'unique_players': unique_players, 'stats': stats}
+
+def read_stats():
+    return {
+        'unique_players': read_table(os.path.join(PROCESSED_DIR, 'unique_players')),
+        'stats': {season: read_table(os.path.join(PROCESSED_DIR, 'stats', f'stats_{season}'))
+                  for season in players_stats.stats_files},
+    }
+
+def run_salaries(unique_players, processes=None, incremental=False):
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+    salaries = players_salaries.load_salaries()
+    written = {}
+    if incremental:
+        written = read_partitions(os.path.join(PROCESSED_DIR, 'salaries'), 'salaries', salaries)
+    integrated = players_salaries.integrate_salaries(
+        {season: df for season, df in salaries.items() if season not in written}, unique_players,
+        cache_path=match_cache_path, processes=processes)
+    return {'salaries': {season: written[season] if season in written else integrated[season]
+                         for season in salaries}}
+
+def read_salaries():
+    return {
+        'salaries': {season: read_table(os.path.join(PROCESSED_DIR, 'salaries', f'salaries_{season}'))
+                     for season in players_salaries.salary_seasons},
+    }
+
+def run_cleaning(teams, champions, unique_players, stats, salaries):
+    # Keyed and ordered like the processed files in clean.list_processed_tables
+    tables = {'champions_with_team_ids': champions, 'teams_with_uuid': teams, 'unique_players': unique_players}
+    tables.update({os.path.join('stats', f'stats_{season}'): df for season, df in stats.items()})
+    tables.update({os.path.join('salaries', f'salaries_{season}'): df for season, df in salaries.items()})
+    cleaned, report = clean.clean_frames(tables)
+    return {'cleaned': cleaned, 'validation_report': report}
+
+def read_cleaning():
+    cleaned, report = clean.read_cleaned(CLEANED_DIR)
+    return {'cleaned': cleaned, 'validation_report': report}
+
+def build_pipeline(processes=None, format=None, incremental=False):
+    """
+    Wires the integration scripts 0, 1 and 2 and the cleaning of their
+    outputs into one pipeline.
+
+    Args:
+        processes (int, optional): Number of processes linking the seasons of
+            the stats and salaries in parallel; one per core if None.
+        format (str, optional): Output format, see ``storage.FORMATS``.
+        incremental (bool): Only link and write the seasons of the stats and
+            salaries that have no file yet; the others are read back as they are.
+
+    Returns:
+        Pipeline: Pipeline producing the datasets "teams", "champions",
+        "unique_players", "stats", "salaries", and the "cleaned" tables with
+        their "validation_report".
+    """
+    return Pipeline([
+        Stage(
+            'teams_champs', run_teams_champs,
+            outputs=('teams', 'champions'),
+            sources=(os.path.join(DATASETS_DIR, 'teams.csv'),
+                     os.path.join(DATASETS_DIR, 'teams_won_titles.csv')),
+            write=lambda teams, champions: teams_champs.save_teams_champs(teams, champions, format),
+            read=read_teams_champs,
+            exists=functools.partial(tables_exist, PROCESSED_DIR, TEAMS_CHAMPS_TABLES),
+        ),
+        Stage(
+            'stats', functools.partial(run_stats, processes=processes, incremental=incremental),
+            inputs=('teams',),
+            outputs=('unique_players', 'stats'),
+            sources=tuple(os.path.join(DATASETS_DIR, path)
+                          for path in players_stats.stats_files.values())
+                    + (os.path.join(DATASETS_DIR, 'teams_won_titles.csv'),),
+            write=lambda unique_players, stats: players_stats.save_stats(unique_players, stats, format, incremental),
+            read=read_stats,
+            exists=functools.partial(tables_exist, PROCESSED_DIR, STATS_TABLES),
+        ),
+        Stage(
+            'salaries', functools.partial(run_salaries, processes=processes, incremental=incremental),
+            inputs=('unique_players',),
+            outputs=('salaries',),
+            sources=tuple(os.path.join(DATASETS_DIR, 'salaries', f"players_slaries_{season.replace('_', '-')}.csv")
+                          for season in players_salaries.salary_seasons),
+            write=lambda salaries: players_salaries.save_salaries(salaries, format, incremental),
+            read=read_salaries,
+            exists=functools.partial(tables_exist, PROCESSED_DIR, SALARIES_TABLES),
+        ),
+        Stage(
+            'cleaning', run_cleaning,
+            inputs=('teams', 'champions', 'unique_players', 'stats', 'salaries'),
+            outputs=('cleaned', 'validation_report'),
+            write=lambda cleaned, validation_report: clean.write_cleaned(
+                cleaned, validation_report, CLEANED_DIR, format),
+            read=read_cleaning,
+            exists=cleaned_exist,
+        ),
+    ], state_path=os.path.join(PROCESSED_DIR, 'pipeline_state.json'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs the integration scripts 0, 1 and 2 and the cleaning in one process.')
+    parser.add_argument('--force', action='store_true', help='run every stage, even if its inputs are unchanged')
+    parser.add_argument('--no-write', action='store_true', help='do not write the outputs to 0_datasets/processed and cleaned')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='link the seasons in parallel with this many processes (default: one per core, 1: serial)')
+    parser.add_argument('--format', choices=sorted(FORMATS), default=None,
+                        help='format of the outputs (default: csv, or $INTEGRATION_FORMAT)')
+    parser.add_argument('--incremental', action='store_true', default=INCREMENTAL,
+                        help='only add the seasons that have no output yet (default: $INTEGRATION_INCREMENTAL)')
+    parser.add_argument('--log', default=os.environ.get('INTEGRATION_LOG'),
+                        help='append a JSON record per stage to this file ("-": stderr)')
+    parser.add_argument('--profile-dir', default=os.environ.get('INTEGRATION_PROFILE_DIR'),
+                        help='dump a profile of every top-level stage to this directory')
+    parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'],
+                        default=os.environ.get('INTEGRATION_PROFILER'), help='profiler of --profile-dir')
+    parser.add_argument('--database', nargs='?', const=DATABASE_PATH, default=None,
+                        help='load the outputs into this SQLite database afterwards')
+    args = parser.parse_args()
+
+    instrumentation.configure(args.log, args.profile_dir, args.profiler)
+    build_pipeline(processes=args.processes or None, format=args.format,
+                   incremental=args.incremental).run(targets=[], materialize=not args.no_write, force=args.force)
+    if args.database and not args.no_write:
+        load_database(PROCESSED_DIR, args.database)
@@ -0,0 +1,595 @@
+import argparse
+import concurrent.futures
+import csv
+import functools
+import heapq
+import itertools
+import multiprocessing
+import os
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+import openpyxl
+import pandas as pd
+
+import instrumentation
+from paths import DATASETS_DIR
+from storage import read_spilled, spill
+
+# Rows flowing out of a step: the names of their fields, an iterator over the
+# rows as tuples, and the fields that compare case-insensitively, as marked
+# by a SortRows step
+Stream = namedtuple('Stream', ['fields', 'rows', 'folded'])
+
+
+def kettle_basename(name):
+    """
+    Returns the file name of a path written on any platform, e.g.
+    ``2019-2020.xls`` for ``C:\\Users\\...\\stats\\2019-2020.xls``.
+    """
+    return name.replace('\\', '/').rstrip('/').split('/')[-1]
+
+def flag(element, tag):
+    """
+    Returns whether a Y/N option of a step is set.
+    """
+    return (element.findtext(tag) or 'N').upper() == 'Y'
+
+def unique_name(name, fields):
+    """
+    Renames a field whose name is already taken the way Kettle does:
+    NAME, NAME_1, NAME_2, ...
+    """
+    if name not in fields:
+        return name
+    number = 1
+    while f'{name}_{number}' in fields:
+        number += 1
+    return f'{name}_{number}'
+
+def unique_names(names):
+    fields = []
+    for name in names:
+        fields.append(unique_name(name, fields))
+    return fields
+
+def convert(value, kettle_type, step, field):
+    """
+    Converts a value read from a file to the type of its field; '' and
+    missing values become None.
+    """
+    if value is None or value == '':
+        return None
+    try:
+        if kettle_type == 'Integer':
+            return int(float(value.replace(',', '')) if isinstance(value, str) else value)
+        if kettle_type == 'Number':
+            return float(value.replace(',', '')) if isinstance(value, str) else float(value)
+    except ValueError:
+        raise ValueError(f'Step {step!r}: {value!r} in field {field!r} is no {kettle_type}') from None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def format_value(value):
+    return '' if value is None else str(value)
+
+
+class FileResolver:
+    """
+    Maps the file names in the transformations, which are absolute paths on
+    the machine they were designed on, to local files.
+
+    Input files are looked up by their file name: first in ``files``, then in
+    the output directory, where earlier transformations wrote them, and then
+    in the search directories. Excel files are also found under the other of
+    the extensions .xls and .xlsx.
+    """
+
+    def __init__(self, output_dir=DATASETS_DIR, search_dirs=None, files=None):
+        """
+        Args:
+            output_dir (str): Directory the output steps write to.
+            search_dirs (list, optional): Directories to look for input files
+                in; the datasets directory and its stats and salaries
+                directories by default.
+            files (dict, optional): Maps file names, as in the
+                transformations, to local paths.
+        """
+        self.output_dir = output_dir
+        if search_dirs is None:
+            search_dirs = [DATASETS_DIR, os.path.join(DATASETS_DIR, 'stats'),
+                           os.path.join(DATASETS_DIR, 'salaries')]
+        self.search_dirs = list(search_dirs)
+        self.files = files or {}
+
+    def input(self, name):
+        basename = kettle_basename(name)
+        if basename in self.files:
+            return self.files[basename]
+
+        stem, extension = os.path.splitext(basename)
+        candidates = [basename]
+        if extension.lower() in ('.xls', '.xlsx'):
+            candidates.append(stem + ('.xlsx' if extension.lower() == '.xls' else '.xls'))
+        for directory in [self.output_dir] + self.search_dirs:
+            for candidate in candidates:
+                path = os.path.join(directory, candidate)
+                if os.path.exists(path):
+                    return path
+        raise FileNotFoundError(f'No local file for {name!r}; map it with --file "{basename}=PATH"')
+
+    def output(self, name, extension):
+        return os.path.join(self.output_dir, kettle_basename(name) + ('.' + extension if extension else ''))
+
+
+def read_fields(step):
+    return [(field.findtext('name'), field.findtext('type') or 'String', field.findtext('nullif') or None)
+            for field in step.find('fields').findall('field')]
+
+def file_names(step):
+    # A <file> element can hold several files; empty names are placeholders
+    return [name.text for name in step.find('file').findall('name') if name.text]
+
+def excel_input(step, inputs, resolver):
+    fields = read_fields(step)
+    names = unique_names([name for name, _, _ in fields])
+    sheets = [(sheet.findtext('name'), int(sheet.findtext('startrow') or 0), int(sheet.findtext('startcol') or 0))
+              for sheet in step.find('sheets').findall('sheet')] if step.find('sheets') is not None else []
+    limit = int(step.findtext('limit') or 0)
+
+    def rows():
+        count = 0
+        for name in file_names(step):
+            path = resolver.input(name)
+            for sheet, start_row, start_col in sheets or [(None, 0, 0)]:
+                for number, values in enumerate(excel_rows(path, sheet)):
+                    if number < start_row + flag(step, 'header'):
+                        continue
+                    values = list(values[start_col:start_col + len(fields)])
+                    values += [None] * (len(fields) - len(values))
+                    if flag(step, 'noempty') and all(value is None or value == '' for value in values):
+                        continue
+                    yield tuple(convert(value, kettle_type, step.findtext('name'), field)
+                                for value, (field, kettle_type, _) in zip(values, fields))
+                    count += 1
+                    if limit and count >= limit:
+                        return
+
+    return Stream(names, rows(), frozenset())
+
+def excel_rows(path, sheet=None):
+    """
+    Iterates over the rows of a worksheet without loading the whole workbook.
+    """
+    if path.lower().endswith('.xls'):
+        # Old .xls workbooks are read through pandas, which needs xlrd for them
+        df = pd.read_excel(path, sheet_name=sheet or 0, header=None, dtype=object)
+        for values in df.itertuples(index=False, name=None):
+            yield tuple(None if value != value else value for value in values)
+        return
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        yield from worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def text_file_input(step, inputs, resolver):
+    fields = read_fields(step)
+    names = unique_names([name for name, _, _ in fields])
+    header_lines = int(step.findtext('nr_headerlines') or 1) if flag(step, 'header') else 0
+    limit = int(step.findtext('limit') or 0)
+
+    def rows():
+        count = 0
+        for name in file_names(step):
+            with open(resolver.input(name), newline='', encoding=step.findtext('encoding') or 'utf-8-sig') as f:
+                reader = csv.reader(f, delimiter=step.findtext('separator') or ',',
+                                    quotechar=step.findtext('enclosure') or '"')
+                for values in itertools.islice(reader, header_lines, None):
+                    if flag(step, 'noempty') and not any(values):
+                        continue
+                    values += [None] * (len(fields) - len(values))
+                    yield tuple(None if nullif is not None and value == nullif
+                                else convert(value, kettle_type, step.findtext('name'), field)
+                                for value, (field, kettle_type, nullif) in zip(values, fields))
+                    count += 1
+                    if limit and count >= limit:
+                        return
+
+    return Stream(names, rows(), frozenset())
+
+def select_values(step, inputs, resolver):
+    (stream,) = inputs
+    definition = step.find('fields')
+    positions = {name: position for position, name in reversed(list(enumerate(stream.fields)))}
+
+    def position(name):
+        if name not in positions:
+            raise ValueError(f'Step {step.findtext("name")!r}: no field {name!r} in its input')
+        return positions[name]
+
+    # Select and rename, then remove, then rename in the metadata tab
+    selected = [(position(field.findtext('name')), field.findtext('rename') or field.findtext('name'))
+                for field in definition.findall('field')]
+    if not selected:
+        selected = list(enumerate(stream.fields))
+    elif flag(definition, 'select_unspecified'):
+        chosen = {index for index, _ in selected}
+        selected += [(index, name) for index, name in enumerate(stream.fields) if index not in chosen]
+
+    removed = {field.findtext('name') for field in definition.findall('remove')}
+    for name in removed:
+        position(name)
+    selected = [(index, name) for index, name in selected if name not in removed]
+
+    renames = {meta.findtext('name'): meta.findtext('rename') for meta in definition.findall('meta')
+               if meta.findtext('rename')}
+    indexes = [index for index, _ in selected]
+    fields = unique_names([renames.get(name, name) for _, name in selected])
+    folded = frozenset(field for (index, _), field in zip(selected, fields)
+                       if stream.fields[index] in stream.folded)
+
+    getter = lambda row: tuple(row[index] for index in indexes)
+    return Stream(fields, map(getter, stream.rows), folded)
+
+def sort_key(value, folded):
+    # Missing values sort first, as in Kettle
+    if value is None:
+        return (0, '')
+    return (1, value.casefold() if folded and isinstance(value, str) else value)
+
+def compare_rows(keys, left, right):
+    for index, ascending, folded in keys:
+        a, b = sort_key(left[index], folded), sort_key(right[index], folded)
+        if a != b:
+            return (-1 if a < b else 1) * (1 if ascending else -1)
+    return 0
+
+def sort_rows(step, inputs, resolver):
+    (stream,) = inputs
+    definition = [(field.findtext('name'), flag(field, 'ascending'), not flag(field, 'case_sensitive'))
+                  for field in step.find('fields').findall('field')]
+    keys = [(stream.fields.index(name), ascending, folded) for name, ascending, folded in definition]
+    key = functools.cmp_to_key(functools.partial(compare_rows, keys))
+    sort_size = int(step.findtext('sort_size') or 1000000)
+    directory = step.findtext('directory') or ''
+    directory = None if directory.startswith('%%') else directory
+
+    def rows():
+        # External merge sort: sorted runs of sort_size rows are spilled to
+        # temporary files and merged; smaller inputs are sorted in memory
+        runs, buffer = [], []
+        for row in stream.rows:
+            buffer.append(row)
+            if len(buffer) >= sort_size:
+                runs.append(spill(sorted(buffer, key=key), directory))
+                buffer = []
+        buffer.sort(key=key)
+        merged = heapq.merge(*[read_spilled(run) for run in runs], buffer, key=key) if runs else buffer
+
+        previous = None
+        for row in merged:
+            if flag(step, 'unique_rows') and previous is not None and compare_rows(keys, previous, row) == 0:
+                continue
+            previous = row
+            yield row
+
+    folded = stream.folded | {name for name, _, is_folded in definition if is_folded}
+    return Stream(stream.fields, rows(), frozenset(folded))
+
+def sorted_groups(stream, positions, step):
+    """
+    Groups the rows of a sorted stream by their join key.
+    """
+    folded = [stream.fields[position] in stream.folded for position in positions]
+    previous = None
+    key_of = lambda row: tuple(sort_key(row[position], fold) for position, fold in zip(positions, folded))
+    for key, rows in itertools.groupby(stream.rows, key=key_of):
+        if previous is not None and key < previous:
+            raise ValueError(f'Step {step!r}: input is not sorted on its join key')
+        previous = key
+        yield key, list(rows)
+
+def multiway_merge_join(step, inputs, resolver):
+    name = step.findtext('name')
+    join_type = (step.findtext('join_type') or 'INNER').upper()
+    if join_type not in ('INNER', 'FULL OUTER'):
+        raise ValueError(f'Step {name!r}: unsupported join type {join_type!r}')
+    keys = [[field.strip() for field in key.text.split(',')] for key in step.find('keys').findall('key')]
+    positions = [[stream.fields.index(field) for field in fields] for stream, fields in zip(inputs, keys)]
+    fields = unique_names([field for stream in inputs for field in stream.fields])
+    empty = [(None,) * len(stream.fields) for stream in inputs]
+    originals = [(stream, field) for stream in inputs for field in stream.fields]
+    folded = frozenset(field for field, (stream, original) in zip(fields, originals) if original in stream.folded)
+
+    def rows():
+        groups = [sorted_groups(stream, position, name) for stream, position in zip(inputs, positions)]
+        heads = [next(group, None) for group in groups]
+        while any(head is not None for head in heads):
+            key = min(head[0] for head in heads if head is not None)
+            matching = [head is not None and head[0] == key for head in heads]
+            if all(matching) or join_type == 'FULL OUTER':
+                parts = [head[1] if match else [empty[index]]
+                         for index, (head, match) in enumerate(zip(heads, matching))]
+                for combination in itertools.product(*parts):
+                    yield tuple(itertools.chain.from_iterable(combination))
+            heads = [next(groups[index], None) if match else head
+                     for index, (head, match) in enumerate(zip(heads, matching))]
+
+    return Stream(fields, rows(), folded)
+
+def output_fields(step, stream):
+    names = [field.findtext('name') for field in step.find('fields').findall('field')]
+    names = names or stream.fields
+    missing = [name for name in names if name not in stream.fields]
+    if missing:
+        raise ValueError(f'Step {step.findtext("name")!r}: no fields {missing} in its input')
+    return names, [stream.fields.index(name) for name in names]
+
+def text_file_output(step, inputs, resolver):
+    (stream,) = inputs
+    names, indexes = output_fields(step, stream)
+    file = step.find('file')
+    path = resolver.output(file.findtext('name'), file.findtext('extention') or '')
+
+    def rows():
+        if flag(step, 'create_parent_folder'):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'a' if flag(file, 'append') else 'w', newline='',
+                  encoding=step.findtext('encoding') or 'utf-8') as f:
+            writer = csv.writer(f, delimiter=step.findtext('separator') or ',',
+                                quotechar=step.findtext('enclosure') or '"',
+                                quoting=csv.QUOTE_ALL if flag(step, 'enclosure_forced') else csv.QUOTE_MINIMAL,
+                                lineterminator='\r\n' if step.findtext('format') == 'DOS' else '\n')
+            if flag(step, 'header'):
+                writer.writerow(names)
+            for row in stream.rows:
+                writer.writerow([format_value(row[index]) for index in indexes])
+                yield row
+
+    return Stream(stream.fields, rows(), stream.folded)
+
+def excel_output(step, inputs, resolver):
+    (stream,) = inputs
+    names, indexes = output_fields(step, stream)
+    file = step.find('file')
+    # Workbooks are written as .xlsx; writing the old .xls format needs xlwt,
+    # which no longer works with current Python versions
+    extension = file.findtext('extention') or 'xlsx'
+    path = resolver.output(file.findtext('name'), 'xlsx' if extension == 'xls' else extension)
+
+    def rows():
+        workbook = openpyxl.Workbook(write_only=True)
+        worksheet = workbook.create_sheet(file.findtext('sheetname') or 'Sheet1')
+        if flag(step, 'header'):
+            worksheet.append(names)
+        for row in stream.rows:
+            worksheet.append([row[index] for index in indexes])
+            yield row
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        workbook.save(path)
+
+    return Stream(stream.fields, rows(), stream.folded)
+
+# Functions building the output stream of each supported step type from the
+# streams of its input steps
+STEP_TYPES = {
+    'ExcelInput': excel_input,
+    'TextFileInput': text_file_input,
+    'SelectValues': select_values,
+    'SortRows': sort_rows,
+    'MultiwayMergeJoin': multiway_merge_join,
+    'TextFileOutput': text_file_output,
+    'ExcelOutput': excel_output,
+}
+
+INPUT_TYPES = {'ExcelInput', 'TextFileInput'}
+OUTPUT_TYPES = {'TextFileOutput', 'ExcelOutput'}
+
+
+class Transformation:
+    """
+    A Kettle transformation (.ktr) executed as a pipeline of generators.
+
+    Every step turns the rows of its input steps into its own rows as they
+    are pulled, so rows stream from the input files to the output files and
+    only sorting holds a whole input, spilling it to disk when it is large.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The .ktr file.
+        """
+        self.path = path
+        root = ET.parse(path).getroot()
+        self.name = root.findtext('info/name') or os.path.splitext(os.path.basename(path))[0]
+        self.steps = {step.findtext('name'): step for step in root.findall('step')}
+        self.hops = [(hop.findtext('from'), hop.findtext('to')) for hop in root.findall('order/hop')
+                     if flag(hop, 'enabled')]
+
+        for name, step in self.steps.items():
+            if step.findtext('type') not in STEP_TYPES:
+                raise ValueError(f'{self.name}: step {name!r} has the unsupported type {step.findtext("type")!r}')
+            targets = [to for source, to in self.hops if source == name]
+            if len(targets) > 1:
+                raise ValueError(f'{self.name}: step {name!r} sends its rows to several steps, '
+                                 'which is not supported')
+
+    def inputs(self, name):
+        step = self.steps[name]
+        if step.findtext('type') == 'MultiwayMergeJoin':
+            return [step.findtext(f'step{index}') for index in range(int(step.findtext('number_input')))]
+        return [source for source, to in self.hops if to == name]
+
+    def files(self, types):
+        """
+        Returns the file names the steps of the given types read or write,
+        without directory and extension.
+        """
+        names = set()
+        for step in self.steps.values():
+            if step.findtext('type') in types:
+                names.update(os.path.splitext(kettle_basename(name))[0].lower() for name in file_names(step))
+        return names
+
+    def run(self, resolver):
+        """
+        Executes the transformation.
+
+        Args:
+            resolver (FileResolver): Locates the input and output files.
+
+        Returns:
+            dict: Number of rows that passed each final step.
+        """
+        streams = {}
+
+        def stream(name):
+            if name not in streams:
+                if name in building:
+                    raise ValueError(f'{self.name}: cycle at step {name!r}')
+                building.add(name)
+                step = self.steps[name]
+                streams[name] = STEP_TYPES[step.findtext('type')](
+                    step, [stream(source) for source in self.inputs(name)], resolver)
+            return streams[name]
+
+        building = set()
+        sinks = [name for name in self.steps if not any(source == name for source, _ in self.hops)]
+        counts = {}
+        with instrumentation.stage('kettle.transformation', transformation=self.name) as s:
+            for name in sinks:
+                counts[name] = sum(1 for _ in stream(name).rows)
+            s.rows_out = sum(counts.values())
+        return counts
+
+
+def _run_transformation(path, resolver, settings):
+    instrumentation.configure(**settings)
+    return Transformation(path).run(resolver)
+
+
+class Job:
+    """
+    A Kettle job (.kjb) running its transformation entries.
+
+    The hops of a job chain its entries one after the other. An entry only
+    waits for the earlier entries that write a file it reads, so independent
+    transformations run at the same time in a process pool.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The .kjb file. The transformations are looked up by
+                their file name in its directory.
+        """
+        self.path = path
+        root = ET.parse(path).getroot()
+        self.name = root.findtext('name')
+        self.entries = {entry.findtext('name'): entry for entry in root.findall('entries/entry')}
+        self.hops = [(hop.findtext('from'), hop.findtext('to')) for hop in root.findall('hops/hop')
+                     if flag(hop, 'enabled')]
+
+        directory = os.path.dirname(os.path.abspath(path))
+        self.transformations = {}
+        for name, entry in self.entries.items():
+            if entry.findtext('type') == 'TRANS':
+                file = os.path.join(directory, kettle_basename(entry.findtext('filename')))
+                self.transformations[name] = Transformation(file)
+            elif entry.findtext('type') not in ('SPECIAL', 'SUCCESS'):
+                raise ValueError(f'{self.name}: entry {name!r} has the unsupported type {entry.findtext("type")!r}')
+
+    def ancestors(self, name):
+        found, pending = set(), [name]
+        while pending:
+            current = pending.pop()
+            for source, to in self.hops:
+                if to == current and source not in found:
+                    found.add(source)
+                    pending.append(source)
+        return found
+
+    def dependencies(self):
+        """
+        Returns the earlier transformation entries each entry reads files of.
+        """
+        return {
+            name: {earlier for earlier in self.ancestors(name) if earlier in self.transformations
+                   and self.transformations[earlier].files(OUTPUT_TYPES) & transformation.files(INPUT_TYPES)}
+            for name, transformation in self.transformations.items()
+        }
+
+    def run(self, resolver, processes=None):
+        """
+        Executes the transformations of the job.
+
+        Args:
+            resolver (FileResolver): Locates the input and output files.
+            processes (int, optional): Number of transformations running at
+                the same time; one per core if None. With a single process
+                they run one after the other in this process.
+
+        Returns:
+            dict: Rows that passed the final steps, per entry.
+        """
+        dependencies = self.dependencies()
+        if processes is None:
+            processes = os.cpu_count() or 1
+        processes = min(processes, len(dependencies)) or 1
+
+        results = {}
+        if processes <= 1:
+            while len(results) < len(dependencies):
+                name = next(name for name, needed in dependencies.items()
+                            if name not in results and needed <= set(results))
+                results[name] = self.transformations[name].run(resolver)
+            return results
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        with concurrent.futures.ProcessPoolExecutor(processes, mp_context=context) as pool:
+            running = {}
+            while len(results) < len(dependencies):
+                for name, needed in dependencies.items():
+                    if name not in results and name not in running.values() and needed <= set(results):
+                        future = pool.submit(_run_transformation, self.transformations[name].path, resolver,
+                                             instrumentation.settings())
+                        running[future] = name
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        for pending in running:
+                            pending.cancel()
+                        raise
+        return {name: results[name] for name in dependencies}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs a Kettle job (.kjb) or transformation (.ktr) without Kettle.')
+    parser.add_argument('path', help='the .kjb or .ktr file')
+    parser.add_argument('--output', default=DATASETS_DIR, help='directory to write the output files to')
+    parser.add_argument('--search', action='append', default=None,
+                        help='directory to look for input files in (repeatable; default: 0_datasets, '
+                             '0_datasets/stats and 0_datasets/salaries)')
+    parser.add_argument('--file', action='append', default=[], metavar='NAME=PATH',
+                        help='local path of an input file, by its file name in the transformation')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='transformations of a job running at the same time (0: one per core)')
+    args = parser.parse_args()
+
+    files = dict(mapping.split('=', 1) for mapping in args.file)
+    resolver = FileResolver(args.output, args.search, files)
+    if args.path.endswith('.kjb'):
+        results = Job(args.path).run(resolver, processes=args.processes or None)
+    else:
+        results = {os.path.basename(args.path): Transformation(args.path).run(resolver)}
+    for entry, counts in results.items():
+        print(f"{entry}: {', '.join(f'{step} ({rows} rows)' for step, rows in counts.items())}")
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+import instrumentation
+from blocking import DeletionIndex, NameIndex
+from match_cache import reference_fingerprint
+from similarity import damerau_levenshtein_distances
+
+
+def link_names(names, ref_names, ref_uuids, threshold=0, normalize=None, cache=None, index=None):
+    """
+    Links a column of names to the uuids of a reference table.
+
+    A name is linked to the first reference name (in reference-table order)
+    whose Damerau-Levenshtein distance is at most ``threshold``, provided
+    that distance equals ``threshold`` exactly.
+
+    Args:
+        names (array-like): Names to link.
+        ref_names (array-like): Names of the reference table.
+        ref_uuids (array-like): Uuids of the reference table, aligned with
+            ``ref_names``.
+        threshold (int): Required edit distance of a match.
+        normalize (callable, optional): Applied to every name before
+            matching; reference names are used as they are, so normalize
+            them beforehand without turning missing names into strings.
+        cache (MatchCache, optional): Persistent cache of earlier matches,
+            keyed by the normalized name. Only names missing from it are
+            matched, and their results are added to it.
+        index (NameIndex or DeletionIndex, optional): Index over
+            ``ref_names`` to find candidates with, e.g. one loaded by
+            ``blocking.load_deletion_index``. Built when first needed if not
+            given: a q-gram index for exact matching, a deletion index for a
+            positive threshold.
+
+    Every distinct name is matched once and the result is broadcast to all of
+    its occurrences.
+
+    Returns:
+        tuple: ``(uuids, distances)``, two arrays aligned with ``names``.
+        Unlinked names get an empty uuid and a NaN distance.
+    """
+    # Missing reference names are left out of the index, so nothing links to them
+    ref_names = [name if isinstance(name, str) else None for name in ref_names]
+    ref_uuids = list(ref_uuids)
+
+    cached, computed = {}, {}
+    if cache is not None:
+        cache.bind(reference_fingerprint(ref_names, ref_uuids, threshold))
+        cached = cache.load()
+
+    # Missing names get code -1, which picks the trailing unlinked entry
+    codes, distinct = pd.factorize(pd.Series(names, dtype=object))
+    uuids = np.full(len(distinct) + 1, '', dtype=object)
+    distances = np.full(len(distinct) + 1, np.nan)
+    matched = {}
+    for i, name in enumerate(distinct):
+        if not isinstance(name, str):
+            continue
+        if normalize is not None:
+            name = normalize(name)
+
+        # Names that only differ before normalization are matched once
+        if name in matched:
+            uuids[i], distances[i] = matched[name]
+            continue
+
+        if name in cached:
+            uuids[i], distances[i] = matched[name] = cached[name]
+            instrumentation.count('match_cache_hits')
+            continue
+
+        if index is None:
+            index = NameIndex(ref_names) if threshold == 0 else DeletionIndex(ref_names, threshold)
+        candidates = index.candidates(name, threshold)
+        if threshold == 0:
+            # The candidates of an exact lookup are hash hits on the name itself
+            if candidates:
+                uuids[i], distances[i] = ref_uuids[candidates[0]], 0
+        else:
+            scores = damerau_levenshtein_distances(
+                name, [ref_names[j] for j in candidates], max_distance=threshold)
+            within = (scores <= threshold).nonzero()[0]
+
+            if len(within) and scores[within[0]] == threshold:
+                uuids[i] = ref_uuids[candidates[within[0]]]
+                distances[i] = threshold
+        matched[name] = computed[name] = (uuids[i], distances[i])
+
+    if cache is not None and computed:
+        cache.store(computed)
+
+    uuids, distances = uuids[codes], distances[codes]
+
+    if instrumentation.ENABLED:
+        linked = distances[~np.isnan(distances)]
+        for distance, n in zip(*np.unique(linked, return_counts=True)):
+            instrumentation.count(f'matches_at_distance_{int(distance)}', int(n))
+        instrumentation.count('unmatched', len(names) - len(linked))
+        instrumentation.count('distinct_names', len(distinct))
+
+    return uuids, distances
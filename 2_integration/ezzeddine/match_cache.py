@@ -0,0 +1,111 @@
+import hashlib
+import sqlite3
+
+
+def reference_fingerprint(ref_names, ref_uuids, threshold=0):
+    """
+    Fingerprints a reference table as far as name matching is concerned.
+
+    Args:
+        ref_names (iterable): Names of the reference table.
+        ref_uuids (iterable): Uuids of the reference table.
+        threshold (int): Threshold the matches are computed for.
+
+    Returns:
+        str: Hex digest that changes whenever a reference name, a uuid, their
+        order or the threshold changes.
+    """
+    digest = hashlib.sha256(f'threshold={threshold}\n'.encode('utf-8'))
+    for name, ref_uuid in zip(ref_names, ref_uuids):
+        digest.update(f'{name}\t{ref_uuid}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class MatchCache:
+    """
+    On-disk memo of name -> (uuid, distance) matches for one reference table.
+
+    Entries are stored per namespace (e.g. "players" or "teams") together with
+    the fingerprint of the reference table they were computed against. As
+    soon as a different fingerprint is bound, the namespace is emptied, so
+    stale matches are never served after the reference CSV changed.
+    """
+
+    def __init__(self, path, namespace):
+        """
+        Args:
+            path (str): SQLite file holding the cache; created if missing.
+            namespace (str): Name of the reference table the cache is for.
+        """
+        self.namespace = namespace
+        # Season workers may write to the same file concurrently
+        self.connection = sqlite3.connect(path, timeout=30)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS reference_sets ('
+                'namespace TEXT PRIMARY KEY, fingerprint TEXT NOT NULL)')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS matches ('
+                'namespace TEXT NOT NULL, name TEXT NOT NULL, uuid TEXT NOT NULL, distance REAL, '
+                'PRIMARY KEY (namespace, name))')
+
+    def _fingerprint(self):
+        row = self.connection.execute(
+            'SELECT fingerprint FROM reference_sets WHERE namespace = ?',
+            (self.namespace,)).fetchone()
+        return row[0] if row is not None else None
+
+    def bind(self, fingerprint):
+        """
+        Binds the cache to a reference table, dropping entries computed
+        against any other version of it.
+
+        Args:
+            fingerprint (str): Result of ``reference_fingerprint``.
+        """
+        if self._fingerprint() == fingerprint:
+            return
+
+        with self.connection:
+            # Checked again under the write lock: workers binding the same new
+            # fingerprint at once would otherwise empty each other's fresh entries
+            self.connection.execute('BEGIN IMMEDIATE')
+            if self._fingerprint() == fingerprint:
+                return
+            self.connection.execute('DELETE FROM matches WHERE namespace = ?', (self.namespace,))
+            self.connection.execute(
+                'INSERT OR REPLACE INTO reference_sets (namespace, fingerprint) VALUES (?, ?)',
+                (self.namespace, fingerprint))
+
+    def load(self):
+        """
+        Returns:
+            dict: Cached matches as ``{name: (uuid, distance)}``. Unmatched
+            names map to ``('', nan)``.
+        """
+        rows = self.connection.execute(
+            'SELECT name, uuid, distance FROM matches WHERE namespace = ?', (self.namespace,))
+        return {name: (match_uuid, float('nan') if distance is None else distance)
+                for name, match_uuid, distance in rows}
+
+    def store(self, matches):
+        """
+        Adds matches to the cache.
+
+        Args:
+            matches (dict): ``{name: (uuid, distance)}`` as returned by ``load``.
+        """
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO matches (namespace, name, uuid, distance) VALUES (?, ?, ?, ?)',
+                ((self.namespace, name, str(match_uuid), None if distance != distance else distance)
+                 for name, (match_uuid, distance) in matches.items()))
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,66 @@
+import multiprocessing
+import os
+
+import instrumentation
+
+# Reference tables shared with the worker processes. They are set before the
+# pool is created, so forked workers inherit them without any pickling.
+_shared = {}
+
+
+def _init_worker(shared, settings):
+    _shared.update(shared)
+    instrumentation.configure(**settings)
+
+def _call(func, item):
+    # The counters of the worker are handed back to the parent process along
+    # with the result, so its stages account for the work of the pool.
+    before = instrumentation.counters.copy()
+    result = func(item, **_shared)
+    return result, instrumentation.counters - before
+
+
+def map_seasons(func, items, shared=None, processes=None):
+    """
+    Applies a function to every season, fanning the seasons out to a process
+    pool.
+
+    Args:
+        func (callable): Module-level function called as
+            ``func(item, **shared)`` for every season.
+        items (dict): Maps each season to the data of that season.
+        shared (dict, optional): Keyword arguments shared by all seasons,
+            typically the reference tables. Workers receive them once, through
+            fork where available and otherwise once per worker process.
+        processes (int, optional): Size of the pool; one process per core if
+            not given. With a single process the seasons run in this process.
+
+    Returns:
+        dict: Result of ``func`` per season, in the order of ``items``.
+    """
+    shared = shared or {}
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(items))
+
+    if processes <= 1:
+        return {season: func(item, **shared) for season, item in items.items()}
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        _shared.clear()
+        _shared.update(shared)
+        initializer, initargs = _init_worker, ({}, instrumentation.settings())
+    else:
+        context = multiprocessing.get_context()
+        initializer, initargs = _init_worker, (shared, instrumentation.settings())
+
+    try:
+        with context.Pool(processes, initializer, initargs) as pool:
+            results = pool.starmap(_call, [(func, item) for item in items.values()])
+    finally:
+        _shared.clear()
+
+    for _, worker_counters in results:
+        instrumentation.counters.update(worker_counters)
+    return {season: result for season, (result, _) in zip(items, results)}
@@ -0,0 +1,9 @@
+import os
+
+# Absolute locations of the dataset directories, so the integration code
+# does not depend on the directory it is started from
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DATASETS_DIR = os.path.join(ROOT_DIR, '0_datasets')
+PROCESSED_DIR = os.path.join(DATASETS_DIR, 'processed')
+CACHE_DIR = os.path.join(DATASETS_DIR, 'cache')
+CLEANED_DIR = os.path.join(DATASETS_DIR, 'cleaned')
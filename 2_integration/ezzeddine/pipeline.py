@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import instrumentation
+
+
+def content_hash(value):
+    """
+    Hashes the content of a dataset handed between stages.
+
+    Args:
+        value: A DataFrame or NumPy array, or a dict or list of them.
+
+    Returns:
+        str: Hex digest of the content.
+    """
+    digest = hashlib.sha256()
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr(list(value.columns)).encode('utf-8'))
+        digest.update(pd.util.hash_pandas_object(value, index=False).values.tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f'{value.dtype.str}{value.shape}'.encode('utf-8'))
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            digest.update(f'{key}:{content_hash(value[key])}'.encode('utf-8'))
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            digest.update(content_hash(item).encode('utf-8'))
+    else:
+        digest.update(repr(value).encode('utf-8'))
+    return digest.hexdigest()
+
+def file_hash(path):
+    """
+    Hashes the content of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Stage:
+    """
+    A step of the pipeline with declared inputs and outputs.
+    """
+
+    def __init__(self, name, run, inputs=(), outputs=(), sources=(), write=None, read=None, exists=None):
+        """
+        Args:
+            name (str): Name of the stage.
+            run (callable): Called with the input datasets as keyword
+                arguments; returns a dict with one entry per output.
+            inputs (tuple): Names of the datasets produced by other stages.
+            outputs (tuple): Names of the datasets the stage produces.
+            sources (callable or tuple): Paths of the files the stage reads
+                itself; a callable is evaluated on every run.
+            write (callable, optional): Materializes the outputs; called with
+                them as keyword arguments.
+            read (callable, optional): Loads materialized outputs back; returns
+                the same dict as ``run``. Stages without it are never skipped.
+            exists (callable, optional): Returns whether the materialized
+                outputs are all still there; a stage whose outputs were
+                deleted runs again even if its inputs are unchanged.
+        """
+        self.name = name
+        self.run = run
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.sources = sources
+        self.write = write
+        self.read = read
+        self.exists = exists
+
+
+class Pipeline:
+    """
+    Runs a DAG of stages in one process, handing datasets between them in
+    memory.
+
+    The content hash of every stage's inputs (source files and upstream
+    datasets) is recorded in a state file when its outputs are materialized.
+    On the next run a stage whose inputs hash the same and whose outputs are
+    still on disk is skipped, and its outputs are only read back from disk if
+    a later stage or the caller actually needs them.
+    """
+
+    def __init__(self, stages, state_path):
+        """
+        Args:
+            stages (list): Stages of the pipeline, in any order.
+            state_path (str): JSON file recording the hashes of the last run.
+        """
+        self.stages = self._sort(stages)
+        self.state_path = state_path
+
+    @staticmethod
+    def _sort(stages):
+        producers = {output: stage for stage in stages for output in stage.outputs}
+        ordered, visiting, done = [], set(), set()
+
+        def visit(stage):
+            if stage.name in done:
+                return
+            if stage.name in visiting:
+                raise ValueError(f'Cycle in pipeline at stage {stage.name!r}')
+            visiting.add(stage.name)
+            for name in stage.inputs:
+                if name not in producers:
+                    raise ValueError(f'No stage produces {name!r}, needed by {stage.name!r}')
+                visit(producers[name])
+            visiting.discard(stage.name)
+            done.add(stage.name)
+            ordered.append(stage)
+
+        for stage in stages:
+            visit(stage)
+        return ordered
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+
+    def run(self, targets=None, materialize=True, force=False):
+        """
+        Runs the pipeline.
+
+        Args:
+            targets (list, optional): Names of the datasets to return; all
+                outputs if not given.
+            materialize (bool or list): Whether to write the outputs of the
+                stages that ran, or the names of the stages to write.
+            force (bool): Run every stage, even if its inputs are unchanged.
+
+        Returns:
+            dict: The requested datasets.
+        """
+        state = self._load_state()
+        producers = {output: stage for stage in self.stages for output in stage.outputs}
+        targets = list(targets) if targets is not None else list(producers)
+        hashes, datasets, finished = {}, {}, []
+
+        def load(name):
+            # Outputs of skipped stages are only read back once they are needed
+            if name not in datasets:
+                datasets.update(producers[name].read())
+            return datasets[name]
+
+        for stage in self.stages:
+            sources = stage.sources() if callable(stage.sources) else stage.sources
+            input_hash = content_hash([file_hash(path) for path in sources]
+                                      + [hashes[name] for name in stage.inputs])
+
+            previous = state.get(stage.name, {})
+            if (not force and stage.read is not None
+                    and previous.get('inputs') == input_hash
+                    and set(previous.get('outputs', {})) == set(stage.outputs)
+                    and (stage.exists is None or stage.exists())):
+                hashes.update(previous['outputs'])
+                instrumentation.emit({'event': 'skipped', 'stage': f'pipeline.{stage.name}'})
+                continue
+
+            with instrumentation.stage(f'pipeline.{stage.name}'):
+                outputs = stage.run(**{name: load(name) for name in stage.inputs})
+            datasets.update(outputs)
+            output_hashes = {name: content_hash(outputs[name]) for name in stage.outputs}
+            hashes.update(output_hashes)
+
+            finished.append((stage, input_hash, output_hashes))
+
+        # Outputs are only written once every stage has succeeded
+        for stage, input_hash, output_hashes in finished:
+            if stage.write is not None and (
+                    materialize is True or materialize and stage.name in materialize):
+                stage.write(**{name: datasets[name] for name in stage.outputs})
+                state[stage.name] = {'inputs': input_hash, 'outputs': output_hashes}
+                self._save_state(state)
+
+        return {name: load(name) for name in targets}
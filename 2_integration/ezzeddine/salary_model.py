@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+
+import numpy as np
+from scipy.optimize import curve_fit
+
+from parallel import map_seasons
+from paths import CACHE_DIR
+from pipeline import content_hash
+from storage import POSITIONS
+
+logger = logging.getLogger(__name__)
+
+# Statistics weighted by the parameters b1..b4
+FEATURES = ['PPG', 'RPG', 'APG', 'AGE']
+
+PARAMETERS = ['a0', 'a1', 'a2', 'a3', 'a4', 'a5', 'a6', 'b1', 'b2', 'b3', 'b4', 'c', 'k']
+
+# Season in which the growth factor k ** (season - BASE_SEASON) equals one
+BASE_SEASON = 2018
+
+
+def model_func(x, a0, a1, a2, a3, a4, a5, a6, b1, b2, b3, b4, c, k):
+    is_F, is_GF, is_G, is_C, is_CF, is_FG, is_FC, ppg, rpg, apg, age, season = x
+    return (a0 * is_F + a1 * is_GF + a2 * is_G + a3 * is_C + a4 * is_CF + a5 * is_FG + a6 * is_FC) * (b1 * ppg + b2 * rpg + b3 * apg + b4 * age + c) * k ** (season - BASE_SEASON)
+
+def model_jacobian(x, a0, a1, a2, a3, a4, a5, a6, b1, b2, b3, b4, c, k):
+    """
+    Partial derivatives of ``model_func`` by each parameter.
+
+    Returns:
+        numpy.ndarray: One row per sample and one column per parameter.
+    """
+    positions, features, season = x[:7], x[7:11], x[11]
+    position_factor = np.dot([a0, a1, a2, a3, a4, a5, a6], positions)
+    performance = np.dot([b1, b2, b3, b4], features) + c
+    years = season - BASE_SEASON
+    growth = k ** years
+
+    jacobian = np.empty((len(season), len(PARAMETERS)))
+    jacobian[:, :7] = (positions * (performance * growth)).T
+    jacobian[:, 7:11] = (features * (position_factor * growth)).T
+    jacobian[:, 11] = position_factor * growth
+    jacobian[:, 12] = position_factor * performance * years * k ** (years - 1)
+    return jacobian
+
+
+def design_matrix(data, cache_dir=os.path.join(CACHE_DIR, 'models')):
+    """
+    Assembles the explanatory variables and the response of the model.
+
+    The matrix is cached on disk under the hash of the columns it is built
+    from, so unchanged data is assembled only once.
+
+    Args:
+        data (pandas.DataFrame): Players with "POS", the ``FEATURES``, the
+            "season" (start year) and "salary_in_usd".
+        cache_dir (str, optional): Directory of the cached matrices; no
+            caching if None.
+
+    Returns:
+        tuple: ``(X, y)``, X with one row per variable of ``model_func`` and
+        one column per player, and the salaries.
+    """
+    columns = data[['POS'] + FEATURES + ['season', 'salary_in_usd']]
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, f'design-{content_hash(columns)[:16]}.npz')
+        if os.path.exists(path):
+            with np.load(path) as cached:
+                return cached['X'], cached['y']
+
+    positions = [(columns['POS'].astype(str) == position).to_numpy(dtype=float) for position in POSITIONS]
+    features = [columns[feature].to_numpy(dtype=float) for feature in FEATURES]
+    season = columns['season'].astype(str).str[:4].astype(float).to_numpy()
+    X = np.vstack(positions + features + [season])
+    y = columns['salary_in_usd'].to_numpy(dtype=float)
+
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, X=X, y=y)
+    return X, y
+
+def fit_model(X, y, p0=None, bounds=(-np.inf, np.inf)):
+    """
+    Fits ``model_func`` with its analytic Jacobian.
+
+    Args:
+        X (numpy.ndarray): Explanatory variables, as returned by ``design_matrix``.
+        y (numpy.ndarray): Salaries.
+        p0 (list, optional): Initial parameters; all ones if not given.
+        bounds (tuple, optional): Lower and upper bounds of the parameters,
+            e.g. to keep the growth factor k positive; unbounded by default.
+
+    Returns:
+        numpy.ndarray: The fitted parameters.
+    """
+    popt, _ = curve_fit(model_func, X, y, p0=p0, bounds=bounds, jac=model_jacobian)
+    return popt
+
+def _fit_group(group):
+    X, y, start = group
+    return fit_model(X, y, p0=start)
+
+
+class SalaryModel:
+    """
+    Salary model whose fitted parameters are kept in a JSON file.
+
+    A fit starts from the parameters saved for the same model, and a model
+    whose design matrix is unchanged since it was saved is not refitted at
+    all. After adding a season, only the models that see it are fitted again.
+    """
+
+    def __init__(self, path, cache_dir=os.path.join(CACHE_DIR, 'models')):
+        """
+        Args:
+            path (str): JSON file of the saved parameters.
+            cache_dir (str, optional): Directory of the cached design matrices.
+        """
+        self.path = path
+        self.cache_dir = cache_dir
+        self.saved = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.saved = json.load(f)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.saved, f, indent=2, sort_keys=True)
+
+    def _start(self, name, X, y):
+        # Returns the saved parameters and whether they fit exactly this data
+        saved = self.saved.get(name)
+        if saved is None:
+            return None, False
+        return saved['params'], saved['data'] == content_hash([X, y])
+
+    def _store(self, name, X, y, params):
+        self.saved[name] = {
+            'data': content_hash([X, y]),
+            'params': [float(value) for value in params],
+            'rows': len(y),
+        }
+
+    def fit(self, data, name='all'):
+        """
+        Fits one model to all players.
+
+        Args:
+            data (pandas.DataFrame): Players, see ``design_matrix``.
+            name (str): Name the parameters are saved under.
+
+        Returns:
+            numpy.ndarray: The fitted parameters.
+        """
+        X, y = design_matrix(data, self.cache_dir)
+        start, current = self._start(name, X, y)
+        if current:
+            return np.array(start)
+
+        params = fit_model(X, y, p0=start)
+        self._store(name, X, y, params)
+        self._save()
+        return params
+
+    def fit_groups(self, data, by, processes=1):
+        """
+        Fits one model per group of players, e.g. per season or position,
+        in parallel.
+
+        Every group is fitted with the full ``model_func``. Within a group the
+        grouping column is constant, so its parameters are not identified: per
+        position, the factors of the other positions keep their start values
+        and the position factor trades off against the scale of b1..b4 and c.
+        Compare the fitted salaries of the groups rather than their
+        parameters. Groups with no more rows than ``PARAMETERS`` can't be
+        fitted and are skipped with a warning.
+
+        Args:
+            data (pandas.DataFrame): Players, see ``design_matrix``.
+            by (str): Column to group by, e.g. "season" or "POS".
+            processes (int, optional): Number of processes fitting groups in
+                parallel; serial by default, one per core if None.
+
+        Returns:
+            dict: Fitted parameters per group that could be fitted.
+        """
+        params, groups = {}, {}
+        for value, group in data.groupby(by, observed=True):
+            if len(group) <= len(PARAMETERS):
+                logger.warning('Skipping %s=%s: %d players are too few to fit %d parameters',
+                               by, value, len(group), len(PARAMETERS))
+                continue
+            name = f'{by}={value}'
+            X, y = design_matrix(group, self.cache_dir)
+            start, current = self._start(name, X, y)
+            if current:
+                params[value] = np.array(start)
+            else:
+                groups[value] = (X, y, start)
+
+        fitted = map_seasons(_fit_group, groups, processes=processes)
+        for value, group_params in fitted.items():
+            X, y, _ = groups[value]
+            self._store(f'{by}={value}', X, y, group_params)
+            params[value] = group_params
+        if fitted:
+            self._save()
+        return {value: params[value] for value in sorted(params)}
@@ -0,0 +1,215 @@
+from collections import namedtuple
+
+import numpy as np
+
+from instrumentation import count
+
+# Code point used to pad shorter names in an encoded batch. It never equals
+# the code point of a real character, so padding never counts as a match.
+PAD = -1
+
+EncodedNames = namedtuple('EncodedNames', ['codes', 'lengths'])
+
+
+def encode_names(names):
+    """
+    Encodes names as a padded matrix of Unicode code points.
+
+    Args:
+        names (iterable): Names to encode.
+
+    Returns:
+        EncodedNames: ``codes`` is an int32 matrix with one row per name,
+        padded with ``PAD``; ``lengths`` holds the length of each name.
+    """
+    names = list(names)
+    lengths = np.fromiter((len(name) for name in names), dtype=np.int32, count=len(names))
+    codes = np.full((len(names), int(lengths.max(initial=0))), PAD, dtype=np.int32)
+    for row, name in enumerate(names):
+        codes[row, :len(name)] = [ord(char) for char in name]
+    return EncodedNames(codes, lengths)
+
+
+def levenshtein_distance(s1, s2, max_distance=None):
+    """
+    Calculate the Levenshtein distance between two strings.
+
+    Args:
+        s1 (str): First string.
+        s2 (str): Second string.
+        max_distance (int, optional): Stop as soon as the distance is known to
+            exceed this value.
+
+    Returns:
+        int: The distance, or ``max_distance + 1`` if it exceeds ``max_distance``.
+    """
+    count('edit_distance_evaluations')
+    if max_distance is not None and abs(len(s1) - len(s2)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(s2) + 1))
+    for i in range(1, len(s1) + 1):
+        current = [i] + [0] * len(s2)
+        for j in range(1, len(s2) + 1):
+            cost = 0 if s1[i - 1] == s2[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1,  # deletion
+                current[j - 1] + 1,  # insertion
+                previous[j - 1] + cost  # substitution
+            )
+
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+
+    distance = previous[-1]
+    if max_distance is not None:
+        return min(distance, max_distance + 1)
+    return distance
+
+
+def damerau_levenshtein_distance(s1, s2, max_distance=None):
+    """
+    Calculate the Damerau-Levenshtein (optimal string alignment) distance
+    between two strings.
+
+    Args:
+        s1 (str): First string.
+        s2 (str): Second string.
+        max_distance (int, optional): Stop as soon as the distance is known to
+            exceed this value.
+
+    Returns:
+        int: The distance, or ``max_distance + 1`` if it exceeds ``max_distance``.
+    """
+    count('edit_distance_evaluations')
+    if max_distance is not None and abs(len(s1) - len(s2)) > max_distance:
+        return max_distance + 1
+
+    before_previous = None
+    previous = list(range(len(s2) + 1))
+    for i in range(1, len(s1) + 1):
+        current = [i] + [0] * len(s2)
+        for j in range(1, len(s2) + 1):
+            cost = 0 if s1[i - 1] == s2[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1,  # deletion
+                current[j - 1] + 1,  # insertion
+                previous[j - 1] + cost  # substitution
+            )
+
+            if i > 1 and j > 1 and s1[i - 1] == s2[j - 2] and s1[i - 2] == s2[j - 1]:
+                current[j] = min(current[j], before_previous[j - 2] + cost)  # transposition
+
+        # A transposition reaches back two rows, so the distance can only be
+        # ruled out once both of the last two rows exceed the cutoff.
+        if max_distance is not None and min(min(current), min(previous)) > max_distance:
+            return max_distance + 1
+        before_previous, previous = previous, current
+
+    distance = previous[-1]
+    if max_distance is not None:
+        return min(distance, max_distance + 1)
+    return distance
+
+
+def levenshtein_distances(query, choices, max_distance=None):
+    """
+    Calculate the Levenshtein distance between one string and many.
+
+    Args:
+        query (str): String to compare.
+        choices (iterable or EncodedNames): Strings to compare against, either
+            raw or as returned by ``encode_names``.
+        max_distance (int, optional): Distances above this value are not
+            computed exactly.
+
+    Returns:
+        numpy.ndarray: Distance to each choice, in order. Distances above
+        ``max_distance`` are reported as ``max_distance + 1``.
+    """
+    return _batch_distances(query, choices, max_distance, transpositions=False)
+
+
+def damerau_levenshtein_distances(query, choices, max_distance=None):
+    """
+    Calculate the Damerau-Levenshtein (optimal string alignment) distance
+    between one string and many.
+
+    Args:
+        query (str): String to compare.
+        choices (iterable or EncodedNames): Strings to compare against, either
+            raw or as returned by ``encode_names``.
+        max_distance (int, optional): Distances above this value are not
+            computed exactly.
+
+    Returns:
+        numpy.ndarray: Distance to each choice, in order. Distances above
+        ``max_distance`` are reported as ``max_distance + 1``.
+    """
+    return _batch_distances(query, choices, max_distance, transpositions=True)
+
+
+def _batch_distances(query, choices, max_distance, transpositions):
+    if not isinstance(choices, EncodedNames):
+        choices = encode_names(choices)
+    codes, lengths = choices
+    count('edit_distance_evaluations', len(lengths))
+    distances = lengths.astype(np.int64)
+    if len(query) == 0 or len(lengths) == 0:
+        if max_distance is not None:
+            np.minimum(distances, max_distance + 1, out=distances)
+        return distances
+
+    # Choices that are still in the running; the DP rows below only hold these.
+    alive = np.arange(len(lengths))
+    if max_distance is not None:
+        distances[:] = max_distance + 1
+        alive = alive[np.abs(lengths - len(query)) <= max_distance]
+        if len(alive) == 0:
+            return distances
+    codes, lengths = codes[alive], lengths[alive]
+
+    query_codes = [ord(char) for char in query]
+    columns = np.arange(codes.shape[1] + 1, dtype=np.int64)
+    valid = columns <= lengths[:, None]
+    before_previous = None
+    previous = np.broadcast_to(columns, (len(alive), len(columns))).copy()
+
+    for i in range(1, len(query_codes) + 1):
+        cost = (codes != query_codes[i - 1]).astype(np.int64)
+        # Deletion, substitution and transposition only look at earlier rows
+        # and can be evaluated for the whole row at once.
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        np.minimum(previous[:, 1:] + 1, previous[:, :-1] + cost, out=current[:, 1:])
+
+        if transpositions and i > 1:
+            swapped = ((codes[:, :-1] == query_codes[i - 1])
+                       & (codes[:, 1:] == query_codes[i - 2]))
+            transposed = np.where(swapped, before_previous[:, :-2] + cost[:, 1:], current[:, 2:])
+            np.minimum(current[:, 2:], transposed, out=current[:, 2:])
+
+        # Insertions chain along the row: d[j] = min(t[j], d[j - 1] + 1)
+        # unrolls to min over k <= j of (t[k] - k) + j.
+        current = np.minimum.accumulate(current - columns, axis=1) + columns
+
+        if max_distance is not None:
+            row_minimum = np.where(valid, current, max_distance + 1).min(axis=1)
+            if transpositions:
+                previous_minimum = np.where(valid, previous, max_distance + 1).min(axis=1)
+                row_minimum = np.minimum(row_minimum, previous_minimum)
+            keep = row_minimum <= max_distance
+            if not keep.all():
+                alive, codes, lengths, valid = alive[keep], codes[keep], lengths[keep], valid[keep]
+                current, previous = current[keep], previous[keep]
+                if len(alive) == 0:
+                    return distances
+
+        before_previous, previous = previous, current
+
+    result = previous[np.arange(len(alive)), lengths]
+    if max_distance is not None:
+        np.minimum(result, max_distance + 1, out=result)
+    distances[alive] = result
+    return distances
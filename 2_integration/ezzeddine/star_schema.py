@@ -0,0 +1,76 @@
+import os
+
+import pandas as pd
+
+from storage import list_tables, read_table
+
+# Key of the fact table: one row per player and season
+FACT_KEY = ['player_uuid', 'season']
+
+
+def read_seasons(directory, columns=None, loader=None):
+    """
+    Reads the given columns of every season table in a directory and adds the
+    season (e.g. "2019-2020") taken from the table name.
+
+    Args:
+        directory (str): Directory of the season tables.
+        columns (list, optional): Columns to load; all if not given.
+        loader (CompactLoader, optional): Loads the tables in their compact
+            types; the season is then categorical as well.
+    """
+    frames = []
+    for path in list_tables(directory):
+        df = loader.read(path, columns=columns) if loader is not None else read_table(path, columns=columns)
+        df['season'] = '-'.join(os.path.basename(path).split('_')[-2:])
+        frames.append(df)
+    if not frames:
+        raise FileNotFoundError(f'No season tables in {directory}; run the integration scripts first')
+    df = pd.concat(frames, ignore_index=True)
+    if loader is not None:
+        df['season'] = df['season'].astype('category')
+    return df
+
+def build_fact_table(stats, salaries, players=None, teams=None, champions=None):
+    """
+    Joins the stats and salaries into one fact table with a row per player
+    and season, and looks up the attributes of its dimensions.
+
+    Rows that are not linked to a player are left out. If a player appears
+    twice in the same season of a table, the first row is kept, so the key
+    stays unique and the join never multiplies rows.
+
+    Args:
+        stats (pandas.DataFrame): Stats of all seasons, with a "season" column.
+        salaries (pandas.DataFrame): Salaries of all seasons, with a "season"
+            column.
+        players (pandas.DataFrame, optional): Players; adds their "NAME".
+        teams (pandas.DataFrame, optional): Teams; adds the "team" name.
+        champions (pandas.DataFrame, optional): Champions per year; adds
+            "won_conference", whether the team won its conference that season.
+
+    Returns:
+        pandas.DataFrame: The fact table. Its keys are categorical, so each
+        uuid and season is stored once.
+    """
+    stats = stats[stats['player_uuid'].notna() & (stats['player_uuid'] != '')]
+    salaries = salaries[salaries['player_uuid'].notna() & (salaries['player_uuid'] != '')]
+    stats = stats.drop_duplicates(subset=FACT_KEY)
+    salaries = salaries.drop_duplicates(subset=FACT_KEY).drop(columns='uuid', errors='ignore')
+
+    fact = pd.merge(salaries, stats, on=FACT_KEY, validate='one_to_one').reset_index(drop=True)
+    for column in FACT_KEY + ['team_uuid']:
+        if column in fact.columns and not isinstance(fact[column].dtype, pd.CategoricalDtype):
+            fact[column] = fact[column].astype(str).astype('category')
+
+    # Dimension attributes are looked up through the index of each dimension
+    if players is not None:
+        fact['NAME'] = fact['player_uuid'].map(players.set_index('uuid')['NAME'].astype(str))
+    if teams is not None and 'team_uuid' in fact.columns:
+        fact['team'] = fact['team_uuid'].map(teams.set_index('uuid')['name'].astype(str))
+    if champions is not None and 'team_uuid' in fact.columns:
+        titles = pd.MultiIndex.from_arrays([champions['champion_uuid'].astype(str),
+                                            champions['year'].astype(str)])
+        fact['won_conference'] = pd.MultiIndex.from_arrays(
+            [fact['team_uuid'].astype(str), fact['season'].astype(str).str[:4]]).isin(titles)
+    return fact
@@ -0,0 +1,258 @@
+import glob
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+
+# File extension of every supported output format
+FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# Output format of the integration scripts; columnar formats are opt-in
+DEFAULT_FORMAT = os.environ.get('INTEGRATION_FORMAT', 'csv')
+
+# Whether the integration scripts only add the seasons that have no output yet
+INCREMENTAL = os.environ.get('INTEGRATION_INCREMENTAL', '') not in ('', '0')
+
+# Statistics that are stored as floats in every season
+STAT_COLUMNS = [
+    'RANK', 'AGE', 'GP', 'MPG', 'USG%', 'TO%', 'FTA', 'FT%', '2PA', '2P%', '3PA', '3P%',
+    'eFG%', 'TS%', 'PPG', 'RPG', 'APG', 'P+A', 'SPG', 'BPG', 'TPG', 'VI', 'ORtg', 'DRtg',
+]
+
+# Positions of the players in the stats, in the order of the parameters a0..a6
+# of the salary model
+POSITIONS = ['F', 'G-F', 'G', 'C', 'C-F', 'F-G', 'F-C']
+
+# Column types of the processed tables, keyed by the table name without its
+# season suffix. Columns not listed keep the type pandas gives them.
+SCHEMAS = {
+    'teams_with_uuid': {'uuid': 'string', 'name': 'string'},
+    'champions_with_team_ids': {'uuid': 'string', 'year': 'int64', 'region': 'string',
+                                'champion_uuid': 'string'},
+    'unique_players': {'uuid': 'string', 'NAME': 'string'},
+    'stats': dict({'player_uuid': 'string', 'team_uuid': 'string', 'POS': 'string'},
+                  **{column: 'float64' for column in STAT_COLUMNS}),
+    'salaries': {'uuid': 'string', 'player_uuid': 'string', 'salary_in_usd': 'float64'},
+}
+
+
+def table_name(path):
+    """
+    Returns the name of a processed table without its season suffix, e.g.
+    ``stats`` for ``processed/stats/stats_2019_2020``.
+    """
+    name = os.path.basename(path)
+    for table in SCHEMAS:
+        if name == table or name.startswith(table + '_'):
+            return table
+    return name
+
+def table_schema(path):
+    """
+    Returns the schema of a processed table.
+    """
+    return SCHEMAS.get(table_name(path), {})
+
+def apply_schema(df, schema):
+    """
+    Casts the columns of a DataFrame that are part of a schema.
+    """
+    types = {column: dtype for column, dtype in schema.items() if column in df.columns}
+    return df.astype(types) if types else df
+
+def write_table(df, path, format=None):
+    """
+    Writes a processed table.
+
+    CSV output is written exactly as before; columnar outputs are cast to the
+    table's schema first, so every season is stored with the same types.
+
+    Args:
+        df (pandas.DataFrame): Table to write.
+        path (str): Path of the table without file extension.
+        format (str, optional): One of ``FORMATS``; ``DEFAULT_FORMAT`` if not given.
+    """
+    format = format or DEFAULT_FORMAT
+    if format == 'csv':
+        df.to_csv(path + FORMATS[format], index=False)
+        return
+
+    df = apply_schema(df, table_schema(path)).reset_index(drop=True)
+    if format == 'parquet':
+        df.to_parquet(path + FORMATS[format], index=False)
+    elif format == 'feather':
+        df.to_feather(path + FORMATS[format])
+    else:
+        raise ValueError(f'Unknown format {format!r}')
+
+def table_file(path):
+    """
+    Finds the file of a processed table.
+
+    Args:
+        path (str): Path of the table without file extension.
+
+    Returns:
+        str: The most recently written file of the table, in any format.
+    """
+    files = [path + extension for extension in FORMATS.values() if os.path.exists(path + extension)]
+    if not files:
+        raise FileNotFoundError(f'No table at {path}')
+    return max(files, key=os.path.getmtime)
+
+def read_table(path, columns=None):
+    """
+    Reads a processed table in whatever format it was written.
+
+    Args:
+        path (str): Path of the table without file extension.
+        columns (list, optional): Columns to load; all if not given. Columnar
+            formats only read these columns from disk.
+
+    Returns:
+        pandas.DataFrame: The table, cast to its schema.
+    """
+    file = table_file(path)
+    if file.endswith('.parquet'):
+        df = pd.read_parquet(file, columns=columns)
+    elif file.endswith('.feather'):
+        df = pd.read_feather(file, columns=columns)
+    else:
+        df = pd.read_csv(file, usecols=columns)
+    return apply_schema(df, table_schema(path))
+
+def iter_table(path, columns=None, chunksize=100000):
+    """
+    Reads a processed table in chunks of rows, so tables larger than memory
+    can be processed.
+
+    Args:
+        path (str): Path of the table without file extension.
+        columns (list, optional): Columns to load; all if not given.
+        chunksize (int): Largest number of rows per chunk.
+
+    Yields:
+        pandas.DataFrame: The next chunk, cast to the table's schema.
+    """
+    file = table_file(path)
+    schema = table_schema(path)
+    if file.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(file).iter_batches(batch_size=chunksize, columns=columns):
+            yield apply_schema(batch.to_pandas(), schema)
+    elif file.endswith('.feather'):
+        import pyarrow.ipc as ipc
+        reader = ipc.open_file(file)
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            batch = batch.select(columns) if columns is not None else batch
+            for start in range(0, batch.num_rows, chunksize):
+                yield apply_schema(batch.slice(start, chunksize).to_pandas(), schema)
+    else:
+        with pd.read_csv(file, usecols=columns, chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield apply_schema(chunk, schema)
+
+def partition_path(directory, table, season):
+    """
+    Returns the path of one season of a table, without file extension.
+    """
+    return os.path.join(directory, f'{table}_{season}')
+
+def has_table(path):
+    """
+    Returns whether a table was written, in any format.
+    """
+    return any(os.path.exists(path + extension) for extension in FORMATS.values())
+
+def has_partition(directory, table, season):
+    """
+    Returns whether a season of a table was written, in any format.
+    """
+    return has_table(partition_path(directory, table, season))
+
+def write_partitions(tables, directory, table, format=None, incremental=False):
+    """
+    Writes the seasons of a table as one file per season, e.g.
+    ``stats/stats_2019_2020``.
+
+    Args:
+        tables (dict): Maps each season to its DataFrame.
+        directory (str): Directory of the partitions; created if missing.
+        table (str): Name of the table, the prefix of the partitions.
+        format (str, optional): Output format, see ``FORMATS``.
+        incremental (bool): Only write seasons without a partition, leaving
+            the existing files untouched.
+
+    Returns:
+        list: Seasons that were written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for season, df in tables.items():
+        if incremental and has_partition(directory, table, season):
+            continue
+        write_table(df, partition_path(directory, table, season), format)
+        written.append(season)
+    return written
+
+def read_partitions(directory, table, seasons):
+    """
+    Reads the partitions of a table that exist, see ``write_partitions``.
+
+    Returns:
+        dict: Maps each season with a partition to its DataFrame.
+    """
+    return {season: read_table(partition_path(directory, table, season))
+            for season in seasons if has_partition(directory, table, season)}
+
+def list_tables(directory):
+    """
+    Lists the tables in a directory, in any format.
+
+    Returns:
+        list: Sorted paths of the tables, without file extension.
+    """
+    paths = set()
+    for extension in FORMATS.values():
+        for file in glob.glob(os.path.join(directory, '*' + extension)):
+            paths.add(file[:-len(extension)])
+    return sorted(paths)
+
+def spill(rows, directory=None):
+    """
+    Writes rows to a temporary file, e.g. a sorted run of an external sort.
+
+    Args:
+        rows (iterable): Picklable rows.
+        directory (str, optional): Directory of the file; the default
+            temporary directory if not given.
+
+    Returns:
+        str: Path of the file, see ``read_spilled``.
+    """
+    f = tempfile.NamedTemporaryFile(prefix='spill-', dir=directory, delete=False)
+    with f:
+        for row in rows:
+            pickle.dump(row, f, pickle.HIGHEST_PROTOCOL)
+    return f.name
+
+def read_spilled(path):
+    """
+    Streams the rows written by ``spill`` and deletes the file once they
+    are read or the stream is closed.
+    """
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+    finally:
+        os.remove(path)
@@ -0,0 +1,171 @@
+import argparse
+import csv
+import heapq
+import itertools
+import os
+import tempfile
+from operator import itemgetter
+
+from paths import PROCESSED_DIR
+from storage import iter_table, list_tables, read_spilled, read_table, spill, table_file
+
+# Column group of every season in the wide table, e.g. "2019salary"
+SEASON_COLUMNS = ['salary', 'rank', 'team']
+
+
+def sorted_rows(path, columns, chunksize, directory=None):
+    """
+    Streams the rows of a table sorted by their first column, a uuid such as
+    the player uuid.
+
+    The table is read in chunks; each chunk is sorted and, unless it is the
+    only one, spilled to a temporary file. The sorted runs are then merged,
+    so only one chunk is held in memory. Rows of the same player keep their
+    order in the table.
+
+    Args:
+        path (str): Path of the table without file extension.
+        columns (list): Columns to return, starting with the uuid.
+        chunksize (int): Rows per chunk.
+        directory (str, optional): Directory of the temporary files.
+
+    Returns:
+        iterator: Tuples of the column values. Unlinked rows are left out.
+    """
+    key = columns[0]
+    runs, pending = [], None
+    for chunk in iter_table(path, columns=columns, chunksize=chunksize):
+        chunk = chunk[chunk[key].notna() & (chunk[key] != '')]
+        chunk = chunk.astype({key: str}).sort_values(key, kind='stable')
+        if pending is not None:
+            runs.append(spill(pending, directory))
+        pending = list(chunk[columns].itertuples(index=False, name=None))
+    return heapq.merge(*[read_spilled(run) for run in runs], pending or [], key=itemgetter(0))
+
+def first_per_key(rows):
+    """
+    Keeps the first of the sorted rows of every player.
+    """
+    for _, group in itertools.groupby(rows, key=itemgetter(0)):
+        yield next(group)
+
+def merge_join(streams, how='inner'):
+    """
+    Joins streams of rows sorted by a unique key in one pass.
+
+    Args:
+        streams (list): Iterators of ``(key, values)`` pairs, sorted by key.
+        how (str): "inner" to only keep keys present in every stream, "left"
+            to keep the keys of the first stream, "outer" to keep all keys.
+
+    Yields:
+        tuple: ``(key, values)`` with the values of every stream, None where
+        a stream lacks the key.
+    """
+    def tag(index, stream):
+        for key, values in stream:
+            yield key, index, values
+
+    tagged = [tag(index, stream) for index, stream in enumerate(streams)]
+    for key, group in itertools.groupby(heapq.merge(*tagged), key=itemgetter(0)):
+        values = [None] * len(streams)
+        for _, index, stream_values in group:
+            values[index] = stream_values
+        if how == 'inner' and any(value is None for value in values):
+            continue
+        if how == 'left' and values[0] is None:
+            continue
+        yield key, values
+
+def season_rows(directory, season, chunksize, temp_dir=None):
+    """
+    Streams the salary, rank and team of every player in one season, sorted
+    by player uuid.
+
+    Players without stats that season keep their salary; seasons without a
+    stats table have salaries only.
+    """
+    salaries = first_per_key(sorted_rows(os.path.join(directory, 'salaries', f'salaries_{season}'),
+                                         ['player_uuid', 'salary_in_usd'], chunksize, temp_dir))
+    streams = [((row[0], row[1:]) for row in salaries)]
+    try:
+        stats_path = os.path.join(directory, 'stats', f'stats_{season}')
+        table_file(stats_path)
+        stats = first_per_key(sorted_rows(stats_path, ['player_uuid', 'RANK', 'team_uuid'], chunksize, temp_dir))
+        streams.append((row[0], row[1:]) for row in stats)
+    except FileNotFoundError:
+        pass
+
+    for key, values in merge_join(streams, how='left'):
+        (salary,) = values[0]
+        rank, team = values[1] if len(values) > 1 and values[1] is not None else (None, None)
+        yield key, (salary, rank, team)
+
+def list_seasons(directory=PROCESSED_DIR):
+    """
+    Returns the seasons with a salaries table, e.g. "2019_2020".
+    """
+    return [os.path.basename(path)[len('salaries_'):]
+            for path in list_tables(os.path.join(directory, 'salaries'))]
+
+def build_wide_table(output, directory=PROCESSED_DIR, seasons=None, how='inner', chunksize=100000):
+    """
+    Writes the wide table of four_years_keyvalue_integrate.ktr: one row per
+    player with a salary, rank and team column per season.
+
+    Every season and the player names are read as streams sorted by player
+    uuid and merged in a single pass, so the memory is bounded by the chunk
+    size and the number of seasons, not by the number of players. Only the
+    names of the teams, a few dozen, are held in memory.
+
+    Args:
+        output (str): Path of the CSV file to write.
+        directory (str): Directory of the processed tables.
+        seasons (list, optional): Seasons to include, e.g. "2019_2020"; all
+            with a salaries table if not given.
+        how (str): "inner" keeps the players of every season, as the Kettle
+            transformation does; "outer" keeps every player.
+        chunksize (int): Rows read and sorted at a time.
+
+    Returns:
+        int: Number of players written.
+    """
+    seasons = seasons or list_seasons(directory)
+    teams = read_table(os.path.join(directory, 'teams_with_uuid'), columns=['uuid', 'name'])
+    team_names = dict(zip(teams['uuid'].astype(str), teams['name']))
+
+    years = [season[:4] for season in seasons]
+    header = ['player_uuid', 'NAME'] + [year + column for year in years for column in SEASON_COLUMNS]
+    rows = 0
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix='wide-table-') as temp_dir, \
+            open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        streams = [season_rows(directory, season, chunksize, temp_dir) for season in seasons]
+        players = first_per_key(sorted_rows(os.path.join(directory, 'unique_players'), ['uuid', 'NAME'],
+                                            chunksize, temp_dir))
+        seasons = merge_join(streams, how=how)
+        for key, (values, name) in merge_join([seasons, ((row[0], row[1]) for row in players)], how='left'):
+            record = [key, name if name is not None else '']
+            for season_values in values:
+                salary, rank, team = season_values or (None, None, None)
+                record += [salary, rank, team_names.get(str(team), '') if team is not None else '']
+            writer.writerow(['' if value is None or value != value else value for value in record])
+            rows += 1
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Builds the wide table of salaries, ranks and teams per season.')
+    parser.add_argument('--output', default=os.path.join(PROCESSED_DIR, 'four_years_data.csv'),
+                        help='CSV file to write')
+    parser.add_argument('--directory', default=PROCESSED_DIR, help='directory of the processed tables')
+    parser.add_argument('--seasons', nargs='+', default=None, help='seasons to include, e.g. 2019_2020')
+    parser.add_argument('--how', choices=['inner', 'outer'], default='inner',
+                        help='keep the players of every season (inner) or of any season (outer)')
+    parser.add_argument('--chunksize', type=int, default=100000, help='rows read and sorted at a time')
+    args = parser.parse_args()
+
+    rows = build_wide_table(args.output, args.directory, args.seasons, args.how, args.chunksize)
+    print(f'Wrote {rows} players to {args.output}')
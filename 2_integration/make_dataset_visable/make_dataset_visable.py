@@ -1,39 +1,102 @@
 # Import pandas library
+import os
+import re
+import sys
 import pandas as pd
 
-# Read the dataset
-df = pd.read_csv(r"D:\data-integration\four_years_data.csv")
-
-# Define a function to calculate the total number of championships for each player based on their four-year teams
-def get_championships(row):
-    # The Western champions for 2019-2022
-    Wchampion_teams = ["Gol", "Los", "Pho","Gol"]
-    # The Eastern champions for 2019-2022
-    Echampion_teams = ["Ste", "Fra", "Mon","Ste"]
-    # Initialize the total number of championships as 0
-    total = 0
-    # Loop through the player's four-year teams
-    for i, team in enumerate([row["2019team"], row["2020team"], row["2021team"], row["2022team"]]):
-        # If the team is one of the Western or Eastern champions, increase the total number of championships by 1
-        if team in [Wchampion_teams[i], Echampion_teams[i]]:
-            total += 1
-    # Return the total number of championships
-    return total
-
-# Apply the function to each row of the dataset and create a new column
-df["total_championships"] = df.apply(get_championships, axis=1)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ezzeddine'))
+from aliases import team_aliases
+from identifiers import normalize_key
+from paths import PROCESSED_DIR
+from star_schema import read_seasons
+from storage import read_table
+
+# Read the dataset, as built by wide_table.py or else by the Kettle job
+four_years_path = os.path.join(PROCESSED_DIR, 'four_years_data.csv')
+if not os.path.exists(four_years_path):
+    four_years_path = r"D:\data-integration\four_years_data.csv"
+df = pd.read_csv(four_years_path)
+
+# Define a function to calculate the total number of championships for each player based on the teams of all seasons
+def count_championships(df, teams, champions, stats=None, players=None):
+    """
+    Counts the seasons in which the team of each player won its conference.
+
+    The Kettle job writes the first three letters of the team name, so "Los"
+    stands for both Los Angeles teams and "New" for New Orleans and New York.
+    Those seasons take the team of the player in the stats instead.
+
+    Args:
+        df (pandas.DataFrame): Wide table with a "<year>team" column per season.
+        teams (pandas.DataFrame): Teams with their uuids and abbreviations.
+        champions (pandas.DataFrame): Champions with the uuid of the winning
+            team and the year the season started in.
+        stats (pandas.DataFrame, optional): Stats of all seasons with the
+            "player_uuid", "team_uuid" and "season" (e.g. "2019-2020"), to
+            resolve ambiguous teams. They count for no title if not given.
+        players (pandas.DataFrame, optional): Players with their uuid and
+            "NAME", to find the players of a wide table without "player_uuid".
+
+    Returns:
+        pandas.Series: Number of championships per row of ``df``.
+    """
+    # The seasons of the table, e.g. "2019" for the column "2019team"
+    years = sorted(column[:4] for column in df.columns if re.fullmatch(r'\d{4}team', column))
+
+    # One row per player and season, with the team resolved to its uuid
+    seasons = (df[[year + 'team' for year in years]]
+               .set_axis(years, axis=1)
+               .rename_axis('row')
+               .reset_index()
+               .melt(id_vars='row', var_name='year', value_name='team'))
+    seasons['team_uuid'] = team_aliases(teams).resolve(seasons['team'])
+
+    # Resolve the ambiguous teams by player and season
+    unresolved = (seasons['team_uuid'] == '').to_numpy()
+    if stats is not None and unresolved.any():
+        if 'player_uuid' in df.columns:
+            player_uuids = df['player_uuid'].astype(str)
+        else:
+            uuids = dict(zip(players['NAME'].map(normalize_key), players['uuid'].astype(str)))
+            player_uuids = df['NAME'].map(lambda name: uuids.get(normalize_key(name), '')
+                                          if isinstance(name, str) else '')
+        played = dict(zip(zip(stats['player_uuid'].astype(str), stats['season'].astype(str).str[:4]),
+                          stats['team_uuid'].astype(str)))
+        keys = zip(player_uuids.to_numpy()[seasons.loc[unresolved, 'row']], seasons.loc[unresolved, 'year'])
+        seasons.loc[unresolved, 'team_uuid'] = [played.get(key, '') for key in keys]
+
+    # Join against the Western and Eastern champions by team and season
+    titles = (champions[['champion_uuid', 'year']]
+              .astype({'champion_uuid': str, 'year': str})
+              .drop_duplicates())
+    won = seasons.merge(titles, left_on=['team_uuid', 'year'], right_on=['champion_uuid', 'year'])
+
+    # Count the championships of every player
+    return won.groupby('row').size().reindex(df.index, fill_value=0)
+
+# Look up the championships of every player and create a new column
+df["total_championships"] = count_championships(
+    df,
+    read_table(os.path.join(PROCESSED_DIR, 'teams_with_uuid')),
+    read_table(os.path.join(PROCESSED_DIR, 'champions_with_team_ids')),
+    read_seasons(os.path.join(PROCESSED_DIR, 'stats'), columns=['player_uuid', 'team_uuid']),
+    read_table(os.path.join(PROCESSED_DIR, 'unique_players'), columns=['uuid', 'NAME']),
+)
 
 # Import matplotlib library
 import matplotlib.pyplot as plt
 
 # Define a color dictionary to map different colors based on the total_championships value
 colors = {0: "red", 1: "blue", 2: "green", 3: "yellow", 4: "purple"}
+# Players of longer histories can win more than four times
+for total in range(len(colors), int(df["total_championships"].max()) + 1):
+    colors[total] = plt.cm.viridis(total / (df["total_championships"].max() or 1))
 
 # Define a year list
-years = ["2019", "2020", "2021", "2022"]
+years = sorted(column[:4] for column in df.columns if re.fullmatch(r'\d{4}team', column))
 
-# Create a 2x2 image layout
-fig, axes = plt.subplots(2, 2)
+# Create an image layout with two columns
+fig, axes = plt.subplots((len(years) + 1) // 2, 2, squeeze=False)
 
 # Loop through the four years
 for i, year in enumerate(years):
@@ -61,7 +124,7 @@ for year in years:
     ax.scatter(df[year + "rank"], df[year + "salary"], c=df["total_championships"].map(colors), alpha=0.5)
 
 # Add title and axis labels for the image
-ax.set_title("Salary vs Rank for NBA Players (2019-2022)")
+ax.set_title("Salary vs Rank for NBA Players (" + years[0] + "-" + years[-1] + ")")
 ax.set_xlabel("Rank")
 ax.set_ylabel("Salary")
 
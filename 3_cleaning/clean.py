@@ -0,0 +1,234 @@
+import argparse
+import os
+import re
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_integration', 'ezzeddine'))
+from paths import CLEANED_DIR, PROCESSED_DIR
+from storage import FORMATS, POSITIONS, iter_table, list_tables, read_table, table_file, table_name, write_table
+from validation import (DuplicateRule, NotNullRule, PatternRule, RangeRule, ReferenceRule, TypeRule,
+                        validate)
+
+# Statistics given in percent
+PERCENTAGES = ['USG%', 'TO%', 'FT%', '2P%', '3P%', 'eFG%', 'TS%']
+
+# Statistics that count or average events and can't be negative
+COUNTS = ['GP', 'MPG', 'FTA', '2PA', '3PA', 'PPG', 'RPG', 'APG', 'P+A', 'SPG', 'BPG', 'TPG', 'VI', 'ORtg', 'DRtg']
+
+
+def teams_rules(references):
+    return [
+        TypeRule('uuid', 'uuid', action='drop'),
+        DuplicateRule(['uuid'], action='drop'),
+        NotNullRule('name'),
+        DuplicateRule(['name']),
+    ]
+
+def champions_rules(references):
+    return [
+        TypeRule('uuid', 'uuid', action='drop'),
+        DuplicateRule(['uuid'], action='drop'),
+        RangeRule('year', 1946, None),
+        PatternRule('region', 'western|eastern'),
+        DuplicateRule(['year', 'region']),
+        ReferenceRule('champion_uuid', references['teams']),
+    ]
+
+def players_rules(references):
+    return [
+        TypeRule('uuid', 'uuid', action='drop'),
+        DuplicateRule(['uuid'], action='drop'),
+        NotNullRule('NAME', action='drop'),
+    ]
+
+def stats_rules(references):
+    return [
+        # Stats of players that were not linked can't be joined with anything
+        ReferenceRule('player_uuid', references['players'], action='drop'),
+        ReferenceRule('team_uuid', references['teams']),
+        # A player traded during the season keeps the first row, as in star_schema
+        DuplicateRule(['player_uuid'], keep='first', action='drop'),
+        PatternRule('POS', '|'.join(re.escape(position) for position in POSITIONS)),
+        RangeRule('RANK', 1, None),
+        RangeRule('AGE', 15, 50, action='null'),
+        RangeRule('GP', 0, 82),
+    ] + [RangeRule(column, 0, 100, action='null') for column in PERCENTAGES] \
+      + [RangeRule(column, 0, None, action='null') for column in COUNTS if column != 'GP']
+
+def salaries_rules(references):
+    return [
+        TypeRule('uuid', 'uuid', action='drop'),
+        DuplicateRule(['uuid'], action='drop'),
+        ReferenceRule('player_uuid', references['players'], action='drop'),
+        DuplicateRule(['player_uuid'], keep='first'),
+        TypeRule('salary_in_usd', 'float'),
+        NotNullRule('salary_in_usd', action='drop'),
+        RangeRule('salary_in_usd', 0, None, action='drop'),
+    ]
+
+# Rules of every processed table, keyed by the table name without its
+# season suffix. Each function gets the keys of the reference tables.
+TABLE_RULES = {
+    'teams_with_uuid': teams_rules,
+    'champions_with_team_ids': champions_rules,
+    'unique_players': players_rules,
+    'stats': stats_rules,
+    'salaries': salaries_rules,
+}
+
+
+def load_references(directory=PROCESSED_DIR):
+    """
+    Loads the uuids that the foreign keys of the processed tables refer to.
+
+    Returns:
+        dict: The uuids of the "players" and of the "teams".
+    """
+    return {
+        'players': read_table(os.path.join(directory, 'unique_players'), columns=['uuid'])['uuid'],
+        'teams': read_table(os.path.join(directory, 'teams_with_uuid'), columns=['uuid'])['uuid'],
+    }
+
+def table_report(table, validation):
+    """
+    Returns the violations of one table, as rows of the validation report.
+    """
+    report = validation.summary()
+    report.insert(0, 'table', table)
+    report.insert(1, 'rows', validation.rows)
+    return report
+
+def clean_table(path, rules, output=None, chunksize=100000):
+    """
+    Validates a processed table and writes its cleaned rows.
+
+    The rules are evaluated on chunks of the table in one pass. The cleaned
+    rows are then read again chunk by chunk and cleaned with the violation
+    masks.
+
+    Args:
+        path (str): Path of the table without file extension.
+        rules (list): ``validation.Rule`` objects.
+        output (str, optional): Path of the cleaned table without file
+            extension, written in the format of the table; nothing is
+            written if not given.
+        chunksize (int): Rows validated at a time.
+
+    Returns:
+        Validation: The violations of every rule.
+    """
+    validation = validate(iter_table(path, chunksize=chunksize), rules)
+    if output is not None:
+        chunks, start = [], 0
+        for chunk in iter_table(path, chunksize=chunksize):
+            chunks.append(validation.apply(chunk, start))
+            start += len(chunk)
+        cleaned = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+        format = {extension: format for format, extension in FORMATS.items()}[os.path.splitext(table_file(path))[1]]
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        write_table(cleaned, output, format)
+    return validation
+
+def list_processed_tables(directory=PROCESSED_DIR):
+    """
+    Lists the processed tables with rules, including every season of the
+    stats and salaries.
+
+    Returns:
+        list: Paths of the tables relative to ``directory``, without extension.
+    """
+    tables = []
+    for path in list_tables(directory) + list_tables(os.path.join(directory, 'stats')) \
+            + list_tables(os.path.join(directory, 'salaries')):
+        if table_name(path) in TABLE_RULES:
+            tables.append(os.path.relpath(path, directory))
+    return tables
+
+def clean_tables(directory=PROCESSED_DIR, output=CLEANED_DIR, chunksize=100000):
+    """
+    Validates and cleans every processed table.
+
+    Args:
+        directory (str): Directory of the processed tables.
+        output (str, optional): Directory of the cleaned tables, laid out as
+            ``directory``; only validates if None.
+        chunksize (int): Rows validated at a time.
+
+    Returns:
+        pandas.DataFrame: Violations per table and rule.
+    """
+    references = load_references(directory)
+    reports = []
+    for table in list_processed_tables(directory):
+        rules = TABLE_RULES[table_name(table)](references)
+        validation = clean_table(os.path.join(directory, table), rules,
+                                 os.path.join(output, table) if output is not None else None, chunksize)
+        reports.append(table_report(table, validation))
+
+    report = pd.concat(reports, ignore_index=True)
+    if output is not None:
+        report.to_csv(os.path.join(output, 'validation_report.csv'), index=False)
+    return report
+
+def clean_frames(tables):
+    """
+    Validates and cleans processed tables held in memory, e.g. the outputs of
+    the integration pipeline before they are written.
+
+    Args:
+        tables (dict): Maps the path of every table relative to the processed
+            directory, e.g. "stats/stats_2019_2020", to its DataFrame. Must
+            include "unique_players" and "teams_with_uuid", the references
+            of the foreign keys.
+
+    Returns:
+        tuple: ``(cleaned, report)`` with the cleaned tables, keyed like
+        ``tables``, and the violations per table and rule.
+    """
+    references = {'players': tables['unique_players']['uuid'], 'teams': tables['teams_with_uuid']['uuid']}
+    cleaned, reports = {}, []
+    for table, df in tables.items():
+        if table_name(table) not in TABLE_RULES:
+            continue
+        validation = validate(df, TABLE_RULES[table_name(table)](references))
+        cleaned[table] = validation.apply(df)
+        reports.append(table_report(table, validation))
+    return cleaned, pd.concat(reports, ignore_index=True)
+
+def write_cleaned(cleaned, report, output=CLEANED_DIR, format=None):
+    """
+    Writes the tables and report of ``clean_frames``, laid out like
+    ``clean_tables`` writes them.
+
+    Args:
+        format (str, optional): Format of the tables, see ``storage.FORMATS``.
+    """
+    for table, df in cleaned.items():
+        os.makedirs(os.path.dirname(os.path.join(output, table)), exist_ok=True)
+        write_table(df, os.path.join(output, table), format)
+    report.to_csv(os.path.join(output, 'validation_report.csv'), index=False)
+
+def read_cleaned(output=CLEANED_DIR):
+    """
+    Reads back the tables and report written by ``write_cleaned``.
+
+    Returns:
+        tuple: ``(cleaned, report)`` as returned by ``clean_frames``.
+    """
+    cleaned = {table: read_table(os.path.join(output, table)) for table in list_processed_tables(output)}
+    return cleaned, pd.read_csv(os.path.join(output, 'validation_report.csv'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Validates and cleans the processed tables.')
+    parser.add_argument('--directory', default=PROCESSED_DIR, help='directory of the processed tables')
+    parser.add_argument('--output', default=CLEANED_DIR, help='directory to write the cleaned tables to')
+    parser.add_argument('--check', action='store_true', help='only validate, do not write cleaned tables')
+    parser.add_argument('--chunksize', type=int, default=100000, help='rows validated at a time')
+    args = parser.parse_args()
+
+    report = clean_tables(args.directory, None if args.check else args.output, args.chunksize)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(report[report['violations'] > 0].to_string(index=False))
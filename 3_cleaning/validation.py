@@ -0,0 +1,288 @@
+import abc
+import re
+
+import numpy as np
+import pandas as pd
+
+# What happens to the rows or values that violate a rule when a table is cleaned
+ACTIONS = ['flag', 'drop', 'null']
+
+UUID_PATTERN = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+
+
+class Rule(abc.ABC):
+    """
+    Declarative check of the rows of a table.
+
+    ``check`` evaluates the rule on a chunk of rows as column expressions and
+    returns a boolean array that is True for every violating row. Rules that
+    need all rows, like ``DuplicateRule``, also override ``update`` and
+    ``finish``.
+    """
+
+    def __init__(self, name, columns, action='flag'):
+        """
+        Args:
+            name (str): Name of the rule in the report.
+            columns (list): Columns the rule checks.
+            action (str): One of ``ACTIONS``: keep violating rows ("flag"),
+                drop them ("drop") or blank the checked values ("null").
+        """
+        if action not in ACTIONS:
+            raise ValueError(f'Unknown action {action!r}, expected one of {ACTIONS}')
+        self.name = name
+        self.columns = list(columns)
+        self.action = action
+
+    @abc.abstractmethod
+    def check(self, chunk):
+        """
+        Args:
+            chunk (pandas.DataFrame): Rows to check.
+
+        Returns:
+            numpy.ndarray: Boolean mask of the violating rows.
+        """
+
+    def begin(self):
+        self.masks = []
+
+    def update(self, chunk):
+        self.masks.append(np.asarray(self.check(chunk), dtype=bool))
+
+    def finish(self):
+        """
+        Returns:
+            numpy.ndarray: Violation mask of all rows seen since ``begin``.
+        """
+        return np.concatenate(self.masks) if self.masks else np.zeros(0, dtype=bool)
+
+class NotNullRule(Rule):
+    """
+    Values must be present; empty strings count as missing, e.g. the uuid of
+    an unlinked player.
+    """
+
+    def __init__(self, column, action='flag', name=None):
+        super().__init__(name or f'{column}:not_null', [column], action)
+
+    def check(self, chunk):
+        values = chunk[self.columns[0]]
+        return (values.isna() | (values.astype(str) == '')).to_numpy()
+
+class TypeRule(Rule):
+    """
+    Values must be convertible to a type: "float", "int" or "uuid". Missing
+    values are not violations, see ``NotNullRule``.
+    """
+
+    def __init__(self, column, dtype, action='flag', name=None):
+        if dtype not in ('float', 'int', 'uuid'):
+            raise ValueError(f'Unknown type {dtype!r}')
+        super().__init__(name or f'{column}:type', [column], action)
+        self.dtype = dtype
+
+    def check(self, chunk):
+        values = chunk[self.columns[0]]
+        present = values.notna().to_numpy()
+        if self.dtype == 'uuid':
+            matches = values.astype(str).str.fullmatch(UUID_PATTERN).fillna(False).to_numpy(dtype=bool)
+            return present & ~matches
+        numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+        invalid = np.isnan(numbers)
+        if self.dtype == 'int':
+            invalid |= np.isfinite(numbers) & (numbers != np.round(numbers))
+        return present & invalid
+
+class RangeRule(Rule):
+    """
+    Numeric values must lie between a lower and an upper bound, both included.
+    Missing and non-numeric values are left to the other rules.
+    """
+
+    def __init__(self, column, min=None, max=None, action='flag', name=None):
+        super().__init__(name or f'{column}:range', [column], action)
+        self.min, self.max = min, max
+
+    def check(self, chunk):
+        numbers = pd.to_numeric(chunk[self.columns[0]], errors='coerce').to_numpy(dtype=float)
+        invalid = np.zeros(len(numbers), dtype=bool)
+        if self.min is not None:
+            invalid |= numbers < self.min
+        if self.max is not None:
+            invalid |= numbers > self.max
+        return invalid
+
+class PatternRule(Rule):
+    """
+    Values must match a regular expression as a whole.
+    """
+
+    def __init__(self, column, pattern, action='flag', name=None):
+        super().__init__(name or f'{column}:pattern', [column], action)
+        self.pattern = re.compile(pattern)
+
+    def check(self, chunk):
+        values = chunk[self.columns[0]]
+        matches = values.astype(str).str.fullmatch(self.pattern).fillna(False).to_numpy(dtype=bool)
+        return values.notna().to_numpy() & ~matches
+
+class ReferenceRule(Rule):
+    """
+    Values must be keys of a reference table, e.g. every ``player_uuid`` must
+    be the uuid of a player. Missing and empty values violate the rule too, so
+    rows that were not linked are counted.
+    """
+
+    def __init__(self, column, keys, action='flag', name=None):
+        """
+        Args:
+            column (str): Column of the foreign keys.
+            keys (array-like): Keys of the reference table.
+        """
+        super().__init__(name or f'{column}:reference', [column], action)
+        self.keys = pd.Index(pd.Series(keys, dtype=object).dropna().astype(str).unique())
+
+    def check(self, chunk):
+        values = chunk[self.columns[0]]
+        return ~values.astype(object).isin(self.keys).to_numpy()
+
+class DuplicateRule(Rule):
+    """
+    Rows must be unique on some columns.
+
+    The keys of every chunk are hashed as they arrive and the duplicates are
+    determined over all rows at the end, so duplicates in different chunks are
+    found as well. Rows with a missing key value, including an empty string as
+    in ``NotNullRule``, are never duplicates.
+    """
+
+    def __init__(self, columns, keep='first', action='flag', name=None):
+        """
+        Args:
+            columns (list): Columns that identify a row.
+            keep (str or bool): "first" or "last" to not count one row of every key,
+                False to count all rows of a duplicated key.
+        """
+        super().__init__(name or f'{"+".join(columns)}:duplicate', columns, action)
+        self.keep = keep
+
+    def _keys(self, chunk):
+        keys = chunk[self.columns]
+        hashes = pd.util.hash_pandas_object(keys.astype(object), index=False).to_numpy()
+        present = (keys.notna() & (keys.astype(str) != '')).all(axis=1).to_numpy()
+        return hashes, present
+
+    def _duplicated(self, hashes, present):
+        duplicated = np.zeros(len(hashes), dtype=bool)
+        duplicated[present] = pd.Series(hashes[present]).duplicated(keep=self.keep).to_numpy()
+        return duplicated
+
+    def check(self, chunk):
+        """
+        Finds the duplicates within one chunk only; ``validate`` finds them
+        across all chunks.
+        """
+        return self._duplicated(*self._keys(chunk))
+
+    def begin(self):
+        self.hashes, self.present = [], []
+
+    def update(self, chunk):
+        hashes, present = self._keys(chunk)
+        self.hashes.append(hashes)
+        self.present.append(present)
+
+    def finish(self):
+        if not self.hashes:
+            return np.zeros(0, dtype=bool)
+        return self._duplicated(np.concatenate(self.hashes), np.concatenate(self.present))
+
+
+class Validation:
+    """
+    Violations of a set of rules, one boolean mask per rule over all rows.
+    """
+
+    def __init__(self, rules, masks, rows):
+        self.rules = {rule.name: rule for rule in rules}
+        self.masks = masks
+        self.rows = rows
+        self._dropped = None
+
+    @property
+    def counts(self):
+        """
+        dict: Number of violating rows per rule.
+        """
+        return {name: int(mask.sum()) for name, mask in self.masks.items()}
+
+    def dropped(self):
+        """
+        Returns:
+            numpy.ndarray: Mask of the rows violating any rule whose action is "drop".
+        """
+        if self._dropped is None:
+            self._dropped = np.zeros(self.rows, dtype=bool)
+            for name, mask in self.masks.items():
+                if self.rules[name].action == 'drop':
+                    self._dropped |= mask
+        return self._dropped
+
+    def apply(self, chunk, start=0):
+        """
+        Cleans a chunk of the validated rows: drops the rows and blanks the
+        values of the rules with the actions "drop" and "null".
+
+        Args:
+            chunk (pandas.DataFrame): Rows ``start`` to ``start + len(chunk)``
+                of the validated table.
+            start (int): Position of the first row of the chunk.
+
+        Returns:
+            pandas.DataFrame: The cleaned rows.
+        """
+        stop = start + len(chunk)
+        chunk = chunk.copy()
+        for name, mask in self.masks.items():
+            rule = self.rules[name]
+            if rule.action == 'null':
+                chunk.loc[mask[start:stop], rule.columns] = None
+        return chunk[~self.dropped()[start:stop]]
+
+    def summary(self):
+        """
+        Returns:
+            pandas.DataFrame: Rule, checked columns, action and number of
+            violations, one row per rule.
+        """
+        return pd.DataFrame({
+            'rule': list(self.masks),
+            'columns': [', '.join(self.rules[name].columns) for name in self.masks],
+            'action': [self.rules[name].action for name in self.masks],
+            'violations': list(self.counts.values()),
+        })
+
+
+def validate(chunks, rules):
+    """
+    Evaluates rules on the rows of a table in one pass.
+
+    Args:
+        chunks (iterable): DataFrames with consecutive rows of the table, e.g.
+            from ``storage.iter_table``, or a single DataFrame.
+        rules (list): ``Rule`` objects.
+
+    Returns:
+        Validation: Violation mask and count of every rule.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    for rule in rules:
+        rule.begin()
+    rows = 0
+    for chunk in chunks:
+        for rule in rules:
+            rule.update(chunk)
+        rows += len(chunk)
+    return Validation(rules, {rule.name: rule.finish() for rule in rules}, rows)
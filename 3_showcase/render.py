@@ -0,0 +1,98 @@
+import json
+import os
+import sys
+
+import matplotlib
+
+# Render to files only; never open a window or block on plt.show()
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_integration', 'ezzeddine'))
+from pipeline import content_hash
+
+# Above this many points, scatter plots are drawn as hexagonal bins
+POINT_THRESHOLD = 20000
+
+
+def scatter(ax, x, y, c=None, threshold=POINT_THRESHOLD, gridsize=60, **kwargs):
+    """
+    Draws a scatter plot, or a hexbin plot once there are too many points to
+    draw them one by one.
+
+    Args:
+        ax (matplotlib.axes.Axes): Axes to draw on.
+        x (array-like): Horizontal coordinates.
+        y (array-like): Vertical coordinates.
+        c (array-like, optional): Value of every point. Hexagons are coloured
+            by the mean value of their points, or by their point count if
+            not given.
+        threshold (int): Largest number of points drawn individually.
+        gridsize (int): Number of hexagons along the x axis.
+        **kwargs: Passed on to ``ax.scatter`` for small inputs.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    if len(x) <= threshold:
+        return ax.scatter(x, y, c=c, **kwargs)
+
+    if c is None:
+        return ax.hexbin(x, y, gridsize=gridsize, bins='log', mincnt=1)
+    return ax.hexbin(x, y, C=np.asarray(c, dtype=float), reduce_C_function=np.mean,
+                     gridsize=gridsize, mincnt=1)
+
+
+class FigureCache:
+    """
+    Directory of rendered figures, each stored with the hash of the data it
+    was drawn from. A figure is only redrawn once its data or its parameters
+    change.
+    """
+
+    def __init__(self, directory, force=False):
+        """
+        Args:
+            directory (str): Directory the images are written to.
+            force (bool): Redraw every figure, even if it is up to date.
+        """
+        self.directory = directory
+        self.force = force
+        self.manifest_path = os.path.join(directory, 'figures.json')
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self.manifest = json.load(f)
+
+    def render(self, name, data, draw, params=None, figsize=None):
+        """
+        Renders a figure unless an up-to-date image of it exists.
+
+        Args:
+            name (str): File name of the image, without extension.
+            data: DataFrame, or dict or list of DataFrames, the figure shows.
+            draw (callable): Called as ``draw(fig, data)`` to draw the figure.
+            params (dict, optional): Other values the figure depends on, such
+                as the point threshold.
+            figsize (tuple, optional): Size of the figure in inches.
+
+        Returns:
+            bool: Whether the figure was redrawn.
+        """
+        key = content_hash([data, params or {}])
+        path = os.path.join(self.directory, name + '.png')
+        if not self.force and self.manifest.get(name) == key and os.path.exists(path):
+            return False
+
+        fig = plt.figure(figsize=figsize)
+        try:
+            draw(fig, data)
+            os.makedirs(self.directory, exist_ok=True)
+            fig.savefig(path, bbox_inches='tight')
+        finally:
+            plt.close(fig)
+
+        self.manifest[name] = key
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        return True
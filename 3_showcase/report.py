@@ -0,0 +1,137 @@
+import argparse
+import math
+import os
+import sys
+
+import seaborn as sns
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_integration', 'ezzeddine'))
+from database import DATABASE_PATH, IntegratedStore
+from paths import PROCESSED_DIR
+from render import POINT_THRESHOLD, FigureCache, scatter
+from star_schema import build_fact_table, read_seasons
+from storage import read_table
+
+performance_metrics = ['RANK', 'PPG', 'RPG', 'APG', 'SPG', 'BPG', 'USG%', 'TO%', 'eFG%', 'TS%']
+
+# Colours of the number of championships, as in make_dataset_visable.py
+colors = {0: "red", 1: "blue", 2: "green", 3: "yellow", 4: "purple"}
+
+
+def load_player_seasons(database=None):
+    """
+    Loads the fact table of every player and season, and counts the seasons
+    in which the player's team won its conference.
+
+    Args:
+        database (str, optional): SQLite file built by ``database.py``; the
+            fact table is then read from its player_seasons view instead of
+            joining the processed files.
+
+    Returns:
+        pandas.DataFrame: One row per player and season.
+    """
+    if database is not None:
+        with IntegratedStore(database) as store:
+            data = store.player_seasons(['player_uuid', 'team_uuid', 'season', 'POS', 'AGE', 'salary_in_usd',
+                                         'won_conference'] + performance_metrics)
+    else:
+        stats = read_seasons(os.path.join(PROCESSED_DIR, 'stats'),
+                             ['player_uuid', 'team_uuid', 'POS', 'AGE'] + performance_metrics)
+        salaries = read_seasons(os.path.join(PROCESSED_DIR, 'salaries'), ['player_uuid', 'salary_in_usd'])
+        champions = read_table(os.path.join(PROCESSED_DIR, 'champions_with_team_ids'),
+                               columns=['year', 'champion_uuid'])
+        data = build_fact_table(stats, salaries, champions=champions)
+
+    data['total_championships'] = data.groupby('player_uuid', observed=True)['won_conference'].transform('sum')
+    data['season'] = data['season'].astype(str)
+    return data
+
+
+def draw_salary_boxplot(fig, data):
+    ax = fig.add_subplot()
+    # Individual outliers are only drawn as long as there are few points
+    ax.boxplot(data['salary_in_usd'].dropna(), showfliers=len(data) <= POINT_THRESHOLD)
+    ax.set_title('Boxplot of Salaries')
+
+def draw_correlations(fig, data):
+    sns.heatmap(data.corr(), annot=True, ax=fig.add_subplot())
+
+def draw_salary_by_position(fig, data):
+    ax = fig.add_subplot()
+    data.groupby('POS')['salary_in_usd'].mean().plot(kind='bar', ax=ax)
+    ax.set_title('Average Salary by Position')
+    ax.set_xlabel('Position')
+    ax.set_ylabel('Average Salary')
+
+def draw_salary_by_season(fig, data):
+    ax = fig.add_subplot()
+    data.groupby('season')['salary_in_usd'].mean().plot(ax=ax)
+    ax.set_title('Average Salary by Season')
+    ax.set_xlabel('Season')
+    ax.set_ylabel('Average Salary')
+
+def draw_salary_vs_rank(fig, data, threshold=POINT_THRESHOLD):
+    seasons = sorted(data['season'].unique())
+    axes = fig.subplots(math.ceil(len(seasons) / 2), 2, squeeze=False).ravel()
+    for ax, season in zip(axes, seasons):
+        df = data[data['season'] == season]
+        if len(df) <= threshold:
+            scatter(ax, df['RANK'], df['salary_in_usd'], threshold=threshold,
+                    c=df['total_championships'].map(lambda total: colors.get(total, 'black')))
+        else:
+            bins = scatter(ax, df['RANK'], df['salary_in_usd'], c=df['total_championships'],
+                           threshold=threshold)
+            fig.colorbar(bins, ax=ax, label='Mean championships')
+        ax.set_title('Salary vs Rank for NBA Players (' + season + ')')
+        ax.set_xlabel('Rank')
+        ax.set_ylabel('Salary')
+    for ax in axes[len(seasons):]:
+        ax.set_visible(False)
+    fig.tight_layout()
+
+
+def render_report(directory, threshold=POINT_THRESHOLD, force=False, database=None):
+    """
+    Renders every chart of the showcase to PNG files.
+
+    Args:
+        directory (str): Directory the images are written to.
+        threshold (int): Largest number of points drawn individually in a
+            scatter plot; larger ones are aggregated into hexagonal bins.
+        force (bool): Redraw every chart, even if its data is unchanged.
+        database (str, optional): SQLite file to read the data from, see
+            ``load_player_seasons``.
+
+    Returns:
+        list: Names of the charts that were redrawn.
+    """
+    data = load_player_seasons(database)
+    cache = FigureCache(directory, force=force)
+    params = {'threshold': threshold}
+
+    charts = [
+        ('salary_boxplot', data[['salary_in_usd']], draw_salary_boxplot, None),
+        ('correlations', data[['salary_in_usd'] + performance_metrics], draw_correlations, (10, 10)),
+        ('salary_by_position', data[['POS', 'salary_in_usd']], draw_salary_by_position, None),
+        ('salary_by_season', data[['season', 'salary_in_usd']], draw_salary_by_season, None),
+        ('salary_vs_rank', data[['season', 'RANK', 'salary_in_usd', 'total_championships']],
+         lambda fig, df: draw_salary_vs_rank(fig, df, threshold), (12, 10)),
+    ]
+    return [name for name, chart_data, draw, figsize in charts
+            if cache.render(name, chart_data, draw, params=params, figsize=figsize)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Renders the showcase charts to image files.')
+    parser.add_argument('--output', default=os.path.join(PROCESSED_DIR, 'showcase'),
+                        help='directory to write the images to')
+    parser.add_argument('--threshold', type=int, default=POINT_THRESHOLD,
+                        help='draw scatter plots with more points as hexagonal bins')
+    parser.add_argument('--force', action='store_true', help='redraw charts whose data is unchanged')
+    parser.add_argument('--database', nargs='?', const=DATABASE_PATH, default=None,
+                        help='read the data from the SQLite database built by database.py')
+    args = parser.parse_args()
+
+    redrawn = render_report(args.output, threshold=args.threshold, force=args.force, database=args.database)
+    print(f"Rendered {len(redrawn)} chart(s) to {args.output}: {', '.join(redrawn) or 'all up to date'}")
@@ -0,0 +1,203 @@
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, '2_integration', 'ezzeddine'))
+
+import similarity
+from compact import COMPACT_SCHEMAS, CompactLoader
+from star_schema import build_fact_table
+from synthetic import generate
+
+teams_champs = importlib.import_module('0_integrate_teams_champs')
+players_stats = importlib.import_module('1_integrate_teams_and_players_stats')
+players_salaries = importlib.import_module('2_integrate_players_and_salaries')
+
+
+def measure(func, setup=None, repeat=3):
+    """
+    Times a function over several runs.
+
+    Args:
+        func (callable): Function to time; called with the result of ``setup``.
+        setup (callable, optional): Prepares fresh arguments for every run,
+            outside of the timed region.
+        repeat (int): Number of runs.
+
+    Returns:
+        list: Wall time of every run in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        args = setup() if setup is not None else ()
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def summarize(timings):
+    """
+    Summarizes the runs of a benchmark: the fastest run ("seconds", used for
+    comparisons), the median, the standard deviation and every run.
+    """
+    return {
+        'seconds': min(timings),
+        'median': statistics.median(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        'runs': timings,
+    }
+
+def benchmark_scale(n_players, repeat, fuzzy_threshold):
+    """
+    Times every integration hot path on synthetic data of one scale.
+
+    Returns:
+        list: One record per benchmark.
+    """
+    data = generate(n_players)
+    season = next(iter(data['stats']))
+    stats = players_stats.rename_columns(data['stats'][season], players_stats.column_mapping)
+    players = pd.DataFrame({'NAME': sorted({name for df in data['stats'].values() for name in df['NAME']})})
+    players.insert(0, 'uuid', [f'p{i}' for i in range(len(players))])
+    teams = data['teams'].copy()
+    teams.insert(0, 'uuid', [f't{i}' for i in range(len(teams))])
+    salaries = players_salaries.process_dataframe(data['salaries'][season].copy(), season)
+
+    rng = random.Random(0)
+    names = players['NAME'].tolist()
+    pairs = [(rng.choice(names), rng.choice(names)) for _ in range(min(n_players, 5000))]
+    queries = rng.sample(names, 20)
+
+    records = []
+
+    def record(stage, rows, timings):
+        records.append(dict({'stage': stage, 'scale': n_players, 'rows': rows}, **summarize(timings)))
+
+    record('levenshtein_distance', len(pairs), measure(
+        lambda: [similarity.levenshtein_distance(a, b) for a, b in pairs], repeat=repeat))
+    record('damerau_levenshtein_distance', len(pairs), measure(
+        lambda: [similarity.damerau_levenshtein_distance(a, b) for a, b in pairs], repeat=repeat))
+
+    encoded = similarity.encode_names(names)
+    record('damerau_levenshtein_distances', len(queries) * len(names), measure(
+        lambda: [similarity.damerau_levenshtein_distances(query, encoded) for query in queries],
+        repeat=repeat))
+    record('damerau_levenshtein_distances[max_distance=1]', len(queries) * len(names), measure(
+        lambda: [similarity.damerau_levenshtein_distances(query, encoded, max_distance=1)
+                 for query in queries],
+        repeat=repeat))
+
+    record('add_player_uuid', len(stats), measure(
+        lambda df: players_stats.add_player_uuid(df, players),
+        setup=lambda: (stats.copy(),), repeat=repeat))
+    if fuzzy_threshold is None or n_players <= fuzzy_threshold:
+        record('add_player_uuid[threshold=1]', len(stats), measure(
+            lambda df: players_stats.add_player_uuid(df, players, threshold=1),
+            setup=lambda: (stats.copy(),), repeat=repeat))
+    record('add_team_uuid', len(stats), measure(
+        lambda df: players_stats.add_team_uuid(df, teams),
+        setup=lambda: (stats.copy(),), repeat=repeat))
+    record('integrate_players_salaries', len(salaries), measure(
+        lambda df: players_salaries.integrate_players_salaries(df, players),
+        setup=lambda: (salaries.copy(),), repeat=repeat))
+    record('integrate_teams_champs', len(data['titles']), measure(
+        lambda: teams_champs.integrate_teams_champs(data['teams'], data['titles']), repeat=repeat))
+
+    # The merges of integeration.py, over all seasons
+    linked_stats = pd.concat(
+        players_stats.add_player_uuid(
+            players_stats.rename_columns(df, players_stats.column_mapping), players).assign(season=name)
+        for name, df in data['stats'].items())
+    linked_salaries = pd.concat(
+        players_salaries.integrate_players_salaries(
+            players_salaries.process_dataframe(df.copy(), name), players).assign(season=name)
+        for name, df in data['salaries'].items())
+
+    def merges():
+        merged = pd.merge(linked_salaries, linked_stats, on='player_uuid')
+        merged = pd.merge(merged, players, left_on='player_uuid', right_on='uuid')
+        data = pd.merge(players, linked_salaries, left_on='uuid', right_on='player_uuid')
+        data = pd.merge(data, linked_stats, on='player_uuid')
+        return merged, data
+
+    record('integeration_merges', len(linked_stats) + len(linked_salaries), measure(merges, repeat=repeat))
+
+    # The season-aware fact table, on plain and on compact columns
+    record('fact_table', len(linked_stats) + len(linked_salaries), measure(
+        lambda: build_fact_table(linked_stats, linked_salaries), repeat=repeat))
+    loader = CompactLoader()
+    loader.categories['player'] = pd.Index(players['uuid'])
+    compact_stats = loader.compact(linked_stats, COMPACT_SCHEMAS['stats'])
+    compact_salaries = loader.compact(linked_salaries, COMPACT_SCHEMAS['salaries'])
+    record('fact_table[compact]', len(linked_stats) + len(linked_salaries), measure(
+        lambda: build_fact_table(compact_stats, compact_salaries), repeat=repeat))
+    return records
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline):
+    """
+    Prints the speedup of every benchmark against a baseline result file.
+    Differences smaller than the spread of the runs of either file are marked
+    as noise.
+    """
+    previous = {(r['stage'], r['scale']): r for r in baseline['results']}
+    print(f"{'stage':<48}{'scale':>8}{'baseline':>12}{'current':>12}{'speedup':>10}")
+    for r in results['results']:
+        before = previous.get((r['stage'], r['scale']))
+        if before is None:
+            continue
+        noise = abs(before['seconds'] - r['seconds']) <= before.get('stdev', 0.0) + r.get('stdev', 0.0)
+        print(f"{r['stage']:<48}{r['scale']:>8}{before['seconds']:>12.4f}{r['seconds']:>12.4f}"
+              f"{before['seconds'] / r['seconds']:>9.2f}x" + ('  (noise)' if noise else ''))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Times the integration hot paths on synthetic NBA data.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='numbers of players to generate')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark; the fastest is compared')
+    parser.add_argument('--fuzzy-max-scale', type=int, default=1000,
+                        help='largest scale at which threshold=1 linking is timed')
+    parser.add_argument('--output', help='JSON file to write the results to '
+                                         '(default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    args = parser.parse_args()
+
+    results = {
+        'commit': git_commit(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'results': [],
+    }
+    for scale in args.scales:
+        for r in benchmark_scale(scale, args.repeat, args.fuzzy_max_scale):
+            print(f"{r['stage']:<48}{r['scale']:>8}{r['seconds']:>12.4f}s"
+                  f"  median {r['median']:.4f}s  stdev {r['stdev']:.4f}s")
+            results['results'].append(r)
+
+    output = args.output or os.path.join(BENCHMARKS_DIR, 'results', f"{results['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
@@ -0,0 +1,116 @@
+import random
+
+import pandas as pd
+
+# Building blocks of the synthetic player names, with the diacritics that are
+# common in real NBA rosters
+SYLLABLES = ['an', 'ja', 'ko', 'lu', 'mi', 'ne', 'ro', 'sa', 'ti', 'vo', 'dar', 'kel',
+             'mar', 'son', 'ton', 'vić', 'ić', 'ša', 'žo', 'ğu', 'é', 'ë', 'ñu', 'ō']
+SUFFIXES = ['', '', '', '', ' Jr.', ' II', ' III']
+POSITIONS = ['G', 'F', 'C', 'G-F', 'F-G', 'F-C', 'C-F']
+STAT_COLUMNS = ['GP', 'MPG', 'USG%', 'TO%', 'FTA', 'FT%', '2PA', '2P%', '3PA', '3P%', 'eFG%',
+                'TS%', 'PPG', 'RPG', 'APG', 'P+A', 'SPG', 'BPG', 'TPG', 'VI', 'ORtg', 'DRtg']
+TEAMS = [
+    ('Atlanta Hawks', 'atl'), ('Boston Celtics', 'bos'), ('Brooklyn Nets', 'bkn'),
+    ('Charlotte Hornets', 'cha'), ('Chicago Bulls', 'chi'), ('Cleveland Cavaliers', 'cle'),
+    ('Dallas Mavericks', 'dal'), ('Denver Nuggets', 'den'), ('Detroit Pistons', 'det'),
+    ('Golden State Warriors', 'gsw'), ('Houston Rockets', 'hou'), ('Indiana Pacers', 'ind'),
+    ('Los Angeles Clippers', 'lac'), ('Los Angeles Lakers', 'lal'), ('Memphis Grizzlies', 'mem'),
+    ('Miami Heat', 'mia'), ('Milwaukee Bucks', 'mil'), ('Minnesota Timberwolves', 'min'),
+    ('New Orleans Pelicans', 'nor'), ('New York Knicks', 'nyk'), ('Oklahoma City Thunder', 'okc'),
+    ('Orlando Magic', 'orl'), ('Philadelphia 76ers', 'phi'), ('Phoenix Suns', 'pho'),
+    ('Portland Trail Blazers', 'por'), ('Sacramento Kings', 'sac'), ('San Antonio Spurs', 'sas'),
+    ('Toronto Raptors', 'tor'), ('Utah Jazz', 'uta'), ('Washington Wizards', 'was'),
+]
+
+
+def _word(rng, syllables):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(syllables)).capitalize()
+
+def _typo(rng, name):
+    """
+    Applies one random edit: substitution, insertion, deletion, transposition
+    or stripping the diacritics of the name.
+    """
+    chars = list(name)
+    i = rng.randrange(len(chars) - 1)
+    edit = rng.randrange(5)
+    if edit == 0:
+        chars[i] = rng.choice('aeiou')
+    elif edit == 1:
+        chars.insert(i, rng.choice('aeiou'))
+    elif edit == 2:
+        del chars[i]
+    elif edit == 3:
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    else:
+        return name.translate(str.maketrans('ćšžğéëñō', 'cszgeeno'))
+    return ''.join(chars)
+
+def generate(n_players, seasons=4, typo_rate=0.1, seed=0):
+    """
+    Generates NBA-shaped source tables.
+
+    The same seed and arguments always produce the same tables.
+
+    Args:
+        n_players (int): Number of distinct players.
+        seasons (int): Number of seasons of stats and salaries.
+        typo_rate (float): Share of salary rows whose player name has a typo.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        dict: ``teams`` and ``titles`` shaped like teams.csv and
+        teams_won_titles.csv, ``stats`` and ``salaries`` as dicts of
+        DataFrames per season (e.g. "2019_2020"), shaped like the renamed
+        stat workbooks and the scraped salary files.
+    """
+    rng = random.Random(seed)
+
+    names = set()
+    while len(names) < n_players:
+        names.add(f'{_word(rng, rng.randint(1, 3))} {_word(rng, rng.randint(2, 4))}{rng.choice(SUFFIXES)}')
+    names = sorted(names)
+    rng.shuffle(names)
+
+    teams = pd.DataFrame({
+        'name': [name for name, _ in TEAMS],
+        'prefix_1': [prefix for _, prefix in TEAMS],
+        'prefix_2': [name[:3] for name, _ in TEAMS],
+    })
+
+    titles = []
+    for year in range(1990, 2023):
+        west, east = rng.sample(TEAMS, 2)
+        titles.append({
+            'year': f'{year}–{str(year + 1)[2:]}',
+            'western_champ': f'{west[0]} ({rng.randint(1, 9)})',
+            'western_coach': _word(rng, 3),
+            'score': f'4–{rng.randint(0, 3)}',
+            'eastern_champ': f'{east[0]} ({rng.randint(1, 9)})',
+            'eastern_coach': _word(rng, 3),
+        })
+
+    stats, salaries = {}, {}
+    for year in range(2023 - seasons, 2023):
+        season = f'{year}_{year + 1}'
+        roster = rng.sample(names, int(n_players * 0.8))
+
+        columns = {
+            'RANK': list(range(1, len(roster) + 1)),
+            'NAME': roster,
+            'TEAM': [rng.choice(TEAMS)[1].upper() for _ in roster],
+            'POS': [rng.choice(POSITIONS) for _ in roster],
+            'AGE': [rng.randint(19, 40) for _ in roster],
+        }
+        for column in STAT_COLUMNS:
+            columns[column] = [round(rng.uniform(0, 40), 1) for _ in roster]
+        stats[season] = pd.DataFrame(columns)
+
+        paid = rng.sample(roster, int(len(roster) * 0.9))
+        salaries[season] = pd.DataFrame({
+            'player': [_typo(rng, name) if rng.random() < typo_rate else name for name in paid],
+            'salary': [f'${rng.randint(900_000, 45_000_000):,}' for _ in paid],
+        })
+
+    return {'teams': teams, 'titles': pd.DataFrame(titles), 'stats': stats, 'salaries': salaries}
@@ -1,38 +1,52 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import OneHotEncoder
-from scipy.optimize import curve_fit
-from glob import glob
 import statsmodels.formula.api as smf
-# Load player information
-players = pd.read_csv('unique_players.csv')
 
-# Load championship information
-champs = pd.read_csv('champions_with_team_ids.csv')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '2_integration', 'ezzeddine'))
+from paths import PROCESSED_DIR
+from compact import CompactLoader
+from instrumentation import stage
+from salary_model import SalaryModel
+from star_schema import build_fact_table, read_seasons
 
-# Load statistics
-stats_files = glob('stats.csv')
-stats = pd.concat((pd.read_csv(file) for file in stats_files))
+performance_metrics = ['RANK', 'PPG', 'RPG', 'APG', 'SPG', 'BPG', 'USG%', 'TO%', 'eFG%', 'TS%']
 
-# Load salaries
-salary_files = glob('salaries.csv')
-salaries = pd.concat((pd.read_csv(file) for file in salary_files))
+# Uuid keys are loaded as categoricals shared by all tables, stats as narrow numbers
+loader = CompactLoader(PROCESSED_DIR)
 
-# Load teams information
-teams = pd.read_csv('teams_with_uuid.csv')
-# Merge dataframes
-merged = pd.merge(salaries, stats, on='player_uuid')
-merged = pd.merge(merged, players, left_on='player_uuid', right_on='uuid')
-performance_metrics = ['RANK', 'PPG', 'RPG', 'APG', 'SPG', 'BPG', 'USG%', 'TO%', 'eFG%', 'TS%']
-correlations = merged[['salary_in_usd'] + performance_metrics].corr()
-print(correlations)
+with stage('analysis.load') as s:
+    # Load player information
+    players = loader.read(os.path.join(PROCESSED_DIR, 'unique_players'))
+
+    # Load championship information
+    champs = loader.read(os.path.join(PROCESSED_DIR, 'champions_with_team_ids'))
+
+    # Load statistics
+    stats = read_seasons(os.path.join(PROCESSED_DIR, 'stats'),
+                         ['player_uuid', 'team_uuid', 'POS', 'AGE'] + performance_metrics, loader=loader)
+
+    # Load salaries
+    salaries = read_seasons(os.path.join(PROCESSED_DIR, 'salaries'), ['player_uuid', 'salary_in_usd'],
+                            loader=loader)
+
+    # Load teams information
+    teams = loader.read(os.path.join(PROCESSED_DIR, 'teams_with_uuid'))
+    s.rows_out = len(players) + len(champs) + len(stats) + len(salaries) + len(teams)
+
+with stage('analysis.merge') as s:
+    # Join stats and salaries once into a fact table with one row per player and season;
+    # players, teams and champions are looked up as its dimensions
+    data = build_fact_table(stats, salaries, players=players, teams=teams, champions=champs)
+    s.rows_in, s.rows_out = len(salaries) + len(stats), len(data)
 
-# Merge data frames
-data = pd.merge(players, salaries, left_on='uuid', right_on='player_uuid')
-data = pd.merge(data, stats, on='player_uuid')
+correlations = data[['salary_in_usd'] + performance_metrics].corr()
+print(correlations)
 
 # Check for outliers
 data.boxplot(column='salary_in_usd')
@@ -72,11 +86,11 @@ plt.xlabel('Position')
 plt.ylabel('Average Salary')
 plt.show()
 
-# Convert season_x variable to date format
-data['season_x'] = data['season_x'].apply(lambda x: x.split('-')[0])
+# Convert season variable to date format
+data['season'] = data['season'].astype(str).apply(lambda x: x.split('-')[0])
 
 # Calculate average salary for each season
-average_salary_by_season = data.groupby('season_x')['salary_in_usd'].mean()
+average_salary_by_season = data.groupby('season')['salary_in_usd'].mean()
 
 # Print results
 print(average_salary_by_season)
@@ -88,23 +102,24 @@ plt.xlabel('Season')
 plt.ylabel('Average Salary')
 plt.show()
 
-# Define model function
-def model_func(x, a0, a1, a2, a3, a4, a5, a6, b1, b2, b3, b4, c, k):
-    is_F, is_GF, is_G, is_C, is_CF, is_FG, is_FC, ppg, rpg, apg, age, season = x
-    return (a0 * is_F + a1 * is_GF + a2 * is_G + a3 * is_C + a4 * is_CF + a5 * is_FG + a6 * is_FC) * (b1 * ppg + b2 * rpg + b3 * apg + b4 * age + c) * k ** (season - 2018)
-
-# Encode position variables using one-hot encoding
-pos_dummies = pd.get_dummies(data['POS'], prefix='is')
-
-# Add one-hot encoded variables to the data frame
-data = pd.concat([data, pos_dummies], axis=1)
-
-# Create explanatory variables and response variable
-X = data[['is_F', 'is_G-F', 'is_G', 'is_C', 'is_C-F', 'is_F-G', 'is_F-C', 'PPG', 'RPG', 'APG', 'AGE', 'season_x']].values.T
-y = data['salary_in_usd'].values
-
-# Fit the model
-popt, pcov = curve_fit(model_func, X, y)
+# Fit the model with its analytic Jacobian. The design matrix (one-hot positions,
+# PPG, RPG, APG, AGE and season) is cached, and the fit starts from the parameters
+# saved by the last run; unchanged data is not refitted at all.
+model = SalaryModel(os.path.join(PROCESSED_DIR, 'salary_model.json'))
+with stage('analysis.fit') as s:
+    popt = model.fit(data)
+    s.rows_in = len(data)
 
 # Print model parameters
 print('Coefficients: ', popt)
+
+# Fit one model per group of players if INTEGRATION_FIT_GROUPS names the column,
+# e.g. "POS" or "season"; only groups whose players changed are refitted
+fit_groups_by = os.environ.get('INTEGRATION_FIT_GROUPS')
+if fit_groups_by:
+    with stage('analysis.fit', by=fit_groups_by) as s:
+        group_params = model.fit_groups(data, by=fit_groups_by)
+        s.rows_in = len(data)
+
+    for value, params in group_params.items():
+        print(f'Coefficients ({fit_groups_by}={value}): ', params)
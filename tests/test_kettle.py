@@ -0,0 +1,81 @@
+import csv
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_integration', 'ezzeddine'))
+from kettle import FileResolver, Transformation, kettle_basename, unique_names
+
+STATS = [['NAME', 'RANK'], ['luka doncic', '3'], ['Nikola Jokic', '1'], ['Joel Embiid', '2'], ['Bam Adebayo', '4']]
+SALARIES = [['player', 'salary'], ['Nikola Jokic', '29542010'], ['Luka Doncic', '10174391'],
+            ['Zion Williamson', '10733400']]
+
+
+def text_input(name, file, fields):
+    fields = ''.join(f'<field><name>{field}</name><type>{kettle_type}</type></field>'
+                     for field, kettle_type in fields)
+    return (f'<step><name>{name}</name><type>TextFileInput</type><separator>,</separator><header>Y</header>'
+            f'<nr_headerlines>1</nr_headerlines><file><name>C:\\Users\\me\\{file}</name></file>'
+            f'<fields>{fields}</fields></step>')
+
+
+def transformation(path, join_type):
+    steps = [
+        text_input('stats', 'stats.csv', [('NAME', 'String'), ('RANK', 'Integer')]),
+        text_input('salaries', 'salaries.csv', [('player', 'String'), ('salary', 'Number')]),
+        '<step><name>rename</name><type>SelectValues</type><fields>'
+        '<field><name>player</name><rename>NAME</rename></field><field><name>salary</name></field>'
+        '</fields></step>',
+    ]
+    for name in ['sort stats', 'sort salaries']:
+        # Runs of two rows, so the sort spills to disk
+        steps.append(f'<step><name>{name}</name><type>SortRows</type><sort_size>2</sort_size>'
+                     f'<directory>{os.path.dirname(path)}</directory><fields>'
+                     '<field><name>NAME</name><ascending>Y</ascending><case_sensitive>N</case_sensitive></field>'
+                     '</fields></step>')
+    steps.append(f'<step><name>join</name><type>MultiwayMergeJoin</type><join_type>{join_type}</join_type>'
+                 '<step0>sort stats</step0><step1>sort salaries</step1><number_input>2</number_input>'
+                 '<keys><key>NAME</key><key>NAME</key></keys></step>')
+    steps.append('<step><name>output</name><type>TextFileOutput</type><separator>,</separator>'
+                 '<header>Y</header><file><name>C:\\Users\\me\\joined</name><extention>csv</extention></file>'
+                 '<fields><field><name>NAME</name></field><field><name>RANK</name></field>'
+                 '<field><name>salary</name></field></fields></step>')
+    hops = [('stats', 'sort stats'), ('salaries', 'rename'), ('rename', 'sort salaries'),
+            ('sort stats', 'join'), ('sort salaries', 'join'), ('join', 'output')]
+    hops = ''.join(f'<hop><from>{source}</from><to>{to}</to><enabled>Y</enabled></hop>' for source, to in hops)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<transformation><info><name>test</name></info><order>{hops}</order>{"".join(steps)}</transformation>')
+
+
+@pytest.mark.parametrize('join_type, expected', [
+    ('INNER', [['luka doncic', '3', '10174391.0'], ['Nikola Jokic', '1', '29542010.0']]),
+    ('FULL OUTER', [['Bam Adebayo', '4', ''], ['Joel Embiid', '2', ''], ['luka doncic', '3', '10174391.0'],
+                    ['Nikola Jokic', '1', '29542010.0'], ['', '', '10733400.0']]),
+])
+def test_sorted_inputs_are_merge_joined(tmp_path, join_type, expected):
+    for name, rows in [('stats.csv', STATS), ('salaries.csv', SALARIES)]:
+        with open(tmp_path / name, 'w', newline='') as f:
+            csv.writer(f).writerows(rows)
+    transformation(tmp_path / 'test.ktr', join_type)
+
+    counts = Transformation(str(tmp_path / 'test.ktr')).run(FileResolver(str(tmp_path), search_dirs=[]))
+    assert counts == {'output': len(expected)}
+    with open(tmp_path / 'joined.csv', newline='') as f:
+        assert list(csv.reader(f)) == [['NAME', 'RANK', 'salary']] + expected
+    # The spilled runs of the sorts are deleted once they are merged
+    assert sorted(os.listdir(tmp_path)) == ['joined.csv', 'salaries.csv', 'stats.csv', 'test.ktr']
+
+
+def test_file_names():
+    assert kettle_basename('C:\\Users\\me\\stats\\2019-2020.xls') == '2019-2020.xls'
+    assert unique_names(['NAME', 'RANK', 'NAME', 'NAME']) == ['NAME', 'RANK', 'NAME_1', 'NAME_2']
+
+
+def test_resolver_finds_other_excel_extension(tmp_path):
+    (tmp_path / '2019-2020.xlsx').write_bytes(b'')
+    resolver = FileResolver(str(tmp_path / 'output'), search_dirs=[str(tmp_path)], files={'x.csv': 'elsewhere.csv'})
+    assert resolver.input('C:\\data\\2019-2020.xls') == str(tmp_path / '2019-2020.xlsx')
+    assert resolver.input('/data/x.csv') == 'elsewhere.csv'
+    with pytest.raises(FileNotFoundError):
+        resolver.input('missing.csv')
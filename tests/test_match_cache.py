@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_integration', 'ezzeddine'))
+from match_cache import MatchCache
+
+
+def test_bind_drops_stale_matches(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    with MatchCache(path, 'players') as cache:
+        cache.bind('v1')
+        cache.store({'LeBron James': ('p1', 0.0)})
+        cache.bind('v1')
+        assert cache.load() == {'LeBron James': ('p1', 0.0)}
+        cache.bind('v2')
+        assert cache.load() == {}
+
+def test_concurrent_bind_keeps_fresh_matches(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    with MatchCache(path, 'players') as cache:
+        cache.bind('v1')
+
+    with MatchCache(path, 'players') as first, MatchCache(path, 'players') as second:
+        # The second worker checks the fingerprint before the first one binds
+        # the new version and stores its matches, and only then takes the lock
+        checks = iter(['v1'])
+        original = second._fingerprint
+        second._fingerprint = lambda: next(checks, None) or original()
+
+        first.bind('v2')
+        first.store({'LeBron James': ('p1', 0.0)})
+        second.bind('v2')
+        assert second.load() == {'LeBron James': ('p1', 0.0)}
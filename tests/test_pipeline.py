@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_integration', 'ezzeddine'))
+from pipeline import Pipeline, Stage
+
+
+def build(directory, runs):
+    source = os.path.join(directory, 'source.csv')
+    numbers_path = os.path.join(directory, 'numbers.csv')
+    doubled_path = os.path.join(directory, 'doubled.csv')
+
+    def run_numbers():
+        runs.append('numbers')
+        return {'numbers': pd.read_csv(source)}
+
+    def run_doubled(numbers):
+        runs.append('doubled')
+        return {'doubled': numbers * 2}
+
+    def stage(name, run, path, inputs=(), sources=()):
+        return Stage(name, run, inputs=inputs, outputs=(name,), sources=sources,
+                     write=lambda **outputs: outputs[name].to_csv(path, index=False),
+                     read=lambda: {name: pd.read_csv(path)},
+                     exists=lambda: os.path.exists(path))
+
+    return Pipeline([
+        stage('doubled', run_doubled, doubled_path, inputs=('numbers',)),
+        stage('numbers', run_numbers, numbers_path, sources=(source,)),
+    ], os.path.join(directory, 'state.json'))
+
+
+def test_unchanged_stages_are_skipped(tmp_path):
+    pd.DataFrame({'x': [1, 2]}).to_csv(tmp_path / 'source.csv', index=False)
+    runs = []
+    assert build(str(tmp_path), runs).run()['doubled']['x'].tolist() == [2, 4]
+    assert runs == ['numbers', 'doubled']
+    assert set(json.loads((tmp_path / 'state.json').read_text())) == {'numbers', 'doubled'}
+
+    runs.clear()
+    assert build(str(tmp_path), runs).run()['doubled']['x'].tolist() == [2, 4]
+    assert runs == []
+
+    # A changed source reruns its stage; the next stage only reruns because
+    # the dataset it reads changed
+    pd.DataFrame({'x': [1, 3]}).to_csv(tmp_path / 'source.csv', index=False)
+    runs.clear()
+    assert build(str(tmp_path), runs).run()['doubled']['x'].tolist() == [2, 6]
+    assert runs == ['numbers', 'doubled']
+
+
+def test_deleted_outputs_are_rebuilt(tmp_path):
+    pd.DataFrame({'x': [1, 2]}).to_csv(tmp_path / 'source.csv', index=False)
+    runs = []
+    build(str(tmp_path), runs).run()
+
+    os.remove(tmp_path / 'numbers.csv')
+    runs.clear()
+    assert build(str(tmp_path), runs).run()['doubled']['x'].tolist() == [2, 4]
+    assert runs == ['numbers']
+    assert os.path.exists(tmp_path / 'numbers.csv')
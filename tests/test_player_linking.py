@@ -0,0 +1,63 @@
+import importlib
+import os
+import sys
+import unicodedata
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_integration', 'ezzeddine'))
+from identifiers import entity_uuid
+from linking import link_names
+
+players_stats = importlib.import_module('1_integrate_teams_and_players_stats')
+players_salaries = importlib.import_module('2_integrate_players_and_salaries')
+
+TEAMS = pd.DataFrame({
+    'uuid': ['t-dal', 't-den'],
+    'name': ['Dallas Mavericks', 'Denver Nuggets'],
+    'prefix_1': ['dal', 'den'],
+    'prefix_2': ['Dal', 'Den'],
+})
+
+
+def season(names, teams):
+    return pd.DataFrame({'RANK': range(1, len(names) + 1), 'NAME': names, 'TEAM': teams, 'POS': 'G'})
+
+
+def test_variant_spellings_link_across_seasons():
+    # The later season spells both players differently: decomposed accents
+    # and a double space
+    doncic_nfd = unicodedata.normalize('NFD', 'Luka Dončić')
+    stats = {
+        '2019_2020': season(['Luka Dončić', 'Nikola Jokić'], ['DAL', 'DEN']),
+        '2020_2021': season([doncic_nfd, 'Nikola  Jokić'], ['DAL', 'DEN']),
+    }
+    players, linked = players_stats.integrate_stats(stats, TEAMS, processes=1)
+
+    doncic, jokic = entity_uuid('player', 'Luka Dončić'), entity_uuid('player', 'Nikola Jokić')
+    assert players['uuid'].tolist() == [doncic, jokic]
+    for df in linked.values():
+        assert df['player_uuid'].tolist() == [doncic, jokic]
+        assert df['team_uuid'].tolist() == ['t-dal', 't-den']
+
+    salaries = {'2020_2021': pd.DataFrame({
+        'player': [doncic_nfd, 'Nikola Jokić ', 'Nobody'],
+        'salary': ['$10,174,391', '$29,542,010', '$1,000,000'],
+    })}
+    linked = players_salaries.integrate_salaries(salaries, players, processes=1)
+    assert linked['2020_2021']['player_uuid'].tolist() == [doncic, jokic, '']
+
+
+def test_missing_reference_names_link_nothing():
+    players = pd.DataFrame({'uuid': ['p-none', 'p-na', 'p-jokic'], 'NAME': [float('nan'), pd.NA, 'Nikola Jokić']})
+    salaries = {'2020_2021': pd.DataFrame({
+        'player': ['nan', '<NA>', 'Nikola Jokić'],
+        'salary': ['$1,000,000', '$1,000,000', '$29,542,010'],
+    })}
+    linked = players_salaries.integrate_salaries(salaries, players, processes=1)
+    assert linked['2020_2021']['player_uuid'].tolist() == ['', '', 'p-jokic']
+
+    uuids, distances = link_names(['nan', 'na', 'Nikola Jokic'], [float('nan'), None, 'Nikola Jokić'],
+                                  ['p-none', 'p-na', 'p-jokic'], threshold=1)
+    assert uuids.tolist() == ['', '', 'p-jokic']
+    assert distances.tolist()[2] == 1
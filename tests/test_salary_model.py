@@ -0,0 +1,30 @@
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_integration', 'ezzeddine'))
+from salary_model import PARAMETERS, SalaryModel
+
+
+def test_fit_groups_skips_groups_too_small_to_fit(tmp_path, caplog):
+    rng = np.random.default_rng(0)
+    positions = ['G'] * 40 + ['C'] * len(PARAMETERS)
+    data = pd.DataFrame({
+        'POS': positions,
+        'PPG': rng.uniform(5, 30, len(positions)),
+        'RPG': rng.uniform(1, 10, len(positions)),
+        'APG': rng.uniform(1, 8, len(positions)),
+        'AGE': rng.uniform(20, 35, len(positions)),
+        'season': rng.choice(['2019-2020', '2020-2021'], len(positions)),
+    })
+    data['salary_in_usd'] = 1e5 * (data['PPG'] + data['RPG']) + rng.normal(0, 1e4, len(data))
+
+    model = SalaryModel(str(tmp_path / 'salary_model.json'), cache_dir=None)
+    with caplog.at_level(logging.WARNING, logger='salary_model'):
+        params = model.fit_groups(data, by='POS')
+
+    assert list(params) == ['G'] and len(params['G']) == len(PARAMETERS)
+    assert 'POS=C' in caplog.text
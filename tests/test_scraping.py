@@ -0,0 +1,126 @@
+import io
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '1_preparation'))
+from scraping import HttpCache, fetch, fetch_all, make_session
+from table_extract import extract_columns
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+with open(os.path.join(FIXTURES, 'salaries.html'), 'rb') as f:
+    SALARIES_PAGE = f.read()
+
+ETAG = '"salaries-v1"'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Serves the fixture page with an ETag and answers matching conditional
+    requests with 304. ``/always-304`` answers 304 to every request that may
+    be served from a cache, like a misbehaving proxy.
+    """
+
+    requests = []
+
+    def do_GET(self):
+        StubHandler.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.path == '/always-304':
+            not_modified = self.headers.get('Cache-Control') != 'no-cache'
+        else:
+            not_modified = self.headers.get('If-None-Match') == ETAG
+        if not_modified:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(SALARIES_PAGE)))
+        self.send_header('ETag', ETAG)
+        self.end_headers()
+        self.wfile.write(SALARIES_PAGE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    StubHandler.requests = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+    thread.join()
+
+
+def test_fetch_revalidates_cached_page(server, tmp_path):
+    cache = HttpCache(str(tmp_path))
+    session = make_session(retries=0)
+
+    content, changed = fetch(session, server + '/salaries/2019-2020', cache)
+    assert (content, changed) == (SALARIES_PAGE, True)
+
+    content, changed = fetch(session, server + '/salaries/2019-2020', cache)
+    assert (content, changed) == (SALARIES_PAGE, False)
+    assert StubHandler.requests[-1] == ('/salaries/2019-2020', ETAG)
+
+def test_fetch_refetches_on_304_without_cached_copy(server, tmp_path):
+    cache = HttpCache(str(tmp_path))
+    session = make_session(retries=0)
+    url = server + '/salaries/2019-2020'
+    fetch(session, url, cache)
+
+    # Corrupt the cached entry: its validators survive, its content does not
+    path = cache._path(url)
+    with open(path + '.json', 'w', encoding='utf-8') as f:
+        f.write('{not json')
+    content, changed = fetch(session, url, cache)
+    assert (content, changed) == (SALARIES_PAGE, True)
+
+    # A server answering 304 without a cached copy gets a second, unconditional request
+    session.headers['If-None-Match'] = ETAG
+    content, changed = fetch(session, server + '/always-304', HttpCache(str(tmp_path / 'empty')))
+    assert (content, changed) == (SALARIES_PAGE, True)
+    assert StubHandler.requests[-1] == ('/always-304', None)
+
+def test_interrupted_overwrite_is_not_cached(tmp_path, monkeypatch):
+    cache = HttpCache(str(tmp_path))
+    cache.put('http://example/page', b'old page', {'etag': '"v1"'})
+
+    # The process dies halfway through writing the new content
+    class Truncated(io.BytesIO):
+        def __init__(self, path):
+            super().__init__()
+            self.file = open(path, 'wb')
+
+        def write(self, data):
+            self.file.write(data[:len(data) // 2])
+            self.file.close()
+            raise KeyboardInterrupt
+
+    def open_page(path, mode='r', **kwargs):
+        return Truncated(path) if mode == 'wb' else open(path, mode, **kwargs)
+    monkeypatch.setattr('scraping.open', open_page, raising=False)
+    with pytest.raises(KeyboardInterrupt):
+        cache.put('http://example/page', b'new page', {'etag': '"v2"'})
+
+    assert cache.get('http://example/page') == (None, {})
+
+def test_fetch_all_and_extract_salaries(server, tmp_path):
+    urls = [server + f'/salaries/{season}' for season in ('2019-2020', '2020-2021', '')]
+    pages = fetch_all(urls, cache=HttpCache(str(tmp_path)), max_workers=3)
+    assert list(pages) == urls
+
+    data = extract_columns(pages[urls[0]][0], columns={'player': 1, 'salary': 2}, skip_rows=1,
+                           clean=lambda text: ' '.join(text.split()), encoding='utf-8')
+    assert data == {
+        'player': ['Stephen Curry', 'Luka Dončić', 'Nikola Jokić'],
+        'salary': ['$40,231,758', '$7,683,360', '$27,504,630'],
+    }
@@ -0,0 +1,43 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_integration', 'ezzeddine'))
+from similarity import (damerau_levenshtein_distance, damerau_levenshtein_distances, encode_names,
+                        levenshtein_distance, levenshtein_distances)
+
+
+def reference_distance(s1, s2, transpositions):
+    # Full dynamic programming matrix, without any cutoff
+    d = [[i + j if i == 0 or j == 0 else 0 for j in range(len(s2) + 1)] for i in range(len(s1) + 1)]
+    for i in range(1, len(s1) + 1):
+        for j in range(1, len(s2) + 1):
+            cost = 0 if s1[i - 1] == s2[j - 1] else 1
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + cost)
+            if transpositions and i > 1 and j > 1 and s1[i - 1] == s2[j - 2] and s1[i - 2] == s2[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + cost)
+    return d[-1][-1]
+
+
+def random_names(rng, n):
+    # A small alphabet, so matches, transpositions and shared prefixes are frequent
+    return [''.join(rng.choice('abcé ') for _ in range(rng.randint(0, 8))) for _ in range(n)]
+
+
+@pytest.mark.parametrize('max_distance', [None, 0, 1, 2, 3])
+@pytest.mark.parametrize('transpositions', [False, True])
+def test_distances_match_reference(max_distance, transpositions):
+    single = damerau_levenshtein_distance if transpositions else levenshtein_distance
+    batch = damerau_levenshtein_distances if transpositions else levenshtein_distances
+    rng = random.Random(max_distance or 0)
+    for _ in range(30):
+        query, choices = random_names(rng, 1)[0], random_names(rng, 20)
+        expected = [reference_distance(query, choice, transpositions) for choice in choices]
+        if max_distance is not None:
+            expected = [min(distance, max_distance + 1) for distance in expected]
+
+        assert [single(query, choice, max_distance) for choice in choices] == expected
+        assert batch(query, choices, max_distance).tolist() == expected
+        assert batch(query, encode_names(choices), max_distance).tolist() == expected
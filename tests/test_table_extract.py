@@ -0,0 +1,25 @@
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '1_preparation'))
+from table_extract import extract_columns, iter_table_rows
+
+PAGE = (b'<table><tr><td>a</td><td>c<table><tr><td>nested</td></tr></table>d</td></tr>'
+        b'<tr><td>x</td></tr><tr><td>e</td><td>f</td></tr></table>')
+
+
+def test_nested_table_text_stays_in_its_cell():
+    assert list(iter_table_rows(PAGE)) == [('a', 'cnestedd'), ('x',), ('e', 'f')]
+
+def test_short_rows_are_skipped_with_a_warning(caplog):
+    with caplog.at_level(logging.WARNING, logger='table_extract'):
+        data = extract_columns(PAGE, {'first': 0, 'second': 1})
+    assert data == {'first': ['a', 'e'], 'second': ['cnestedd', 'f']}
+    assert len(caplog.records) == 1 and "('x',)" in caplog.records[0].getMessage()
+
+def test_changed_layout_raises():
+    with pytest.raises(ValueError):
+        extract_columns(PAGE, {'first': 0, 'missing': 5})
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '3_cleaning'))
+from validation import (DuplicateRule, NotNullRule, PatternRule, RangeRule, ReferenceRule, Rule, TypeRule,
+                        validate)
+
+UUID = '0f8fad5b-d9cb-469f-a165-70867728950e'
+
+
+def test_rule_is_abstract():
+    with pytest.raises(TypeError):
+        Rule('rule', ['column'])
+    with pytest.raises(ValueError):
+        NotNullRule('column', action='fix')
+
+
+@pytest.mark.parametrize('rule, values, expected', [
+    (NotNullRule('x'), ['a', '', None, 'b'], [False, True, True, False]),
+    (TypeRule('x', 'float'), ['1.5', 'one', None, '2'], [False, True, False, False]),
+    (TypeRule('x', 'int'), ['1', '1.5', None, 'inf'], [False, True, False, False]),
+    (TypeRule('x', 'uuid'), [UUID, UUID.upper(), None, 'nan'], [False, True, False, True]),
+    (RangeRule('x', 1, 82), [1, 0, 83, None], [False, True, True, False]),
+    (RangeRule('x', min=15), ['14', '15', 'old', 99], [True, False, False, False]),
+    (PatternRule('x', 'G|F|G-F'), ['G', 'G-F', 'GF', None], [False, False, True, False]),
+    (ReferenceRule('x', ['p1', 'p2', None]), ['p1', '', None, 'p3'], [False, True, True, True]),
+])
+def test_rules_flag_violating_rows(rule, values, expected):
+    chunk = pd.DataFrame({'x': pd.Series(values, dtype=object)})
+    assert rule.check(chunk).tolist() == expected
+    assert validate(chunk, [rule]).counts == {rule.name: sum(expected)}
+
+
+@pytest.mark.parametrize('keep, expected', [
+    ('first', [False, False, True, False, False, False, True]),
+    ('last', [True, False, True, False, False, False, False]),
+    (False, [True, False, True, False, False, False, True]),
+])
+def test_duplicates_are_found_across_chunks(keep, expected):
+    df = pd.DataFrame({'name': ['a', 'b', 'a', '', '', None, 'a'], 'year': [1, 1, 1, 1, 1, 1, 1]})
+    rule = DuplicateRule(['name', 'year'], keep=keep)
+    chunks = [df[:2], df[2:5], df[5:]]
+    assert validate(chunks, [rule]).masks[rule.name].tolist() == expected
+    # A single chunk only sees its own duplicates
+    assert rule.check(df[:2]).tolist() == [False, False]
+
+
+def test_actions_drop_and_null_rows():
+    df = pd.DataFrame({'uuid': ['u1', 'u2', 'u2', 'u3'], 'AGE': [20.0, 60.0, 30.0, 10.0]})
+    rules = [DuplicateRule(['uuid'], action='drop'), RangeRule('AGE', 15, 50, action='null'),
+             NotNullRule('uuid')]
+    validation = validate([df[:2], df[2:]], rules)
+
+    assert validation.counts == {'uuid:duplicate': 1, 'AGE:range': 2, 'uuid:not_null': 0}
+    assert validation.dropped().tolist() == [False, False, True, False]
+    cleaned = pd.concat([validation.apply(df[:2]), validation.apply(df[2:], start=2)])
+    assert cleaned['uuid'].tolist() == ['u1', 'u2', 'u3']
+    assert np.isnan(cleaned['AGE'].tolist()[1:]).all()
+    assert validation.summary()['violations'].tolist() == [1, 2, 0]
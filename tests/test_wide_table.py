@@ -0,0 +1,67 @@
+import csv
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '2_integration', 'ezzeddine'))
+from storage import write_table
+from wide_table import build_wide_table, merge_join, sorted_rows
+
+
+@pytest.mark.parametrize('how, expected', [
+    ('inner', [('b', [2, 20])]),
+    ('left', [('a', [1, None]), ('b', [2, 20])]),
+    ('outer', [('a', [1, None]), ('b', [2, 20]), ('c', [None, 30])]),
+])
+def test_merge_join(how, expected):
+    streams = [iter([('a', 1), ('b', 2)]), iter([('b', 20), ('c', 30)])]
+    assert list(merge_join(streams, how=how)) == expected
+
+
+def test_sorted_rows_spills_chunks(tmp_path):
+    path = str(tmp_path / 'salaries_2019_2020')
+    df = pd.DataFrame({'player_uuid': ['c', 'a', '', 'b', None, 'a', 'c'],
+                       'salary_in_usd': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0]})
+    write_table(df, path, 'csv')
+
+    rows = list(sorted_rows(path, ['player_uuid', 'salary_in_usd'], chunksize=2, directory=str(tmp_path)))
+    # Unlinked rows are left out; rows of a player keep their order in the table
+    assert rows == [('a', 2.0), ('a', 6.0), ('b', 4.0), ('c', 1.0), ('c', 7.0)]
+    assert sorted(os.listdir(tmp_path)) == ['salaries_2019_2020.csv']
+
+
+def write_processed(directory):
+    os.makedirs(directory / 'stats')
+    os.makedirs(directory / 'salaries')
+    write_table(pd.DataFrame({'uuid': ['t1', 't2'], 'name': ['Dallas', 'Denver']}),
+                str(directory / 'teams_with_uuid'), 'csv')
+    write_table(pd.DataFrame({'uuid': ['p3', 'p1', 'p2'], 'NAME': ['Embiid', 'Doncic', 'Jokic']}),
+                str(directory / 'unique_players'), 'csv')
+    write_table(pd.DataFrame({'player_uuid': ['p2', 'p1', 'p1', ''], 'RANK': [1.0, 3.0, 9.0, 5.0],
+                              'team_uuid': ['t2', 't1', 't2', 't1']}),
+                str(directory / 'stats' / 'stats_2019_2020'), 'csv')
+    write_table(pd.DataFrame({'player_uuid': ['p1', 'p2', 'p3'], 'salary_in_usd': [10.0, 20.0, 30.0]}),
+                str(directory / 'salaries' / 'salaries_2019_2020'), 'csv')
+    # No stats for the later season
+    write_table(pd.DataFrame({'player_uuid': ['p2', 'p1'], 'salary_in_usd': [21.0, 11.0]}),
+                str(directory / 'salaries' / 'salaries_2020_2021'), 'csv')
+
+
+@pytest.mark.parametrize('how, expected', [
+    ('inner', [['p1', 'Doncic', '10.0', '3.0', 'Dallas', '11.0', '', ''],
+               ['p2', 'Jokic', '20.0', '1.0', 'Denver', '21.0', '', '']]),
+    ('outer', [['p1', 'Doncic', '10.0', '3.0', 'Dallas', '11.0', '', ''],
+               ['p2', 'Jokic', '20.0', '1.0', 'Denver', '21.0', '', ''],
+               ['p3', 'Embiid', '30.0', '', '', '', '', '']]),
+])
+def test_build_wide_table(tmp_path, how, expected):
+    write_processed(tmp_path / 'processed')
+    output = tmp_path / 'four_years_data.csv'
+    assert build_wide_table(str(output), str(tmp_path / 'processed'), how=how, chunksize=1) == len(expected)
+    with open(output, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['player_uuid', 'NAME', '2019salary', '2019rank', '2019team',
+                       '2020salary', '2020rank', '2020team']
+    assert rows[1:] == expected